@@ -0,0 +1,160 @@
+# Description: シード付きの複数エピソードをプロセスプールで実行し、結果を集計するモジュール
+import importlib
+import random
+import time
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import replace
+from typing import List, Dict, Union, Tuple, Type
+
+from .parameter import *
+from .PathPlanner.PathPlannerAbstract import PathPlannerAbstract
+from .PathPlanner.BatchedPlannerAbstract import BatchedPlannerAbstract
+from .Simulator import SimulationConfig, Simulator
+from .BatchedSimulator import BatchedSimulator
+
+# 集計結果に含めるパーセンタイル
+SUMMARY_PERCENTILES = [5, 25, 50, 75, 95]
+
+# ワーカープロセスごとに作ったシミュレータ (マップの読み込みをエピソード間で再利用し、エピソードごとにreset()する)
+_worker_simulator: Union[Simulator, None] = None
+
+
+def load_planner_class(
+    planner: Union[str, Type[PathPlannerAbstract], Type[BatchedPlannerAbstract]],
+) -> Union[Type[PathPlannerAbstract], Type[BatchedPlannerAbstract]]:
+    """経路計画プログラムのクラスを取得する関数
+
+    Args:
+        planner (Union[str, Type[PathPlannerAbstract], Type[BatchedPlannerAbstract]]): クラス、
+            もしくは"RandomWalk"や"module:Class"形式の文字列
+            ("RandomWalk"のような名前だけの場合はRewardPickupAgents.PathPlanner.RandomWalk.RandomWalkを探す)
+
+    Returns:
+        Union[Type[PathPlannerAbstract], Type[BatchedPlannerAbstract]]: 経路計画プログラムのクラス
+    """
+    if not isinstance(planner, str):
+        return planner
+    if ":" in planner:
+        module_name, class_name = planner.split(":", 1)
+    else:
+        module_name, class_name = "{}.PathPlanner.{}".format(__package__, planner), planner
+    planner_class = getattr(importlib.import_module(module_name), class_name)
+    if not issubclass(planner_class, (PathPlannerAbstract, BatchedPlannerAbstract)):
+        raise ValueError(
+            "PathPlannerAbstractかBatchedPlannerAbstractを継承したクラスを指定してください: {}".format(planner)
+        )
+    return planner_class
+
+
+def _init_worker(planner: Union[str, Type[PathPlannerAbstract]], config: SimulationConfig):
+    global _worker_simulator
+    _worker_simulator = Simulator(config, load_planner_class(planner))
+
+
+def _run_seeded_episode(seed: int) -> Dict:
+    simulator = _worker_simulator
+    simulator.reset(seed)
+    # 経路計画プログラムが使う乱数も固定する
+    random.seed(seed)
+    np.random.seed(seed)
+    start_time = time.perf_counter()
+    result = simulator.run(simulator.config.simulation_timestep).to_dict()
+    result["wall_time"] = time.perf_counter() - start_time
+    result["seed"] = seed
+    return result
+
+
+def _run_batched_episodes(
+    planner_class: Type[BatchedPlannerAbstract], seeds: List[int], config: SimulationConfig
+) -> List[Dict]:
+    """BatchedSimulatorで全エピソードを1つのプロセスでまとめて実行する (実行時間は全体をエピソード数で割った値とする)"""
+    simulator = BatchedSimulator(config, planner_class, len(seeds), seeds)
+    np.random.seed(seeds[0])
+    start_time = time.perf_counter()
+    results = [result.to_dict() for result in simulator.run(config.simulation_timestep)]
+    wall_time = (time.perf_counter() - start_time) / len(seeds)
+    for result, seed in zip(results, seeds):
+        result["wall_time"] = wall_time
+        result["seed"] = seed
+    return results
+
+
+def summarize(values: List[float]) -> Dict[str, float]:
+    """値のリストから平均、標準偏差、パーセンタイルなどを計算する関数
+
+    Args:
+        values (List[float]): 集計する値のリスト
+
+    Returns:
+        Dict[str, float]: 集計結果
+    """
+    array = np.asarray(values, dtype=float)
+    summary = {
+        "mean": float(array.mean()),
+        "std": float(array.std()),
+        "min": float(array.min()),
+        "max": float(array.max()),
+    }
+    for percentile, value in zip(SUMMARY_PERCENTILES, np.percentile(array, SUMMARY_PERCENTILES)):
+        summary["p{}".format(percentile)] = float(value)
+    return summary
+
+
+def run_batch(
+    planner: Union[str, Type[PathPlannerAbstract], Type[BatchedPlannerAbstract]],
+    episodes: int,
+    base_seed: int = 0,
+    simulation_timestep: int = SIMULATION_TIMESTEP,
+    max_workers: Union[int, None] = None,
+    config: Union[SimulationConfig, None] = None,
+) -> Dict:
+    """シード付きのエピソードをプロセスプールで実行し、結果を集計する関数
+
+    エピソードiのシードはbase_seed + iとなる
+    BatchedPlannerAbstractを継承した経路計画プログラムの場合は、プロセスプールを使わず
+    BatchedSimulatorで全エピソードをまとめて実行する
+
+    Args:
+        planner (Union[str, Type[PathPlannerAbstract], Type[BatchedPlannerAbstract]]): 経路計画プログラム
+            (load_planner_classを参照)
+        episodes (int): 実行するエピソード数 (1以上)
+        base_seed (int): 最初のエピソードのシード
+        simulation_timestep (int): 1エピソードのステップ数
+        max_workers (Union[int, None]): ワーカープロセス数, Noneの場合はCPU数
+        config (Union[SimulationConfig, None]): マップなどの設定, Noneの場合は既定値
+            (GIFの作成、ターミナルへの表示、状態の記録、プロファイルの保存は行わない)
+
+    Returns:
+        Dict: エピソードごとの結果("episodes")と、保管された報酬・衝突回数・実行時間の集計結果("summary")
+    """
+    if episodes < 1:
+        raise ValueError("エピソード数は1以上を指定してください: {}".format(episodes))
+    # ワーカーでクラスを読み込めるか事前に確認する
+    planner_class = load_planner_class(planner)
+    if config is None:
+        config = SimulationConfig()
+    # 各ワーカーが同じファイルに書き込まないよう、状態の記録とプロファイルの保存も行わない
+    config = replace(
+        config,
+        simulation_timestep=simulation_timestep,
+        print_map_in_terminal=False,
+        create_gif=False,
+        trace_path=None,
+        profile_report_path=None,
+    )
+    seeds = [base_seed + i for i in range(episodes)]
+    if issubclass(planner_class, BatchedPlannerAbstract):
+        results = _run_batched_episodes(planner_class, seeds, config)
+    else:
+        with ProcessPoolExecutor(
+            max_workers=max_workers, initializer=_init_worker, initargs=(planner, config)
+        ) as executor:
+            results = list(executor.map(_run_seeded_episode, seeds))
+    return {
+        "episodes": results,
+        "summary": {
+            key: summarize([result[key] for result in results])
+            for key in ["stored_rewards", "collision_count", "wall_time"]
+        },
+    }
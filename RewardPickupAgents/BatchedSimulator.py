@@ -0,0 +1,259 @@
+# Description: 同じマップの複数エピソードを配列に積み重ね、全エピソードを一度に1ステップずつ進めるモジュール
+import numpy as np
+from dataclasses import dataclass
+from typing import List, Union, Type, Sequence
+
+from .parameter import *
+from .MapLoader import load_map_data
+from .DistanceTable import ACTION_DELTAS, compute_valid_action_mask
+from .MoveResolver import resolve_simultaneous_moves
+from .Simulator import SimulationConfig, SimulationResult
+from .PathPlanner.BatchedPlannerAbstract import BatchedPlannerAbstract
+
+
+@dataclass
+class BatchedStepResult:
+    """全エピソードの1ステップ分のシミュレーション結果 (配列の要素はエピソードごとの値)"""
+
+    step: int
+    collisions: np.ndarray
+    agents_owned_rewards: np.ndarray
+    stored_rewards: np.ndarray
+
+
+class BatchedSimulator:
+    """同じマップのB個のエピソードの状態を配列に積み重ねて保持し、全エピソードをまとめて進めるクラス
+
+    報酬の出現・移動と衝突・報酬の取得・保管の各フェーズをエピソード方向にベクトル化して処理する
+    衝突は設定のcollision_resolutionに従って解決する ("simultaneous"の場合はMoveResolverで全エピソードをまとめて解決する)
+    "sequential"の場合は移動をSimulatorと同じくエージェントIDの順に行うため(エージェント方向のみループする)、
+    seedsにエピソードごとのシードを並べた場合は、各エピソードが同じシードと同じ行動を与えたSimulatorと全く同じ結果になる
+    seedsに整数(またはNone)を1つ与えた場合は、1つの乱数生成器で全エピソードの報酬をまとめて生成するため速いが、
+    Simulatorとは乱数の使い方が異なる
+
+    経路計画プログラムは次の属性から状態を読み取る (書き換えてはいけない)
+    - reward_arrays: (B, 横幅, 縦幅)の報酬
+    - agent_positions: (B, N, 2)のエージェントの位置
+    - owned_rewards: (B, N)のエージェントが持っている報酬
+    - stored_rewards: (B, 保管庫の数)の保管された報酬
+    - passable_array: (横幅, 縦幅)の通行可能なセル, valid_action_mask: (横幅, 縦幅, 5)のセルごとに取れる行動
+    - vault_positions: (保管庫の数, 2)の保管庫の位置, maximum_rewards_capacity: エージェントが一度に保持できる報酬の最大値
+
+    Args:
+        config (SimulationConfig): シミュレーションの設定 (マップ, 報酬の最大値, ステップ数を使う)
+        planner_class (Type[BatchedPlannerAbstract]): 全エピソードの行動をまとめて選択する経路計画プログラムのクラス
+        batch_size (int): エピソード数B
+        seeds (Union[Sequence[Union[int, None]], int, None]): 報酬の出現に使う乱数のシード
+            (長さBのリストの場合はエピソードごとのシード, 整数かNoneの場合は全エピソードで共有する乱数生成器のシード)
+    """
+
+    def __init__(
+        self,
+        config: SimulationConfig,
+        planner_class: Type[BatchedPlannerAbstract],
+        batch_size: int,
+        seeds: Union[Sequence[Union[int, None]], int, None] = None,
+    ):
+        self.config = config
+        self.planner_class = planner_class
+        map_data = load_map_data(config.obstacle_file, config.reward_probability_file)
+        width, height = map_data.get_size()
+        if (config.map_width is not None and config.map_width != width) or (
+            config.map_height is not None and config.map_height != height
+        ):
+            raise ValueError(
+                "The map size ({}, {}) does not match the size of {} ({}, {})".format(
+                    config.map_width, config.map_height, config.obstacle_file, width, height
+                )
+            )
+        self.maximum_rewards_capacity = config.maximum_rewards_capacity
+        self.passable_array: np.ndarray = map_data.obstacle_array != 1
+        self.valid_action_mask: np.ndarray = compute_valid_action_mask(self.passable_array)
+        self.reward_probability_array: np.ndarray = map_data.reward_probability_array
+        self.initial_agent_positions: np.ndarray = map_data.agent_nodes.astype(np.int64)
+        self.vault_positions: np.ndarray = map_data.vault_nodes.astype(np.int64)
+        # セルにある保管庫のID (ない場合は-1)
+        self.vault_occupancy_grid = np.full((width, height), -1, dtype=np.int32)
+        self.vault_occupancy_grid[self.vault_positions[:, 0], self.vault_positions[:, 1]] = np.arange(
+            len(self.vault_positions)
+        )
+        self.batch_size = batch_size
+        self.reset(seeds)
+
+    def reset(self, seeds: Union[Sequence[Union[int, None]], int, None] = None):
+        """全エピソードを初期状態に戻すメソッド
+
+        Args:
+            seeds (Union[Sequence[Union[int, None]], int, None]): 報酬の出現に使う乱数のシード
+                (長さBのリストの場合はエピソードごとのシード, 整数かNoneの場合は全エピソードで共有する乱数生成器のシード)
+        """
+        batch_size = self.batch_size
+        agents_count = len(self.initial_agent_positions)
+        width, height = self.passable_array.shape
+        if seeds is None or isinstance(seeds, (int, np.integer)):
+            self.rngs: List[np.random.Generator] = [np.random.default_rng(seeds)]
+        else:
+            if len(seeds) != batch_size:
+                raise ValueError(
+                    "The number of seeds {} does not match the batch size {}".format(len(seeds), batch_size)
+                )
+            self.rngs = [np.random.default_rng(seed) for seed in seeds]
+        # 報酬の出現の判定に使う乱数を書き込む配列
+        self.spawn_randoms = np.empty((batch_size, width, height))
+        self.reward_arrays = np.zeros((batch_size, width, height))
+        self.agent_positions = np.repeat(self.initial_agent_positions[None], batch_size, axis=0)
+        self.owned_rewards = np.zeros((batch_size, agents_count))
+        self.stored_rewards = np.zeros((batch_size, len(self.vault_positions)))
+        # セルにいるエージェントのID (いない場合は-1)
+        self.agent_occupancy_grids = np.full((batch_size, width, height), -1, dtype=np.int32)
+        self.agent_occupancy_grids[:, self.initial_agent_positions[:, 0], self.initial_agent_positions[:, 1]] = (
+            np.arange(agents_count)
+        )
+        self.next_nodes_selector: BatchedPlannerAbstract = self.planner_class()
+        self.step_count: int = 0
+        self.collision_counts = np.zeros(batch_size, dtype=np.int64)
+
+    def get_batch_size(self) -> int:
+        return self.batch_size
+
+    def get_agents_count(self) -> int:
+        return len(self.initial_agent_positions)
+
+    def step(self) -> BatchedStepResult:
+        """全エピソードを1ステップ進めるメソッド
+
+        Returns:
+            BatchedStepResult: このステップの結果
+        """
+        self.__update_rewards()
+        actions = np.asarray(self.next_nodes_selector.get_batched_actions(self))
+        collisions = self.__move_agents(actions)
+        self.__earn_and_store_rewards()
+        self.step_count += 1
+        self.collision_counts += collisions
+        return BatchedStepResult(
+            self.step_count, collisions, self.owned_rewards.sum(axis=1), self.stored_rewards.sum(axis=1)
+        )
+
+    def run(self, n_steps: Union[int, None] = None) -> List[SimulationResult]:
+        """全エピソードをn_stepsステップ進めるメソッド
+
+        Args:
+            n_steps (Union[int, None]): 進めるステップ数, Noneの場合は設定のsimulation_timestep
+
+        Returns:
+            List[SimulationResult]: エピソードごとのシミュレーション結果
+        """
+        if n_steps is None:
+            n_steps = self.config.simulation_timestep
+        for _ in range(n_steps):
+            self.step()
+        return self.get_results()
+
+    def get_results(self) -> List[SimulationResult]:
+        """現在までのエピソードごとのシミュレーション結果を取得するメソッド
+
+        Returns:
+            List[SimulationResult]: エピソードごとのシミュレーション結果
+        """
+        owned_rewards = self.owned_rewards.sum(axis=1)
+        stored_rewards = self.stored_rewards.sum(axis=1)
+        return [
+            SimulationResult(self.step_count, float(owned), float(stored), int(collisions))
+            for owned, stored, collisions in zip(owned_rewards, stored_rewards, self.collision_counts)
+        ]
+
+    def __update_rewards(self):
+        """確率に応じて全エピソードのセルに報酬を生成する (エピソードごとのシードの場合はWorld.update_rewardと同じ乱数を使う)"""
+        if len(self.rngs) == 1:
+            self.rngs[0].random(out=self.spawn_randoms)
+        else:
+            for rng, spawn_random in zip(self.rngs, self.spawn_randoms):
+                rng.random(out=spawn_random)
+        spawn_masks = self.spawn_randoms < self.reward_probability_array
+        # エージェントがいる場所には報酬を生成しない
+        spawn_masks &= self.agent_occupancy_grids < 0
+        self.reward_arrays[spawn_masks] = 1
+
+    def __move_agents(self, actions: np.ndarray) -> np.ndarray:
+        """エージェントIDの順に全エピソードのエージェントを移動させ、エピソードごとの衝突回数を返す"""
+        batch_size, agents_count = self.agent_positions.shape[:2]
+        if actions.shape != (batch_size, agents_count) or actions.dtype.kind not in "iu":
+            raise ValueError(
+                "行動の配列が(エピソード数, エージェント数) = {}の整数配列ではありません: {} {}".format(
+                    (batch_size, agents_count), actions.shape, actions.dtype
+                )
+            )
+        positions = self.agent_positions
+        invalid = (actions < 0) | (actions >= len(ACTION_DELTAS))
+        if invalid.any():
+            episode, agent_id = np.argwhere(invalid)[0]
+            raise ValueError(
+                "エージェントが取れない行動を選択しようとしています。 Episode: {}, Agent ID: {}, Action: {}".format(
+                    episode, agent_id, actions[episode, agent_id]
+                )
+            )
+        invalid = ~self.valid_action_mask[positions[..., 0], positions[..., 1], actions]
+        if invalid.any():
+            episode, agent_id = np.argwhere(invalid)[0]
+            raise ValueError(
+                "エージェントが範囲外もしくは障害物に移動しようとしています。 Episode: {}, Agent ID: {}, Node: {}".format(
+                    episode, agent_id, positions[episode, agent_id] + ACTION_DELTAS[actions[episode, agent_id]]
+                )
+            )
+
+        occupancy = self.agent_occupancy_grids
+        episodes = np.arange(batch_size)
+        collisions = np.zeros(batch_size, dtype=np.int64)
+        targets = positions + ACTION_DELTAS[actions]
+        if self.config.collision_resolution == "simultaneous":
+            return self.__move_agents_simultaneously(targets)
+        for agent_id in range(agents_count):
+            current_xs, current_ys = positions[:, agent_id, 0], positions[:, agent_id, 1]
+            target_xs, target_ys = targets[:, agent_id, 0], targets[:, agent_id, 1]
+            # その場に留まる場合も移動先に自分がいるため衝突として数える (Simulatorと同じ)
+            blocked = occupancy[episodes, target_xs, target_ys] >= 0
+            collisions += blocked
+            moving = np.flatnonzero(~blocked)
+            occupancy[moving, current_xs[moving], current_ys[moving]] = -1
+            occupancy[moving, target_xs[moving], target_ys[moving]] = agent_id
+            positions[moving, agent_id] = targets[moving, agent_id]
+        return collisions
+
+    def __move_agents_simultaneously(self, targets: np.ndarray) -> np.ndarray:
+        """全エピソードの衝突をエピソードごとにずらしたセルIDでまとめて解決し、エピソードごとの衝突回数を返す"""
+        batch_size, agents_count = self.agent_positions.shape[:2]
+        width, height = self.passable_array.shape
+        cell_offsets = (np.arange(batch_size) * width * height)[:, None]
+        current_cells = self.agent_positions[..., 0] * height + self.agent_positions[..., 1] + cell_offsets
+        target_cells = targets[..., 0] * height + targets[..., 1] + cell_offsets
+        # occupancyの値を全エピソードのエージェントを並べたときのインデックスにする
+        occupancy = self.agent_occupancy_grids
+        agent_offsets = (np.arange(batch_size) * agents_count)[:, None, None]
+        flat_occupancy = np.where(occupancy >= 0, occupancy + agent_offsets, -1).ravel()
+        resolved_cells, blocked = resolve_simultaneous_moves(
+            current_cells.ravel(), target_cells.ravel(), flat_occupancy
+        )
+        resolved_cells = resolved_cells.reshape(batch_size, agents_count) - cell_offsets
+        occupancy.reshape(batch_size, -1)[np.arange(batch_size)[:, None], current_cells - cell_offsets] = -1
+        occupancy.reshape(batch_size, -1)[np.arange(batch_size)[:, None], resolved_cells] = np.arange(agents_count)
+        self.agent_positions[..., 0], self.agent_positions[..., 1] = np.divmod(resolved_cells, height)
+        return blocked.reshape(batch_size, agents_count).sum(axis=1)
+
+    def __earn_and_store_rewards(self):
+        """エージェントのいるセルの報酬を取得し、保管庫にいるエージェントの報酬を保管する"""
+        # 同じセルに複数のエージェントがいることはないため、全エージェントをまとめて処理できる
+        episodes = np.arange(self.get_batch_size())[:, None]
+        xs, ys = self.agent_positions[..., 0], self.agent_positions[..., 1]
+        rewards = np.minimum(self.reward_arrays[episodes, xs, ys], self.maximum_rewards_capacity - self.owned_rewards)
+        self.owned_rewards += rewards
+        self.reward_arrays[episodes, xs, ys] -= rewards
+
+        vault_ids = self.vault_occupancy_grid[xs, ys]
+        on_vault = vault_ids >= 0
+        np.add.at(
+            self.stored_rewards,
+            (np.broadcast_to(episodes, vault_ids.shape)[on_vault], vault_ids[on_vault]),
+            self.owned_rewards[on_vault],
+        )
+        self.owned_rewards[on_vault] = 0
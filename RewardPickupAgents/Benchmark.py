@@ -0,0 +1,313 @@
+# Description: 大きさの異なる人工マップを生成し、ユーティリティ関数や1ステップの計算時間を計測するモジュール
+import os
+import platform
+import random
+import subprocess
+import tempfile
+import time
+import numpy as np
+from dataclasses import dataclass
+from typing import List, Dict, Union, Tuple, Callable
+
+from .World import World, Node
+from .parameter import *
+from .Profiler import summarize_durations
+from .Simulator import SimulationConfig, Simulator
+from .BatchRunner import load_planner_class
+from .GIFMaker.StreamingGIFMaker import StreamingGIFMaker
+from .PathPlanner.util import get_astar_path
+
+BENCHMARK_REPORT_VERSION = 1
+# 計測するマップの大きさ(一辺のセル数)とエージェント数の組
+BENCHMARK_SCALES: List[Tuple[int, int]] = [(9, 4), (32, 16), (64, 40), (128, 100), (256, 250), (512, 500)]
+# 計測する項目
+BENCHMARK_NAMES = [
+    "get_astar_path",
+    "get_nearest_node_has_reward",
+    "update_reward",
+    "step_RandomWalk",
+    "step_AStarPath",
+    "gif_frame",
+]
+# 人工マップで1ステップあたりに出現する報酬の数の期待値 (エージェント1体あたり)
+REWARDS_PER_AGENT_PER_STEP = 0.05
+
+
+@dataclass
+class BenchmarkMap:
+    """生成した人工マップの情報"""
+
+    size: int
+    agents_count: int
+    obstacle_file: str
+    reward_probability_file: str
+
+
+def generate_obstacle_cells(size: int, agents_count: int, vaults_count: int, seed: int = 0) -> np.ndarray:
+    """棚のような障害物が並ぶ倉庫型のマップを生成する関数
+
+    4行ごとに幅2の通路を、6列ごとに幅2の通路を残して障害物の塊を置くため、通行可能なセルは全て連結になる
+    エージェントと保管庫は通行可能なセルにランダムに配置する
+
+    Args:
+        size (int): マップの一辺のセル数
+        agents_count (int): エージェントの数
+        vaults_count (int): 保管庫の数
+        seed (int): 配置に使う乱数のシード
+
+    Returns:
+        np.ndarray: (size, size)の文字の配列 (MAP_STATEの値)
+    """
+    xs, ys = np.meshgrid(np.arange(size), np.arange(size), indexing="ij")
+    shelf = (xs % 4 >= 2) & (ys % 6 >= 2) & (xs < size - 1) & (ys < size - 1)
+    cells = np.where(shelf, MAP_STATE.OBSTACLE, MAP_STATE.PASS_POINT)
+    free_nodes = np.argwhere(~shelf)
+    if agents_count + vaults_count > len(free_nodes):
+        raise ValueError(
+            "Too many agents and vaults ({}) for a {}x{} map".format(agents_count + vaults_count, size, size)
+        )
+    rng = np.random.default_rng(seed)
+    chosen = free_nodes[rng.choice(len(free_nodes), agents_count + vaults_count, replace=False)]
+    cells[chosen[:agents_count, 0], chosen[:agents_count, 1]] = MAP_STATE.AGENT
+    cells[chosen[agents_count:, 0], chosen[agents_count:, 1]] = MAP_STATE.VAULT
+    return cells
+
+
+def generate_benchmark_map(size: int, agents_count: int, map_dir: str, seed: int = 0) -> BenchmarkMap:
+    """人工マップを生成し、obstacle_data/obstacle1.csvと同じ形式のcsvファイルに保存する関数
+
+    保管庫はエージェント8体につき1つ置き、報酬の出現確率は1ステップあたりに出現する報酬の数の期待値が
+    エージェント数 * REWARDS_PER_AGENT_PER_STEPとなるように決める
+
+    Args:
+        size (int): マップの一辺のセル数
+        agents_count (int): エージェントの数
+        map_dir (str): csvファイルを保存するディレクトリ
+        seed (int): 生成に使う乱数のシード
+
+    Returns:
+        BenchmarkMap: 生成したマップの情報
+    """
+    vaults_count = max(1, agents_count // 8)
+    cells = generate_obstacle_cells(size, agents_count, vaults_count, seed)
+    passable = cells != MAP_STATE.OBSTACLE
+    mean_probability = agents_count * REWARDS_PER_AGENT_PER_STEP / passable.sum()
+    rng = np.random.default_rng(seed)
+    # 平均がmean_probabilityとなるように、0からその2倍までの一様分布から選ぶ
+    probability = np.where(passable, rng.random(cells.shape) * 2 * mean_probability, 0.0)
+
+    os.makedirs(map_dir, exist_ok=True)
+    name = "bench_{}x{}_a{}_s{}".format(size, size, agents_count, seed)
+    obstacle_file = os.path.join(map_dir, name + "_obstacle.csv")
+    reward_probability_file = os.path.join(map_dir, name + "_reward.csv")
+    with open(obstacle_file, "w") as f:
+        f.write("\n".join(",".join(row) for row in cells))
+    with open(reward_probability_file, "w") as f:
+        f.write("\n".join(",".join(repr(float(value)) for value in row) for row in probability) + "\n")
+    return BenchmarkMap(size, agents_count, obstacle_file, reward_probability_file)
+
+
+def time_calls(function: Callable[[], object], repeats: int) -> Dict[str, float]:
+    """関数をrepeats回呼び出し、1回あたりの実時間を集計する関数
+
+    Args:
+        function (Callable[[], object]): 計測する関数
+        repeats (int): 呼び出す回数
+
+    Returns:
+        Dict[str, float]: 集計結果(秒) (summarize_durationsを参照)
+    """
+    durations: List[float] = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        function()
+        durations.append(time.perf_counter() - start)
+    return summarize_durations(durations)
+
+
+def _load_world(benchmark_map: BenchmarkMap, seed: int, warmup_steps: int) -> World:
+    world = World(None, None, benchmark_map.obstacle_file, benchmark_map.reward_probability_file, seed)
+    for _ in range(warmup_steps):
+        world.update_reward()
+    return world
+
+
+def _get_random_free_nodes(world: World, count: int, rng: np.random.Generator) -> List[Node]:
+    free_nodes = np.argwhere(world.get_obstacle_data() != 1)
+    return [Node(int(x), int(y)) for x, y in free_nodes[rng.integers(len(free_nodes), size=count)]]
+
+
+def _benchmark_astar_path(benchmark_map: BenchmarkMap, repeats: int, steps: int, seed: int) -> Dict[str, float]:
+    world = _load_world(benchmark_map, seed, 0)
+    nodes = iter(_get_random_free_nodes(world, 2 * repeats, np.random.default_rng(seed)))
+    return time_calls(lambda: get_astar_path(world, next(nodes), next(nodes)), repeats)
+
+
+def _benchmark_nearest_reward(benchmark_map: BenchmarkMap, repeats: int, steps: int, seed: int) -> Dict[str, float]:
+    world = _load_world(benchmark_map, seed, steps)
+    nodes = iter(_get_random_free_nodes(world, repeats, np.random.default_rng(seed)))
+    return time_calls(lambda: world.get_nearest_node_has_reward(next(nodes)), repeats)
+
+
+def _benchmark_update_reward(benchmark_map: BenchmarkMap, repeats: int, steps: int, seed: int) -> Dict[str, float]:
+    world = _load_world(benchmark_map, seed, 0)
+    return time_calls(world.update_reward, repeats)
+
+
+def _benchmark_step(planner: str) -> Callable[[BenchmarkMap, int, int, int], Dict[str, float]]:
+    def benchmark(benchmark_map: BenchmarkMap, repeats: int, steps: int, seed: int) -> Dict[str, float]:
+        config = SimulationConfig(
+            map_width=None,
+            map_height=None,
+            obstacle_file=benchmark_map.obstacle_file,
+            reward_probability_file=benchmark_map.reward_probability_file,
+            seed=seed,
+            print_map_in_terminal=False,
+            create_gif=False,
+            trace_path=None,
+            profile_report_path=None,
+            profile_planner=False,
+        )
+        simulator = Simulator(config, load_planner_class(planner))
+        random.seed(seed)
+        np.random.seed(seed)
+        return time_calls(simulator.step, steps)
+
+    return benchmark
+
+
+def _benchmark_gif_frame(benchmark_map: BenchmarkMap, repeats: int, steps: int, seed: int) -> Dict[str, float]:
+    world = _load_world(benchmark_map, seed, steps)
+    # 大きなマップでも画像が一辺1024px程度に収まるようにセルの大きさを決める
+    cell_size = min(24, max(2, 1024 // benchmark_map.size))
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        gif_maker = StreamingGIFMaker(
+            world.get_obstacle_data(),
+            world.get_agents_count(),
+            world.get_vaults_count(),
+            os.path.join(tmp_dir, "benchmark.gif"),
+            cell_size,
+        )
+        reward_array = world.get_reward_array()
+        agents = world.get_agents_pos_dict()
+        vaults = world.get_vaults_pos_dict()
+        summary = time_calls(lambda: gif_maker.update(0, 0, reward_array, agents, vaults), steps)
+        gif_maker.file.close()
+    return summary
+
+
+BENCHMARKS: Dict[str, Callable[[BenchmarkMap, int, int, int], Dict[str, float]]] = {
+    "get_astar_path": _benchmark_astar_path,
+    "get_nearest_node_has_reward": _benchmark_nearest_reward,
+    "update_reward": _benchmark_update_reward,
+    "step_RandomWalk": _benchmark_step("RandomWalk"),
+    "step_AStarPath": _benchmark_step("AStarPath"),
+    "gif_frame": _benchmark_gif_frame,
+}
+
+
+def get_environment_metadata() -> Dict[str, Union[str, None]]:
+    """計測した環境(コミット, Python, NumPyのバージョンなど)の情報を取得する関数
+
+    Returns:
+        Dict[str, Union[str, None]]: 環境の情報, gitリポジトリでない場合のコミットはNone
+    """
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "commit": commit,
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "processor": platform.processor(),
+    }
+
+
+def run_benchmarks(
+    scales: List[Tuple[int, int]] = BENCHMARK_SCALES,
+    names: List[str] = BENCHMARK_NAMES,
+    repeats: int = 100,
+    steps: int = 10,
+    map_dir: Union[str, None] = None,
+    seed: int = 0,
+    verbose: bool = False,
+) -> Dict:
+    """人工マップを生成し、指定した項目の計算時間を計測する関数
+
+    関数単位の項目(get_astar_path, get_nearest_node_has_reward, update_reward)はrepeats回、
+    1ステップと描画の項目(step_*, gif_frame)はsteps回計測する
+    get_nearest_node_has_rewardとgif_frameは、報酬をstepsステップ分出現させた状態で計測する
+
+    Args:
+        scales (List[Tuple[int, int]]): マップの一辺のセル数とエージェント数の組のリスト
+        names (List[str]): 計測する項目のリスト (BENCHMARK_NAMESを参照)
+        repeats (int): 関数単位の項目を計測する回数
+        steps (int): 1ステップと描画の項目を計測する回数
+        map_dir (Union[str, None]): 人工マップを保存するディレクトリ, Noneの場合はCACHE_DIRの下(CACHE_DIRが空の場合は一時ディレクトリ)
+        seed (int): マップの生成と報酬の出現に使う乱数のシード
+        verbose (bool): 計測した項目ごとに結果を表示するかどうか
+
+    Returns:
+        Dict: 環境の情報("metadata")と、項目・マップごとの1回あたりの実時間の集計結果("results")
+    """
+    unknown_names = [name for name in names if name not in BENCHMARKS]
+    if len(unknown_names) > 0:
+        raise ValueError("Unknown benchmarks: {}".format(", ".join(unknown_names)))
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        if map_dir is None:
+            map_dir = os.path.join(CACHE_DIR, "benchmark_maps") if CACHE_DIR else tmp_dir
+        results = []
+        for size, agents_count in scales:
+            benchmark_map = generate_benchmark_map(size, agents_count, map_dir, seed)
+            for name in names:
+                summary = BENCHMARKS[name](benchmark_map, repeats, steps, seed)
+                results.append({"benchmark": name, "size": size, "agents": agents_count, "wall": summary})
+                if verbose:
+                    print(format_result(results[-1]))
+    return {"version": BENCHMARK_REPORT_VERSION, "metadata": get_environment_metadata(), "results": results}
+
+
+def format_result(result: Dict, baseline: Union[Dict, None] = None) -> str:
+    """計測結果を1行の文字列にする関数
+
+    Args:
+        result (Dict): run_benchmarksの"results"の要素
+        baseline (Union[Dict, None]): 比較する過去の計測結果, 指定した場合はp50の比を加える
+
+    Returns:
+        str: 項目名, マップの大きさ, エージェント数, p50, p95, 最大値(ms)
+    """
+    wall = result["wall"]
+    text = "{:<28} {:>4}x{:<4} agents={:<4} p50={:9.3f}ms p95={:9.3f}ms max={:9.3f}ms".format(
+        result["benchmark"],
+        result["size"],
+        result["size"],
+        result["agents"],
+        wall["p50"] * 1000,
+        wall["p95"] * 1000,
+        wall["max"] * 1000,
+    )
+    if baseline is not None and baseline["wall"]["p50"] > 0:
+        text += " ({:.2f}x baseline)".format(wall["p50"] / baseline["wall"]["p50"])
+    return text
+
+
+def compare_reports(report: Dict, baseline_report: Dict) -> List[str]:
+    """2つの計測結果を、項目・マップの大きさ・エージェント数が同じものどうしで比較する関数
+
+    Args:
+        report (Dict): 今回の計測結果
+        baseline_report (Dict): 比較する過去の計測結果
+
+    Returns:
+        List[str]: 今回の計測結果の各行に、過去の結果に対するp50の比を加えた文字列のリスト
+    """
+    baselines = {
+        (result["benchmark"], result["size"], result["agents"]): result for result in baseline_report["results"]
+    }
+    return [
+        format_result(result, baselines.get((result["benchmark"], result["size"], result["agents"])))
+        for result in report["results"]
+    ]
@@ -0,0 +1,303 @@
+# Description: 静的な障害物配置に対するBFS距離場と全点対間の最短距離表を扱うモジュール
+import os
+import numpy as np
+from typing import List, Union, Tuple
+
+# 行動のインデックスに対応する移動量 (0, 1), (0, -1), (1, 0), (-1, 0), (0, 0)
+ACTION_DELTAS = np.array([[0, 1], [0, -1], [1, 0], [-1, 0], [0, 0]], dtype=np.int64)
+STAY_ACTION_INDEX = 4
+
+
+def _propagate_distance(
+    distance: np.ndarray, frontier: np.ndarray, passable: np.ndarray, max_distance: Union[int, None]
+) -> np.ndarray:
+    """距離0の始点を書き込んだ距離場を、配列のシフトで幅優先に広げる関数
+
+    distanceとfrontierの末尾の2次元が(width, height)に対応する
+    """
+    step = 0
+    expanded = np.empty_like(frontier)
+    while frontier.any():
+        step += 1
+        if max_distance is not None and step > max_distance:
+            break
+        expanded[:] = False
+        expanded[..., 1:, :] |= frontier[..., :-1, :]
+        expanded[..., :-1, :] |= frontier[..., 1:, :]
+        expanded[..., :, 1:] |= frontier[..., :, :-1]
+        expanded[..., :, :-1] |= frontier[..., :, 1:]
+        expanded &= passable
+        expanded &= distance < 0
+        distance[expanded] = step
+        frontier, expanded = expanded, frontier
+    return distance
+
+
+def compute_distance_fields(
+    passable: np.ndarray, sources: np.ndarray, max_distance: Union[int, None] = None
+) -> np.ndarray:
+    """複数の始点からのBFS距離場を配列のシフトでまとめて計算する関数
+
+    Args:
+        passable (np.ndarray): 通行可能なセルをTrueとする(width, height)の配列
+        sources (np.ndarray): 始点の座標を並べた(K, 2)の整数配列
+        max_distance (Union[int, None]): 探索を打ち切る距離, Noneの場合は打ち切らない
+
+    Returns:
+        np.ndarray: (K, width, height)の距離場, 到達できないセルは-1
+    """
+    width, height = passable.shape
+    sources = np.asarray(sources, dtype=np.int64).reshape(-1, 2)
+    count = sources.shape[0]
+    distance = np.full((count, width, height), -1, dtype=np.int32)
+    frontier = np.zeros((count, width, height), dtype=bool)
+    index = np.arange(count)
+    valid = passable[sources[:, 0], sources[:, 1]]
+    frontier[index[valid], sources[valid, 0], sources[valid, 1]] = True
+    distance[frontier] = 0
+    return _propagate_distance(distance, frontier, passable, max_distance)
+
+
+def compute_nearest_distance_field(
+    passable: np.ndarray, sources: np.ndarray, max_distance: Union[int, None] = None
+) -> np.ndarray:
+    """複数の始点のうち最も近いものまでのBFS距離場を計算する関数
+
+    Args:
+        passable (np.ndarray): 通行可能なセルをTrueとする(width, height)の配列
+        sources (np.ndarray): 始点の座標を並べた(K, 2)の整数配列
+        max_distance (Union[int, None]): 探索を打ち切る距離, Noneの場合は打ち切らない
+
+    Returns:
+        np.ndarray: (width, height)の距離場, 到達できないセルは-1
+    """
+    sources = np.asarray(sources, dtype=np.int64).reshape(-1, 2)
+    distance = np.full(passable.shape, -1, dtype=np.int32)
+    frontier = np.zeros(passable.shape, dtype=bool)
+    frontier[sources[:, 0], sources[:, 1]] = True
+    frontier &= passable
+    distance[frontier] = 0
+    return _propagate_distance(distance, frontier, passable, max_distance)
+
+
+def compute_valid_action_mask(passable: np.ndarray) -> np.ndarray:
+    """各セルで取れる行動(移動先が環境内にあり障害物でない行動)を求める関数
+
+    Args:
+        passable (np.ndarray): 通行可能なセルをTrueとする(width, height)の配列
+
+    Returns:
+        np.ndarray: (width, height, 5)のbool配列, [x, y, i]はNode(x, y)でACTION_DELTAS[i]の行動を取れる場合にTrue
+    """
+    padded = np.pad(passable, 1, constant_values=False)
+    width, height = passable.shape
+    valid = np.empty((width, height, len(ACTION_DELTAS)), dtype=bool)
+    for action_index, (dx, dy) in enumerate(ACTION_DELTAS):
+        valid[:, :, action_index] = padded[1 + dx : 1 + dx + width, 1 + dy : 1 + dy + height]
+    valid &= passable[:, :, None]
+    return valid
+
+
+def compute_adjacency(passable: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """各セルの上下左右の通行可能なセルをCSR形式の隣接リストにまとめる関数
+
+    セルID(x * height + y)がcellのセルの隣接セルは、indices[indptr[cell] : indptr[cell + 1]]に
+    ACTION_DELTASの順(その場に留まる行動を除く)で並ぶ (通行できないセルについても隣接する通行可能なセルを持つ)
+
+    Args:
+        passable (np.ndarray): 通行可能なセルをTrueとする(width, height)の配列
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: (セル数 + 1,)のindptrと、(隣接するセルの組の数,)のindices
+    """
+    width, height = passable.shape
+    padded = np.pad(passable, 1, constant_values=False)
+    cell_ids = np.arange(width * height, dtype=np.int64).reshape(width, height)
+    moves = ACTION_DELTAS[:STAY_ACTION_INDEX]
+    neighbor_mask = np.empty((width, height, len(moves)), dtype=bool)
+    neighbor_cells = np.empty((width, height, len(moves)), dtype=np.int64)
+    for action_index, (dx, dy) in enumerate(moves):
+        neighbor_mask[:, :, action_index] = padded[1 + dx : 1 + dx + width, 1 + dy : 1 + dy + height]
+        neighbor_cells[:, :, action_index] = cell_ids + dx * height + dy
+    neighbor_mask = neighbor_mask.reshape(width * height, len(moves))
+    indptr = np.zeros(width * height + 1, dtype=np.int64)
+    np.cumsum(neighbor_mask.sum(axis=1), out=indptr[1:])
+    indices = neighbor_cells.reshape(width * height, len(moves))[neighbor_mask]
+    return indptr, indices
+
+
+def compute_valid_action_bits(passable: np.ndarray) -> np.ndarray:
+    """各セルで取れる行動をビットマスクにまとめる関数
+
+    Args:
+        passable (np.ndarray): 通行可能なセルをTrueとする(width, height)の配列
+
+    Returns:
+        np.ndarray: (セル数,)のuint8配列, ビットiはそのセルでACTION_DELTAS[i]の行動を取れる場合に1
+    """
+    valid_action_mask = compute_valid_action_mask(passable).reshape(passable.size, len(ACTION_DELTAS))
+    return (valid_action_mask << np.arange(len(ACTION_DELTAS), dtype=np.uint8)).sum(axis=1, dtype=np.uint8)
+
+
+def compute_expected_yield(
+    passable: np.ndarray, reward_probability: np.ndarray, horizon: int, discount: float, chunk_size: int = 4096
+) -> np.ndarray:
+    """各セルからhorizonステップ以内に到達できるセルの報酬の出現確率を、距離で割り引いて足し合わせる関数
+
+    [x, y]の値は、Node(x, y)から最短距離dにあるセルの出現確率をdiscount ** d倍して合計したもの
+    各セルを中心とする(2 * horizon + 1)四方の窓の中でBFSを行い、窓の配列をまとめて計算する
+
+    Args:
+        passable (np.ndarray): 通行可能なセルをTrueとする(width, height)の配列
+        reward_probability (np.ndarray): (width, height)の報酬の出現確率
+        horizon (int): 考慮する最大の距離
+        discount (float): 1ステップあたりの割引率
+        chunk_size (int): 一度に計算するセルの数 (一時配列のメモリを抑えるため)
+
+    Returns:
+        np.ndarray: (width, height)の期待報酬, 通行できないセルは0
+    """
+    width, height = passable.shape
+    window = 2 * horizon + 1
+    # 窓がマップの外にはみ出す部分は通行できないセルとして扱う
+    padded_passable = np.pad(passable, horizon, constant_values=False)
+    padded_probability = np.pad(np.where(passable, reward_probability, 0.0), horizon)
+    passable_windows = np.lib.stride_tricks.sliding_window_view(padded_passable, (window, window))
+    probability_windows = np.lib.stride_tricks.sliding_window_view(padded_probability, (window, window))
+    discounts = discount ** np.arange(horizon + 1)
+
+    expected_yield = np.zeros((width, height))
+    sources = np.argwhere(passable)
+    for begin in range(0, len(sources), chunk_size):
+        xs, ys = sources[begin : begin + chunk_size].T
+        chunk_passable = passable_windows[xs, ys]
+        distance = np.full(chunk_passable.shape, -1, dtype=np.int32)
+        frontier = np.zeros(chunk_passable.shape, dtype=bool)
+        frontier[:, horizon, horizon] = True
+        distance[frontier] = 0
+        _propagate_distance(distance, frontier, chunk_passable, horizon)
+        weights = np.where(distance >= 0, discounts[np.maximum(distance, 0)], 0.0)
+        expected_yield[xs, ys] = (weights * probability_windows[xs, ys]).sum(axis=(1, 2))
+    return expected_yield
+
+
+class DistanceTable:
+    """全点対間の最短距離と次の一手を保持する表
+
+    セルID(x * height + y)を行・列とする密な行列で保持するため、
+    メモリ使用量はセル数の2乗に比例する
+
+    Args:
+        distance_matrix (np.ndarray): (セル数, セル数)の最短距離, 到達できない場合は-1
+        next_action_matrix (np.ndarray): (セル数, セル数)の次の行動のインデックス, 到達できない場合は-1
+    """
+
+    # 一度に距離場を計算する始点の数 (一時配列のメモリを抑えるため)
+    CHUNK_SIZE = 256
+
+    def __init__(self, distance_matrix: np.ndarray, next_action_matrix: np.ndarray):
+        self.distance_matrix = distance_matrix
+        self.next_action_matrix = next_action_matrix
+
+    @classmethod
+    def build(cls, obstacle_array: np.ndarray, max_cells: Union[int, None] = None) -> "DistanceTable":
+        """障害物の配置から距離表を構築するメソッド
+
+        Args:
+            obstacle_array (np.ndarray): 障害物のデータ
+            max_cells (Union[int, None]): 構築を許すセル数の上限, Noneの場合は上限なし
+
+        Returns:
+            DistanceTable: 構築した距離表
+        """
+        width, height = obstacle_array.shape
+        cells_count = width * height
+        if max_cells is not None and cells_count > max_cells:
+            raise ValueError(
+                "The map has {} cells, which exceeds the distance table limit of {} cells".format(
+                    cells_count, max_cells
+                )
+            )
+        passable = obstacle_array != 1
+
+        # 通行可能なセルそれぞれを始点にBFSを行う
+        distance_matrix = np.full((cells_count, cells_count), -1, dtype=np.int32)
+        sources = np.argwhere(passable)
+        for begin in range(0, len(sources), cls.CHUNK_SIZE):
+            chunk = sources[begin : begin + cls.CHUNK_SIZE]
+            fields = compute_distance_fields(passable, chunk)
+            distance_matrix[chunk[:, 0] * height + chunk[:, 1]] = fields.reshape(len(chunk), cells_count)
+
+        # 隣接セルの方が目的地に1だけ近ければ、その方向が次の一手になる
+        # (一時配列が行列全体の大きさにならないよう、CHUNK_SIZE行ずつ求める)
+        next_action_matrix = np.full((cells_count, cells_count), -1, dtype=np.int8)
+        xs, ys = np.divmod(np.arange(cells_count), height)
+        for begin in range(0, cells_count, cls.CHUNK_SIZE):
+            end = min(begin + cls.CHUNK_SIZE, cells_count)
+            chunk_distance = distance_matrix[begin:end]
+            chunk_next_action = next_action_matrix[begin:end]
+            for action_index, (dx, dy) in enumerate(ACTION_DELTAS[:STAY_ACTION_INDEX]):
+                nx, ny = xs[begin:end] + dx, ys[begin:end] + dy
+                in_environment = (0 <= nx) & (nx < width) & (0 <= ny) & (ny < height)
+                from_rows = np.nonzero(in_environment)[0]
+                to_cells = nx[from_rows] * height + ny[from_rows]
+                from_distance = chunk_distance[from_rows]
+                closer = distance_matrix[to_cells] == from_distance - 1
+                closer &= from_distance > 0
+                closer &= chunk_next_action[from_rows] < 0
+                rows, cols = np.nonzero(closer)
+                chunk_next_action[from_rows[rows], cols] = action_index
+            chunk_next_action[chunk_distance == 0] = STAY_ACTION_INDEX
+        return cls(distance_matrix, next_action_matrix)
+
+    @classmethod
+    def load_or_build(
+        cls, obstacle_array: np.ndarray, cache_path: Union[str, None], max_cells: Union[int, None] = None
+    ) -> "DistanceTable":
+        """キャッシュがあれば読み込み、なければ構築して保存するメソッド
+
+        Args:
+            obstacle_array (np.ndarray): 障害物のデータ
+            cache_path (Union[str, None]): キャッシュファイルのパス, Noneの場合はキャッシュしない
+            max_cells (Union[int, None]): 構築を許すセル数の上限, Noneの場合は上限なし
+
+        Returns:
+            DistanceTable: 距離表
+        """
+        cells_count = obstacle_array.size
+        if cache_path is not None and os.path.exists(cache_path):
+            with np.load(cache_path) as data:
+                if data["distance_matrix"].shape == (cells_count, cells_count):
+                    return cls(data["distance_matrix"], data["next_action_matrix"])
+        table = cls.build(obstacle_array, max_cells)
+        if cache_path is not None:
+            os.makedirs(os.path.dirname(cache_path) or ".", exist_ok=True)
+            # 書き込み途中のファイルを読まないように一時ファイルから置き換える
+            tmp_path = cache_path + ".tmp.npz"
+            np.savez(tmp_path, distance_matrix=table.distance_matrix, next_action_matrix=table.next_action_matrix)
+            os.replace(tmp_path, cache_path)
+        return table
+
+    def get_distance(self, cell1: int, cell2: int) -> int:
+        """2セル間の最短距離を取得するメソッド
+
+        Args:
+            cell1 (int): セルID1
+            cell2 (int): セルID2
+
+        Returns:
+            int: 最短距離、経路が存在しない場合は-1
+        """
+        return int(self.distance_matrix[cell1, cell2])
+
+    def get_next_action_index(self, cell: int, goal_cell: int) -> int:
+        """目的のセルに向かうための次の行動のインデックスを取得するメソッド
+
+        Args:
+            cell (int): 現在のセルID
+            goal_cell (int): 目的のセルID
+
+        Returns:
+            int: 行動のインデックス(ACTION_DELTASの行), 到達できない場合は-1
+        """
+        return int(self.next_action_matrix[cell, goal_cell])
@@ -0,0 +1,212 @@
+import io
+import os
+import struct
+import numpy as np
+from typing import List, Dict, Union, Tuple
+
+# パレットのインデックス (フレームは各ピクセルにパレットのインデックスを持つuint8の配列として描画する)
+WHITE, BLACK, GRID, ORANGE = 0, 1, 2, 3
+AGENT_COLORS_OFFSET = 4
+PALETTE: List[Tuple[int, int, int]] = [
+    (255, 255, 255),  # 通行可能なノード
+    (0, 0, 0),  # 障害物、保管庫、文字
+    (0, 0, 0),  # セルの枠線
+    (255, 165, 0),  # 報酬
+    # エージェント (GIFMaker.COLORS_CYCLEと同じ色)
+    (255, 0, 0),  # red
+    (0, 0, 255),  # blue
+    (0, 128, 0),  # green
+    (128, 0, 128),  # purple
+    (255, 165, 0),  # orange
+    (0, 255, 255),  # cyan
+    (255, 0, 255),  # magenta
+    (0, 255, 0),  # lime
+    (255, 192, 203),  # pink
+]
+AGENT_COLORS_COUNT = len(PALETTE) - AGENT_COLORS_OFFSET
+
+# ステップ数とスコアを書く領域の高さ(px)
+HEADER_HEIGHT = 16
+
+
+class StreamingGIFMaker:
+    """フレームを逐次ファイルに書き出すGIFアニメーションの作成クラス
+
+    障害物の層は最初に一度だけ描画し、各フレームではその上に報酬・保管庫・エージェントを重ねる
+    フレームは作られた時点でファイルに書き出すため、ステップ数によらずメモリ使用量は一定になる
+
+    Args:
+        obstacle_data (np.ndarray): 障害物のデータ
+        agents_count (int): エージェントの数
+        vaults_count (int): 保管庫の数
+        gif_path (str): GIFファイルの保存先
+        cell_size (int): 1セルの大きさ(px)
+        frame_duration (int): 1フレームの表示時間(ms)
+    """
+
+    def __init__(
+        self,
+        obstacle_data: np.ndarray,
+        agents_count: int,
+        vaults_count: int,
+        gif_path: str,
+        cell_size: int = 24,
+        frame_duration: int = 1000,
+    ):
+        # GIFを作成しない場合に読み込みコストを払わないよう、ここで読み込む
+        from PIL import Image, ImageDraw
+
+        self.Image = Image
+        self.ImageDraw = ImageDraw
+        self.agents_count = agents_count
+        self.vaults_count = vaults_count
+        self.gif_path = gif_path
+        self.cell_size = cell_size
+        self.frame_delay = max(1, round(frame_duration / 10))
+        self.map_width, self.map_height = obstacle_data.shape
+        self.image_width = self.map_width * cell_size
+        self.image_height = HEADER_HEIGHT + self.map_height * cell_size
+
+        self.__create_sprites()
+        self.__draw_static_layer(obstacle_data)
+        self.frame = np.empty_like(self.static_layer)
+        self.frames_count = 0
+
+        os.makedirs(os.path.dirname(gif_path) or ".", exist_ok=True)
+        self.file = open(gif_path, "wb")
+        self.__write_header()
+
+    def __create_sprites(self):
+        size = self.cell_size
+        margin = size * 0.05
+
+        def rasterize(draw_function) -> np.ndarray:
+            image = self.Image.new("L", (size, size), 0)
+            draw_function(self.ImageDraw.Draw(image))
+            return np.asarray(image) > 0
+
+        self.agent_sprite = rasterize(lambda draw: draw.ellipse([margin, margin, size - margin, size - margin], fill=1))
+        center = (size - 1) / 2
+        self.vault_sprite = rasterize(
+            lambda draw: draw.polygon(
+                [(center, 0), (size - 1, center), (center, size - 1), (0, center)],
+                fill=1,
+            )
+        )
+        angles = np.pi / 2 + np.arange(10) * np.pi / 5
+        radii = np.where(np.arange(10) % 2 == 0, size * 0.45, size * 0.18)
+        star_points = [(center + r * np.cos(a), center - r * np.sin(a)) for r, a in zip(radii, angles)]
+        self.reward_sprite = rasterize(lambda draw: draw.polygon(star_points, fill=1))
+
+    def __draw_static_layer(self, obstacle_data: np.ndarray):
+        size = self.cell_size
+        self.static_layer = np.full((self.image_height, self.image_width), WHITE, dtype=np.uint8)
+        map_layer = self.__get_cells_view(self.static_layer)
+        # ノード(x, y)は横にx番目、縦にy番目のセルとして描画する
+        map_layer[(obstacle_data == 1).T] = BLACK
+        map_area = self.static_layer[HEADER_HEIGHT:]
+        map_area[::size, :] = GRID
+        map_area[size - 1 :: size, :] = GRID
+        map_area[:, ::size] = GRID
+        map_area[:, size - 1 :: size] = GRID
+
+    def __get_cells_view(self, image: np.ndarray) -> np.ndarray:
+        """画像のマップ部分を(縦のセル数, 横のセル数, セルの縦px, セルの横px)として見るビューを返す"""
+        size = self.cell_size
+        map_area = image[HEADER_HEIGHT:]
+        return map_area.reshape(self.map_height, size, self.map_width, size).transpose(0, 2, 1, 3)
+
+    def __blit(self, sprite: np.ndarray, color: int, x: int, y: int):
+        size = self.cell_size
+        top = HEADER_HEIGHT + y * size
+        cell = self.frame[top : top + size, x * size : (x + 1) * size]
+        cell[sprite] = color
+
+    def __write_header(self):
+        self.file.write(b"GIF89a")
+        # 色はフレームごとのローカルカラーテーブルで持つため、グローバルカラーテーブルは持たない
+        self.file.write(struct.pack("<HHBBB", self.image_width, self.image_height, 0, 0, 0))
+        # NETSCAPE2.0拡張 (繰り返し再生)
+        self.file.write(b"\x21\xff\x0bNETSCAPE2.0\x03\x01" + struct.pack("<H", 0) + b"\x00")
+
+    def __write_frame(self):
+        image = self.Image.fromarray(self.frame)
+        image.putpalette([value for color in PALETTE for value in color])
+        buffer = io.BytesIO()
+        image.save(buffer, format="GIF")
+        data = buffer.getvalue()
+
+        # 1フレームだけのGIFから、カラーテーブルと画像データを取り出す
+        packed = data[10]
+        position = 13
+        color_table = b""
+        color_table_bits = 0
+        if packed & 0x80:
+            color_table_bits = packed & 0x07
+            color_table_size = 3 * (2 ** (color_table_bits + 1))
+            color_table = data[position : position + color_table_size]
+            position += color_table_size
+        while data[position] == 0x21:
+            position += 2
+            while data[position] != 0:
+                position += data[position] + 1
+            position += 1
+        if data[position] != 0x2C:
+            raise ValueError("Unexpected GIF block: {}".format(data[position]))
+        descriptor = bytearray(data[position : position + 10])
+        # 末尾のトレイラー(0x3B)は除く
+        image_data = data[position + 10 : -1]
+        if color_table and not descriptor[9] & 0x80:
+            # グローバルカラーテーブルをローカルカラーテーブルとして付け替える
+            descriptor[9] |= 0x80 | color_table_bits
+        else:
+            color_table = b""
+
+        # Graphic Control Extension (表示時間)
+        self.file.write(b"\x21\xf9\x04\x00" + struct.pack("<H", self.frame_delay) + b"\x00\x00")
+        self.file.write(bytes(descriptor))
+        self.file.write(color_table)
+        self.file.write(image_data)
+        self.frames_count += 1
+
+    def update(
+        self, step: int, score: int, reward_data: np.ndarray, agents: Dict[int, List[int]], vaults: Dict[int, List[int]]
+    ):
+        np.copyto(self.frame, self.static_layer)
+        cells = self.__get_cells_view(self.frame)
+        reward_cells = cells[(reward_data > 0).T]
+        reward_cells[:, self.reward_sprite] = ORANGE
+        cells[(reward_data > 0).T] = reward_cells
+        for i in range(self.vaults_count):
+            self.__blit(self.vault_sprite, BLACK, vaults[i][0], vaults[i][1])
+        for i in range(self.agents_count):
+            color = AGENT_COLORS_OFFSET + i % AGENT_COLORS_COUNT
+            self.__blit(self.agent_sprite, color, agents[i][0], agents[i][1])
+
+        # 現在のステップを書く
+        header = self.Image.fromarray(self.frame[:HEADER_HEIGHT])
+        draw = self.ImageDraw.Draw(header)
+        # パレットのインデックスを直接書き込むため、アンチエイリアスを無効にする
+        draw.fontmode = "1"
+        draw.text((2, 2), "Step: {}, Score: {}".format(step, score), fill=BLACK)
+        self.frame[:HEADER_HEIGHT] = np.asarray(header)
+        self.__write_frame()
+
+    def save_gif(self, gif_path: Union[str, None] = None):
+        """GIFファイルを閉じるメソッド
+
+        Args:
+            gif_path (Union[str, None]): 保存先を変更する場合はそのパス
+        """
+        self.close()
+        if gif_path is not None and gif_path != self.gif_path:
+            os.replace(self.gif_path, gif_path)
+            self.gif_path = gif_path
+        print("GIF file is saved at: ", self.gif_path)
+
+    def close(self):
+        """書き出し済みのフレームまででGIFファイルを閉じるメソッド (閉じた後に呼び出しても何もしない)"""
+        if self.file.closed:
+            return
+        self.file.write(b"\x3b")
+        self.file.close()
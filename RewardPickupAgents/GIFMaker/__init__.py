@@ -2,18 +2,27 @@ import numpy as np
 from copy import deepcopy
 from typing import List, Dict, Union, Tuple
 
-import matplotlib.pyplot as plt
-import matplotlib.patches as patches
-import matplotlib.animation as animation
-
+from .StreamingGIFMaker import StreamingGIFMaker
 
 COLORS_CYCLE = ["red", "blue", "green", "purple", "orange", "cyan", "magenta", "lime", "pink"]
 
-fig, ax = plt.subplots(figsize=(6, 6))
-
 
 class GIFMaker:
+    """matplotlibでGIFアニメーションを作成するクラス
+
+    matplotlibはインスタンスを作成したときに初めて読み込まれ、インスタンスごとに個別のFigureを持つ
+    """
+
     def __init__(self, obstacle_data: np.ndarray, agents_count: int, vaults_count: int):
+        # GIFを作成しない場合にmatplotlibの読み込みコストを払わないよう、ここで読み込む
+        import matplotlib.pyplot as plt
+        import matplotlib.patches as patches
+        import matplotlib.animation as animation
+
+        self.plt = plt
+        self.patches = patches
+        self.animation = animation
+        self.fig, self.ax = plt.subplots(figsize=(6, 6))
         self.obstacle_data = obstacle_data
         self.agents_count = agents_count
         self.vaults_count = vaults_count
@@ -21,12 +30,14 @@ class GIFMaker:
         x = np.arange(obstacle_data.shape[1])
         y = np.arange(obstacle_data.shape[0])
         self.X_array, self.Y_array = np.meshgrid(x, y)
-        ax.xaxis.tick_top()
-        ax.invert_yaxis()
+        self.ax.xaxis.tick_top()
+        self.ax.invert_yaxis()
 
     def update(
         self, step: int, score: int, reward_data: np.ndarray, agents: Dict[int, List[int]], vaults: Dict[int, List[int]]
     ):
+        ax = self.ax
+        patches = self.patches
         ax_list = []
         ax_list.append(
             ax.pcolormesh(self.X_array, self.Y_array, self.obstacle_data, cmap="Greys", edgecolors="black", linewidth=1)
@@ -90,7 +101,11 @@ class GIFMaker:
         self.plt_frames.append([*ax_list])
 
     def save_gif(self, gif_path: str):
-        ani = animation.ArtistAnimation(fig, self.plt_frames, interval=1000, repeat=False, blit=False)
+        ani = self.animation.ArtistAnimation(self.fig, self.plt_frames, interval=1000, repeat=False, blit=False)
         ani.save(gif_path, writer="pillow")
-        plt.close()
+        self.close()
         print("GIF file is saved at: ", gif_path)
+
+    def close(self):
+        """GIFを保存せずにFigureを閉じるメソッド (保存後に呼び出しても何もしない)"""
+        self.plt.close(self.fig)
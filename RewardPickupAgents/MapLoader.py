@@ -0,0 +1,167 @@
+# Description: 障害物と報酬の出現確率のcsvファイルを読み込み、解析結果をキャッシュするモジュール
+import hashlib
+import os
+import numpy as np
+from dataclasses import dataclass
+from typing import List, Union, Tuple
+
+from .parameter import *
+from .DistanceTable import compute_expected_yield
+
+MAP_CACHE_VERSION = 2
+
+
+@dataclass
+class MapData:
+    """csvファイルから読み込んだマップの情報
+
+    座標はいずれも(x, y)で、xがcsvの行、yがcsvの列に対応する
+    """
+
+    obstacle_array: np.ndarray
+    reward_probability_array: np.ndarray
+    # エージェントの初期位置 (csvに現れる順)
+    agent_nodes: np.ndarray
+    # 保管庫の位置 (csvに現れる順)
+    vault_nodes: np.ndarray
+    # 障害物のcsvファイルのハッシュ値
+    obstacle_hash: str
+    # 各セルの期待報酬 (近くのセルの報酬の出現確率を距離で割り引いた和)
+    expected_yield_array: np.ndarray
+
+    def get_size(self) -> Tuple[int, int]:
+        return self.obstacle_array.shape
+
+
+def _split_csv(text: str, file_path: str) -> Tuple[List[str], int]:
+    lines = [line.strip() for line in text.splitlines() if line.strip()]
+    if len(lines) == 0:
+        raise ValueError("Empty map file: {}".format(file_path))
+    columns = [line.count(",") + 1 for line in lines]
+    # 1行目に"横幅,縦幅"が書かれている場合は、その値を検証して読み飛ばす
+    if len(lines) > 1 and columns[0] != columns[1] and columns[0] == 2:
+        declared_size = tuple(int(value) for value in lines[0].split(","))
+        lines, columns = lines[1:], columns[1:]
+        if declared_size != (len(lines), columns[0]):
+            raise ValueError(
+                "The size in the header {} does not match the data {} in {}".format(
+                    declared_size, (len(lines), columns[0]), file_path
+                )
+            )
+    if len(set(columns)) != 1:
+        raise ValueError("Rows have different numbers of columns in {}".format(file_path))
+    return lines, columns[0]
+
+
+def parse_obstacle_csv(text: str, file_path: str = "") -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """障害物のcsvを解析する関数
+
+    Args:
+        text (str): csvファイルの内容
+        file_path (str): エラーメッセージに使うファイルのパス
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray, np.ndarray]: 障害物の配列, エージェントの初期位置, 保管庫の位置
+    """
+    lines, columns = _split_csv(text, file_path)
+    cells = np.array(",".join(lines).split(",")).reshape(len(lines), columns)
+    valid = np.isin(cells, [MAP_STATE.OBSTACLE, MAP_STATE.PASS_POINT, MAP_STATE.AGENT, MAP_STATE.VAULT])
+    if not valid.all():
+        invalid_node = tuple(np.argwhere(~valid)[0])
+        raise ValueError("Invalid value in the map. ", cells[invalid_node], file_path, invalid_node)
+    obstacle_array = (cells == MAP_STATE.OBSTACLE).astype(float)
+    return obstacle_array, np.argwhere(cells == MAP_STATE.AGENT), np.argwhere(cells == MAP_STATE.VAULT)
+
+
+def parse_reward_probability_csv(text: str, file_path: str = "") -> np.ndarray:
+    """報酬の出現確率のcsvを解析する関数
+
+    Args:
+        text (str): csvファイルの内容
+        file_path (str): エラーメッセージに使うファイルのパス
+
+    Returns:
+        np.ndarray: 報酬の出現確率の配列
+    """
+    lines, columns = _split_csv(text, file_path)
+    return np.array(",".join(lines).split(","), dtype=float).reshape(len(lines), columns)
+
+
+def load_map_data(
+    obstacle_file: str,
+    reward_probability_file: str,
+    cache_dir: Union[str, None] = CACHE_DIR,
+    yield_horizon: int = EXPECTED_YIELD_HORIZON,
+    yield_discount: float = EXPECTED_YIELD_DISCOUNT,
+) -> MapData:
+    """障害物と報酬の出現確率のcsvファイルを読み込む関数
+
+    解析結果と期待報酬は、2つのファイルの内容と期待報酬のパラメータのハッシュ値をキーとして.npzにキャッシュする
+
+    Args:
+        obstacle_file (str): 障害物の情報を持つcsvファイルのパス
+        reward_probability_file (str): 報酬が出現する確率を持つcsvファイルのパス
+        cache_dir (Union[str, None]): キャッシュを保存するディレクトリ, 空文字かNoneの場合はキャッシュしない
+        yield_horizon (int): 期待報酬で考慮する最大の距離
+        yield_discount (float): 期待報酬の1ステップあたりの割引率
+
+    Returns:
+        MapData: マップの情報
+    """
+    with open(obstacle_file, "rb") as f:
+        obstacle_bytes = f.read()
+    with open(reward_probability_file, "rb") as f:
+        reward_probability_bytes = f.read()
+    obstacle_hash = hashlib.sha256(obstacle_bytes).hexdigest()
+    yield_parameter_bytes = "{},{}".format(yield_horizon, yield_discount).encode("utf-8")
+    map_hash = hashlib.sha256(
+        obstacle_bytes + b"\0" + reward_probability_bytes + b"\0" + yield_parameter_bytes
+    ).hexdigest()
+
+    cache_path = None
+    if cache_dir:
+        cache_path = os.path.join(cache_dir, "map_{}.npz".format(map_hash))
+        if os.path.exists(cache_path):
+            with np.load(cache_path) as data:
+                if int(data["version"]) == MAP_CACHE_VERSION:
+                    return MapData(
+                        data["obstacle_array"],
+                        data["reward_probability_array"],
+                        data["agent_nodes"],
+                        data["vault_nodes"],
+                        obstacle_hash,
+                        data["expected_yield_array"],
+                    )
+
+    obstacle_array, agent_nodes, vault_nodes = parse_obstacle_csv(obstacle_bytes.decode("utf-8"), obstacle_file)
+    reward_probability_array = parse_reward_probability_csv(
+        reward_probability_bytes.decode("utf-8"), reward_probability_file
+    )
+    if obstacle_array.shape != reward_probability_array.shape:
+        raise ValueError(
+            "The obstacle map {} and the reward probability map {} have different sizes".format(
+                obstacle_array.shape, reward_probability_array.shape
+            )
+        )
+    expected_yield_array = compute_expected_yield(
+        obstacle_array != 1, reward_probability_array, yield_horizon, yield_discount
+    )
+    map_data = MapData(
+        obstacle_array, reward_probability_array, agent_nodes, vault_nodes, obstacle_hash, expected_yield_array
+    )
+
+    if cache_path is not None:
+        os.makedirs(cache_dir, exist_ok=True)
+        # 書き込み途中のファイルを読まないように一時ファイルから置き換える
+        tmp_path = cache_path + ".tmp.npz"
+        np.savez(
+            tmp_path,
+            version=MAP_CACHE_VERSION,
+            obstacle_array=obstacle_array,
+            reward_probability_array=reward_probability_array,
+            agent_nodes=agent_nodes,
+            vault_nodes=vault_nodes,
+            expected_yield_array=expected_yield_array,
+        )
+        os.replace(tmp_path, cache_path)
+    return map_data
@@ -0,0 +1,49 @@
+# Description: 全エージェントの移動を同時に行うとみなし、衝突をエージェントの順番によらずにまとめて解決するモジュール
+import numpy as np
+from typing import Tuple
+
+# 衝突の解決方法
+# "sequential": エージェントIDの順に1体ずつ移動し、移動先にエージェントがいれば衝突とする (その場に留まる場合を含む)
+# "simultaneous": 全エージェントが同時に移動するとみなし、頂点衝突と入れ替わり衝突を起こすエージェントを留まらせる
+COLLISION_RESOLUTIONS = ("sequential", "simultaneous")
+
+
+def resolve_simultaneous_moves(
+    current_cells: np.ndarray, target_cells: np.ndarray, occupancy: np.ndarray
+) -> Tuple[np.ndarray, np.ndarray]:
+    """全エージェントが同時に移動するとみなして衝突を解決する関数
+
+    次の衝突を起こす移動をやめさせ(その場に留まらせ)、留まったエージェントのセルに入ろうとする移動も
+    衝突として、衝突がなくなるまで繰り返す (結果はエージェントの順番によらない)
+    - 頂点衝突: 複数のエージェントが同じセルに入ろうとする (留まるエージェントのセルに入ろうとする場合を含む)
+    - 入れ替わり衝突: 2体のエージェントが互いのセルに入れ替わろうとする
+    同じステップに空くセルに続けて入る移動や、3体以上が輪になって回る移動は衝突としない
+
+    セルIDはoccupancyのインデックスであり、複数のエピソードをまとめて解決する場合は
+    エピソードごとにずらしたセルIDとそれに合わせたoccupancyを渡せばよい
+
+    Args:
+        current_cells (np.ndarray): (エージェント数,)の現在のセルID
+        target_cells (np.ndarray): (エージェント数,)の移動先のセルID (留まる場合は現在のセルID)
+        occupancy (np.ndarray): (セル数,)のセルにいるエージェントのインデックス (current_cellsのインデックス, いない場合は-1)
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: (エージェント数,)の移動後のセルIDと、衝突して留まったエージェントをTrueとするbool配列
+    """
+    current_cells = np.asarray(current_cells, dtype=np.int64)
+    resolved_cells = np.array(target_cells, dtype=np.int64)
+    agent_indices = np.arange(len(current_cells))
+    blocked = np.zeros(len(current_cells), dtype=bool)
+    cells_count = len(occupancy)
+    while True:
+        moving = resolved_cells != current_cells
+        vertex_conflict = np.bincount(resolved_cells, minlength=cells_count)[resolved_cells] > 1
+        occupant = occupancy[resolved_cells]
+        has_occupant = (occupant >= 0) & (occupant != agent_indices)
+        swap_conflict = np.zeros(len(current_cells), dtype=bool)
+        swap_conflict[has_occupant] = resolved_cells[occupant[has_occupant]] == current_cells[has_occupant]
+        newly_blocked = moving & (vertex_conflict | swap_conflict)
+        if not newly_blocked.any():
+            return resolved_cells, blocked
+        resolved_cells[newly_blocked] = current_cells[newly_blocked]
+        blocked |= newly_blocked
@@ -0,0 +1,65 @@
+# Description: 経路計画プログラムに渡す、ワールドの状態の読み取り専用のビューをまとめたモジュール
+import numpy as np
+from dataclasses import dataclass, fields
+
+
+def read_only_view(array: np.ndarray) -> np.ndarray:
+    """配列をコピーせずに、書き込みできないビューを作る関数
+
+    Args:
+        array (np.ndarray): 元の配列
+
+    Returns:
+        np.ndarray: 元の配列とメモリを共有する書き込みできないビュー (元の配列への書き込みは反映される)
+    """
+    view = array.view()
+    view.flags.writeable = False
+    return view
+
+
+@dataclass(frozen=True, eq=False)
+class Observation:
+    """経路計画プログラムが参照するワールドの状態
+
+    配列はワールドが持つ配列をコピーせずに作った書き込みできないビューであり、
+    値はシミュレータが次のステップに進むまで(経路計画プログラムの呼び出し中)は変わらない
+    次のステップ以降も同じ状態を参照したい場合はcopy()で複製する
+    pickleで他のプロセスに渡した場合は、その時点の値を複製した書き込みできない配列になる
+
+    Args:
+        reward_array (np.ndarray): (横幅, 縦幅)の各ノードの報酬
+        obstacle_array (np.ndarray): (横幅, 縦幅)の障害物のデータ (障害物のノードは1)
+        agent_positions (np.ndarray): (エージェント数, 2)の配列, [i]はIDがiのエージェントの位置(x, y)
+        agent_owned_rewards (np.ndarray): (エージェント数,)の配列, [i]はIDがiのエージェントが保有している報酬
+        vault_positions (np.ndarray): (保管庫数, 2)の配列, [i]はi番目の保管庫の位置(x, y)
+        maximum_rewards_capacity (int): エージェントが一度に保持できる報酬の最大値
+    """
+
+    reward_array: np.ndarray
+    obstacle_array: np.ndarray
+    agent_positions: np.ndarray
+    agent_owned_rewards: np.ndarray
+    vault_positions: np.ndarray
+    maximum_rewards_capacity: int
+
+    def __post_init__(self):
+        for name, value in list(vars(self).items()):
+            if isinstance(value, np.ndarray) and value.flags.writeable:
+                object.__setattr__(self, name, read_only_view(value))
+
+    def __reduce__(self):
+        # 復元時にも__post_init__を通して、配列を書き込みできないようにする
+        return (self.__class__, tuple(getattr(self, field.name) for field in fields(self)))
+
+    def copy(self) -> "Observation":
+        """配列を複製して、ワールドの状態の変化に影響されない観測を作るメソッド
+
+        Returns:
+            Observation: 配列を複製した観測
+        """
+        return Observation(
+            *(
+                value.copy() if isinstance(value, np.ndarray) else value
+                for value in (getattr(self, field.name) for field in fields(self))
+            )
+        )
@@ -9,54 +9,94 @@ from typing import List, Dict, Union, Tuple
 
 from ..World import Node, Agent, World
 from .PathPlannerAbstract import PathPlannerAbstract
+from .DStarLite import DStarLite
+from .TaskAllocator import TaskAllocator
 from .util import *
 
 
 class AStarPath(PathPlannerAbstract):
+    # 経路上の何ステップ先まで他のエージェントがいないかを確認するか
+    BLOCK_LOOKAHEAD = 2
+
     def __init__(self):
         # エージェントが向かうノードを格納するdict
         self.agent_forward_nodes: Dict[int, Union[Node, None]] = {}  # get_id(): Node
+        self.task_allocator = TaskAllocator()
+        # エージェントごとの経路探索と、探索した経路およびその経路上の現在位置
+        self.agent_searches: Dict[int, DStarLite] = {}  # get_id(): DStarLite
+        self.agent_paths: Dict[int, Union[List[Node], None]] = {}  # get_id(): List[Node]
+        self.agent_path_cursors: Dict[int, int] = {}  # get_id(): int
 
     def get_next_actions_for_agents(self, world: World) -> Dict[int, Node]:
         return_dict: Dict[int, Node] = {}  # get_id(): Node
 
         agents = world.get_agents()
 
-        # エージェントが向かうノードを格納するdictを初期化
-        if len(self.agent_forward_nodes) == 0:
-            for agent in agents:
-                self.agent_forward_nodes[agent.get_id()] = None
-
-        # エージェントの現在位置と向かうノードが同じの場合、向かうノードを未定義にする
-        for agent in agents:
-            if self.agent_forward_nodes[agent.get_id()] is None:
-                continue
-            if agent.get_node() == self.agent_forward_nodes[agent.get_id()]:
-                self.agent_forward_nodes[agent.get_id()] = None
+        # 報酬までの経路上の距離の合計が最小になるように、エージェントが向かうノードを割り当てる
+        # 報酬を持ちきれないエージェントと、割り当てられる報酬がないエージェントは最寄りの保管庫に向かう
+        self.agent_forward_nodes = self.task_allocator.get_assignments(world)
 
-        # エージェントが向かうノードが未定義の場合、持っている報酬が最大ならば報酬を保管するノードに向かう
-        # そうでない場合は最寄りの報酬のあるノードに向かう
-        for agent in agents:
-            if self.agent_forward_nodes[agent.get_id()] is None:
-                if agent.get_owned_rewards() == agent.get_maximum_rewards_capacity():
-                    store_points = world.vaults
-                    store_point_nodes = [store_point.node for store_point in store_points]
-                    store_point_nodes.sort
-                    self.agent_forward_nodes[agent.get_id()] = store_point_nodes[0]
-                else:
-                    nearest_reward_node = world.get_nearest_node_has_reward(agent.get_node())
-                    self.agent_forward_nodes[agent.get_id()] = nearest_reward_node
-
-        # それぞれのエージェントに対してA*探索を行い、次の行動を選択
+        # それぞれのエージェントの経路を1ステップ進めて次の行動を選択
+        # 経路は向かうノードが変わったときか、経路上に他のエージェントが現れたときのみD* Liteで差分を探索し直す
         for agent in agents:
             agent_forward_node = self.agent_forward_nodes[agent.get_id()]
             if agent_forward_node is None:
                 return_dict[agent.get_id()] = Node(0, 0)
                 continue
-            best_path = get_astar_path(world, agent.get_node(), agent_forward_node)
-            if best_path is None:
-                raise ValueError
-            next_node = best_path[1]
+            path = self.__get_path(world, agent, agent_forward_node)
+            if path is None:
+                # 経路が見つからない場合はその場に留まり、割り当てを解除して次のステップで求め直す
+                self.task_allocator.release(world, agent)
+                return_dict[agent.get_id()] = Node(0, 0)
+                continue
+            cursor = self.agent_path_cursors[agent.get_id()]
+            next_node = path[cursor + 1]
+            self.agent_path_cursors[agent.get_id()] = cursor + 1
             return_dict[agent.get_id()] = next_node - agent.get_node()
 
         return return_dict
+
+    def __get_path(self, world: World, agent: Agent, agent_forward_node: Node) -> Union[List[Node], None]:
+        """エージェントの現在位置から向かうノードまでの経路を取得するメソッド
+
+        前のステップの経路をたどれる場合はそのまま使い、agent_path_cursorsを現在位置に合わせる
+
+        Args:
+            world (World): ワールドインスタンス
+            agent (Agent): 対象のエージェント
+            agent_forward_node (Node): エージェントが向かうノード
+
+        Returns:
+            Union[List[Node], None]: 経路、経路が存在しない場合はNone
+        """
+        agent_id = agent.get_id()
+        search = self.agent_searches.get(agent_id)
+        path = self.agent_paths.get(agent_id)
+        cursor = self.agent_path_cursors.get(agent_id, 0)
+        if search is None or search.goal_node != agent_forward_node:
+            search = DStarLite(world, agent.get_node(), agent_forward_node)
+            self.agent_searches[agent_id] = search
+            path = None
+        elif path is not None and path[cursor] != agent.get_node():
+            # 衝突して動けなかった場合は1つ前の位置に戻り、それ以外で経路を外れた場合は探索し直す
+            if cursor > 0 and path[cursor - 1] == agent.get_node():
+                cursor -= 1
+            else:
+                path = None
+
+        if path is not None and cursor + 1 < len(path):
+            upcoming_nodes = path[cursor + 1 : cursor + 1 + self.BLOCK_LOOKAHEAD]
+            if all(world.get_agent_with_node(node) is None for node in upcoming_nodes):
+                self.agent_path_cursors[agent_id] = cursor
+                return path
+
+        # 他のエージェントがいるノードを通れないものとして経路を修正する
+        search.set_start(agent.get_node())
+        search.set_blocked_nodes(other.get_node() for other in world.get_agents() if other is not agent)
+        path = search.get_path()
+        if path is None or len(path) < 2:
+            self.agent_paths[agent_id] = None
+            return None
+        self.agent_paths[agent_id] = path
+        self.agent_path_cursors[agent_id] = 0
+        return path
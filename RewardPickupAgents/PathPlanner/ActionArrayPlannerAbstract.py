@@ -0,0 +1,35 @@
+import numpy as np
+from typing import Dict
+from abc import abstractmethod
+
+from ..World import Node, World, ACTIONS_LIST
+from .PathPlannerAbstract import PathPlannerAbstract
+
+
+class ActionArrayPlannerAbstract(PathPlannerAbstract):
+    """次の行動をNodeのDictではなく行動のインデックスの配列(get_action_array)で返す抽象クラス
+
+    シミュレータは行動をget_action_arrayで受け取るため、行動ごとにNodeを作る必要がない
+    """
+
+    def __init__(self):
+        pass
+
+    @abstractmethod
+    def get_action_array(self, world: World) -> np.ndarray:
+        """エージェントが次に起こす行動のインデックスを配列で返すメソッド
+
+        ※行動のインデックスはACTIONS_LISTの順番で、4はその場に留まる行動
+        ※セルごとに取れる行動はworld.get_valid_action_mask()で確認できる
+        ※配列の型は整数型であればよい (np.int8を推奨, 浮動小数点数や真偽値の配列はシミュレータがValueErrorを送出する)
+
+        Args:
+            world (World): ワールドクラス
+
+        Returns:
+            np.ndarray: (エージェント数,)の整数配列, [i]はIDがiのエージェントの行動のACTIONS_LISTでのインデックス
+        """
+        raise NotImplementedError("get_action_arrayメソッドを実装してください")
+
+    def get_next_actions_for_agents(self, world: World) -> Dict[int, Node]:
+        return {agent_id: ACTIONS_LIST[action] for agent_id, action in enumerate(self.get_action_array(world))}
@@ -0,0 +1,28 @@
+import numpy as np
+from abc import ABCMeta, abstractmethod
+
+
+class BatchedPlannerAbstract(metaclass=ABCMeta):
+    """BatchedSimulatorの全エピソードの行動をまとめて選択するためのメソッド(get_batched_actions)を持つ抽象クラス
+
+    Args:
+        metaclass (ABCMeta): 抽象クラスを作成するためのメタクラス
+    """
+
+    def __init__(self):
+        pass
+
+    @abstractmethod
+    def get_batched_actions(self, simulator) -> np.ndarray:
+        """全エピソードのエージェントが次に起こす行動のインデックスを配列で返すメソッド
+
+        ※行動のインデックスはACTIONS_LIST(DistanceTable.ACTION_DELTAS)の順番で、4はその場に留まる行動
+
+        Args:
+            simulator (BatchedSimulator): バッチシミュレータ (状態は配列の属性から読み取り、書き換えてはいけない)
+
+        Returns:
+            np.ndarray: (エピソード数, エージェント数)の整数配列 (整数型であればよい, 浮動小数点数や真偽値の配列は
+                シミュレータがValueErrorを送出する)
+        """
+        raise NotImplementedError("get_batched_actionsメソッドを実装してください")
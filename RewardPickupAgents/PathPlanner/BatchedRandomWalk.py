@@ -0,0 +1,17 @@
+# 全エピソードのエージェントがまとめてランダムウォークを行うプログラム
+import numpy as np
+
+from .BatchedPlannerAbstract import BatchedPlannerAbstract
+
+
+class BatchedRandomWalk(BatchedPlannerAbstract):
+    def __init__(self):
+        pass
+
+    def get_batched_actions(self, simulator) -> np.ndarray:
+        positions = simulator.agent_positions
+        # エージェントが取れる行動 (エピソード数, エージェント数, 5)
+        valid_actions = simulator.valid_action_mask[positions[..., 0], positions[..., 1]]
+        # 取れる行動の中から一様にランダムに1つ選択
+        scores = np.where(valid_actions, np.random.random(valid_actions.shape), -1.0)
+        return scores.argmax(axis=2)
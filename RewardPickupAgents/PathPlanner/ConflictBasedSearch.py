@@ -0,0 +1,225 @@
+# 制約木を探索してエージェント同士が衝突しない経路の組を求めるプログラム (Conflict-Based Search)
+import heapq
+import itertools
+import time
+import numpy as np
+from typing import List, Dict, Union, Tuple
+
+from ..World import Node, Agent, World
+from .CooperativeAStar import CooperativeAStar
+from .ReservationTable import ReservationTable
+from .util import *
+
+# (セルID, 時刻): 他のエージェントがそのセルにいるため、使ってはいけないセルと時刻
+Constraint = Tuple[int, int]
+# (衝突するエージェントIDの組, 各エージェントに課す制約 (課せない場合はNone))
+Conflict = Tuple[Tuple[int, int], Tuple[Union[Constraint, None], Union[Constraint, None]]]
+
+
+class ConflictBasedSearch(CooperativeAStar):
+    """windowステップ先までのローリングホライズンでConflict-Based Searchを行う経路計画
+
+    目的地の選び方はCooperativeAStarと同じで、経路の組をCBSで求める点のみが異なる
+    前のステップで求めた経路は、目的地が変わらず残りが十分にある限り制約木の根でそのまま使い、
+    制約木の各ノードでは制約が増えたエージェントの経路のみを計画し直す
+    1ステップあたりの計算時間がtime_budgetを超えた場合は、最後に求めた衝突のない経路に従う
+    制約木の根での経路の計画も時間の上限に含め、時間切れまでに計画できなかったエージェントは前の経路に従うか
+    その場に留まる経路で根を作る (次のステップでは計画できなかったエージェントから計画する)
+    目的地の選択(CooperativeAStarと共通)にかかる時間は上限に含まない
+
+    Args:
+        window (int): 経路を計画する時間幅
+        time_budget (float): 1ステップあたりに制約木の根の計画と探索に使う時間の上限(秒)
+    """
+
+    def __init__(self, window: int = 8, time_budget: float = 0.02):
+        super().__init__(window)
+        self.time_budget = time_budget
+        # 時間切れで前の経路に従ったステップ数
+        self.fallback_count = 0
+        # 制約木の根で最初に計画するエージェントのID (時間切れで計画できなかったエージェントから計画するため)
+        self.root_start_agent_id = 0
+        # 制約付きの単一エージェントの経路のキャッシュ (同じステップ内で同じ制約の経路を何度も探索しないため)
+        self.path_cache: Dict[Tuple[int, Node, Node, Tuple[Constraint, ...]], Union[List[Node], None]] = {}
+
+    def get_next_actions_for_agents(self, world: World) -> Dict[int, Node]:
+        agents = world.get_agents()
+        self._update_forward_nodes(world, agents)
+        self.path_cache.clear()
+        deadline = time.perf_counter() + self.time_budget
+
+        # 前のステップの経路を使えるエージェントはそのまま使い、それ以外のエージェントのみ制約なしで計画する
+        # 時間切れになったエージェントは前の経路(現在地から始まる場合)に従うか、その場に留まる
+        root_paths: Dict[int, List[Node]] = {}
+        reused_plans: Dict[int, List[Node]] = {}
+        start = self.root_start_agent_id if self.root_start_agent_id < len(agents) else 0
+        self.root_start_agent_id = 0
+        timed_out = False
+        for agent in agents[start:] + agents[:start]:
+            plan = self.agent_plans.get(agent.get_id())
+            if plan is not None and plan[0] != agent.get_node():
+                plan = None
+            if (
+                plan is not None
+                and len(plan) > self.window // 2
+                and self.agent_plan_goals.get(agent.get_id()) == self._get_goal(agent)
+            ):
+                reused_plans[agent.get_id()] = plan
+                root_paths[agent.get_id()] = plan + [plan[-1]] * (self.window + 1 - len(plan))
+                continue
+            if not timed_out and time.perf_counter() > deadline:
+                timed_out = True
+                self.root_start_agent_id = agent.get_id()
+            if timed_out:
+                path = None
+                if plan is not None:
+                    reused_plans[agent.get_id()] = plan
+                    path = plan + [plan[-1]] * (self.window + 1 - len(plan))
+            else:
+                path = self.__plan(world, agent, ())
+            root_paths[agent.get_id()] = path if path is not None else [agent.get_node()] * (self.window + 1)
+
+        solution = self.__search(world, agents, root_paths, deadline)
+        if solution is None:
+            # 時間切れの場合は前のステップで求めた経路に従い、経路がないエージェントはその場に留まる
+            self.fallback_count += 1
+        else:
+            for agent in agents:
+                path = solution[agent.get_id()]
+                # 計画し直していない経路は、留まり続ける計画にならないように末尾を延ばす前の経路を保持する
+                if path is root_paths[agent.get_id()] and agent.get_id() in reused_plans:
+                    path = reused_plans[agent.get_id()]
+                self.agent_plans[agent.get_id()] = path
+                self.agent_plan_goals[agent.get_id()] = self._get_goal(agent)
+
+        # 経路の最初の一歩を行動として返し、経路を1ステップ進める
+        return_dict: Dict[int, Node] = {}  # get_id(): Node
+        for agent in agents:
+            plan = self.agent_plans.get(agent.get_id())
+            if plan is None or len(plan) < 2 or plan[0] != agent.get_node():
+                return_dict[agent.get_id()] = Node(0, 0)
+                self.agent_plans.pop(agent.get_id(), None)
+                continue
+            return_dict[agent.get_id()] = plan[1] - agent.get_node()
+            self.agent_plans[agent.get_id()] = plan[1:]
+        self.time += 1
+        return return_dict
+
+    def __search(
+        self, world: World, agents: List[Agent], root_paths: Dict[int, List[Node]], deadline: float
+    ) -> Union[Dict[int, List[Node]], None]:
+        """制約木を探索し、衝突のない経路の組を返すメソッド (時間切れの場合はNone)
+
+        計算時間を抑えるため、経路の長さの合計よりも衝突の数が少ないノードを優先して探索する (Greedy CBS)
+        """
+        costs = {agent.get_id(): self.__get_path_cost(world, agent, root_paths[agent.get_id()]) for agent in agents}
+        root_constraints: Dict[int, Tuple[Constraint, ...]] = {agent.get_id(): () for agent in agents}
+        root_conflicts = self.__find_conflicts(world, root_paths)
+        tie_breaker = itertools.count()
+        # (衝突の数, 経路の長さの合計, 順番, 各エージェントの制約, 各エージェントの経路, 各エージェントの経路の長さ, 衝突のリスト)
+        open_heap = [
+            (
+                len(root_conflicts),
+                sum(costs.values()),
+                next(tie_breaker),
+                root_constraints,
+                root_paths,
+                costs,
+                root_conflicts,
+            )
+        ]
+        while open_heap:
+            _, _, _, constraints, paths, costs, conflicts = heapq.heappop(open_heap)
+            if len(conflicts) == 0:
+                return paths
+            # 根の計画で時間切れになった場合も、衝突のない根はそのまま使う
+            if time.perf_counter() > deadline:
+                return None
+            # 最初の衝突について、どちらかのエージェントに制約を課す2通りに分岐する
+            agent_ids, agent_constraints = conflicts[0]
+            for agent_id, constraint in zip(agent_ids, agent_constraints):
+                if constraint is None:
+                    continue
+                agent = agents[agent_id]
+                new_constraints = dict(constraints)
+                new_constraints[agent_id] = constraints[agent_id] + (constraint,)
+                path = self.__plan(world, agent, new_constraints[agent_id])
+                if path is None:
+                    continue
+                new_paths = dict(paths)
+                new_paths[agent_id] = path
+                new_costs = dict(costs)
+                new_costs[agent_id] = self.__get_path_cost(world, agent, path)
+                new_conflicts = self.__find_conflicts(world, new_paths)
+                heapq.heappush(
+                    open_heap,
+                    (
+                        len(new_conflicts),
+                        sum(new_costs.values()),
+                        next(tie_breaker),
+                        new_constraints,
+                        new_paths,
+                        new_costs,
+                        new_conflicts,
+                    ),
+                )
+        return None
+
+    def __find_conflicts(self, world: World, paths: Dict[int, List[Node]]) -> List[Conflict]:
+        """経路の組に含まれる衝突を時刻の早い順に列挙するメソッド
+
+        同じ時刻に同じセルにいる場合に加えて、直前の時刻に他のエージェントがいたセルに入る場合も衝突とみなす
+        (シミュレータはエージェントを順番に動かすため、空く前のセルに入ると衝突になる)
+        """
+        conflicts: List[Conflict] = []
+        cells = {agent_id: [self._get_cell_id(world, node) for node in path] for agent_id, path in paths.items()}
+        previous_occupants: Dict[int, int] = {}
+        for t in range(self.window + 1):
+            occupants: Dict[int, int] = {}
+            for agent_id, agent_cells in cells.items():
+                cell = agent_cells[t]
+                other = occupants.get(cell)
+                if other is not None:
+                    constraint = (cell, self.time + t)
+                    conflicts.append(((other, agent_id), (constraint, constraint)))
+                else:
+                    occupants[cell] = agent_id
+                other = previous_occupants.get(cell, agent_id)
+                if other != agent_id and cells[other][t] != cell:
+                    # 出発時点の位置は変えられないため、先にいたエージェントにはt - 1 = 0の制約を課せない
+                    other_constraint = (cell, self.time + t) if t > 1 else None
+                    conflicts.append(((agent_id, other), ((cell, self.time + t - 1), other_constraint)))
+            previous_occupants = occupants
+        return conflicts
+
+    def __plan(self, world: World, agent: Agent, constraints: Tuple[Constraint, ...]) -> Union[List[Node], None]:
+        """制約を守る単一エージェントの経路を求めるメソッド"""
+        goal = self._get_goal(agent)
+        key = (agent.get_id(), agent.get_node(), goal, constraints)
+        if key not in self.path_cache:
+            # 制約は他のエージェント(ID: -1)の予約として表す
+            constraint_table = ReservationTable(self.window + 3, self.time)
+            for cell, constraint_time in constraints:
+                constraint_table.reserve_vertex(cell, constraint_time, -1)
+            self.path_cache[key] = get_space_time_astar_path(
+                world,
+                agent.get_node(),
+                goal,
+                constraint_table,
+                agent.get_id(),
+                self.time,
+                self.window,
+                self._get_distance_field(world, goal),
+            )
+        return self.path_cache[key]
+
+    def __get_path_cost(self, world: World, agent: Agent, path: List[Node]) -> int:
+        """経路の長さ (時間内に目的地に着かない場合は、残りの最短距離を足した長さ) を計算するメソッド"""
+        goal = self._get_goal(agent)
+        if path[-1] != goal:
+            distance = int(self._get_distance_field(world, goal)[path[-1].x, path[-1].y])
+            return len(path) - 1 + (distance if distance >= 0 else world.get_environment_size()[0] ** 2)
+        cost = len(path) - 1
+        while cost > 0 and path[cost - 1] == goal:
+            cost -= 1
+        return cost
@@ -0,0 +1,212 @@
+# 時空間の予約表を使って、エージェント同士が衝突しないように優先度順に経路を計画するプログラム (WHCA*)
+import numpy as np
+import random
+from collections import deque
+from dataclasses import dataclass
+from typing import List, Dict, Set, Union, Tuple
+
+from ..parameter import *
+from ..World import Node, Agent, World
+from .PathPlannerAbstract import PathPlannerAbstract
+from .ReservationTable import ReservationTable
+from .TourOptimizer import TourOptimizer
+from .util import *
+
+
+class CooperativeAStar(PathPlannerAbstract):
+    """Windowed Hierarchical Cooperative A*による経路計画
+
+    各エージェントはwindowステップ先までの経路を予約表に予約し、後から計画するエージェントはその予約を避ける
+    経路は目的地が変わったとき、残りがwindowの半分を下回ったとき、または他のエージェントの計画と競合したときのみ計画し直す
+
+    Args:
+        window (int): 予約する時間幅
+    """
+
+    def __init__(self, window: int = 8):
+        self.window = window
+        self.reservation_table = ReservationTable(window + 1)
+        self.time = 0
+        # エージェントが向かうノードを格納するdict
+        self.agent_forward_nodes: Dict[int, Union[Node, None]] = {}  # get_id(): Node
+        # することがないエージェントが待機するノード (することができるまで決め直さない)
+        self.agent_parking_nodes: Dict[int, Node] = {}  # get_id(): Node
+        # 時刻self.time + iにいるノードをi番目に持つ予約済みの経路と、その経路の目的地
+        self.agent_plans: Dict[int, List[Node]] = {}  # get_id(): List[Node]
+        self.agent_plan_goals: Dict[int, Node] = {}  # get_id(): Node
+        # 目的のノードまでの距離場のキャッシュ
+        self.distance_fields: Dict[Node, np.ndarray] = {}
+        self.vault_distance_fields: Union[np.ndarray, None] = None
+        self.tour_optimizer = TourOptimizer()
+
+    def get_next_actions_for_agents(self, world: World) -> Dict[int, Node]:
+        agents = world.get_agents()
+        self.reservation_table.advance(self.time)
+        self._update_forward_nodes(world, agents)
+
+        # 計画を続けられないエージェントの予約を解放する
+        replan_queue: List[Agent] = []
+        for agent in agents:
+            plan = self.agent_plans.get(agent.get_id())
+            if plan is not None and len(plan) > 1 and plan[0] != agent.get_node():
+                plan = None
+            if (
+                plan is None
+                or len(plan) <= self.window // 2
+                or self.agent_plan_goals.get(agent.get_id()) != self._get_goal(agent)
+            ):
+                self.reservation_table.release(agent.get_id())
+                self.agent_plans.pop(agent.get_id(), None)
+                replan_queue.append(agent)
+        # 計画済みのエージェントと同様に、計画前のエージェントも現在位置を予約しておく
+        for agent in replan_queue:
+            self.reservation_table.reserve_vertex(self._get_cell_id(world, agent.get_node()), self.time, agent.get_id())
+
+        # 持っている報酬が多いエージェントから順に計画する (同数の場合は毎ステップ順番を入れ替える)
+        agents_count = len(agents)
+        replan_queue.sort(key=lambda a: (-a.get_owned_rewards(), (a.get_id() - self.time) % agents_count))
+        replan_deque = deque(replan_queue)
+        replan_count: Dict[int, int] = {}
+        while replan_deque:
+            agent = replan_deque.popleft()
+            replan_count[agent.get_id()] = replan_count.get(agent.get_id(), 0) + 1
+            plan = self.__plan(world, agent)
+            if plan is None:
+                # 経路が見つからない場合はその場に留まり、その予約と競合する他のエージェントを計画し直す
+                plan = [agent.get_node()] * (self.window + 1)
+                for other in self.__find_conflicting_agents(world, agent, plan):
+                    if replan_count.get(other.get_id(), 0) < 2:
+                        self.reservation_table.release(other.get_id())
+                        self.agent_plans.pop(other.get_id(), None)
+                        self.reservation_table.reserve_vertex(
+                            self._get_cell_id(world, other.get_node()), self.time, other.get_id()
+                        )
+                        replan_deque.append(other)
+            self.agent_plans[agent.get_id()] = plan
+            self.agent_plan_goals[agent.get_id()] = self._get_goal(agent)
+            self.reservation_table.reserve_path(
+                agent.get_id(), [self._get_cell_id(world, node) for node in plan], self.time
+            )
+
+        # 計画の最初の一歩を行動として返し、計画を1ステップ進める
+        return_dict: Dict[int, Node] = {}  # get_id(): Node
+        for agent in agents:
+            plan = self.agent_plans.get(agent.get_id())
+            if plan is None or len(plan) < 2:
+                return_dict[agent.get_id()] = Node(0, 0)
+                continue
+            return_dict[agent.get_id()] = plan[1] - agent.get_node()
+            self.agent_plans[agent.get_id()] = plan[1:]
+        self.time += 1
+        return return_dict
+
+    def _update_forward_nodes(self, world: World, agents: List[Agent]):
+        """エージェントが向かうノードを更新するメソッド"""
+        for agent in agents:
+            forward_node = self.agent_forward_nodes.get(agent.get_id())
+            if forward_node is None:
+                continue
+            # 目的地に着いた場合、向かっていた報酬がなくなった場合、報酬を持ちきれなくなった場合は目的地を決め直す
+            is_vault = world.get_vault_with_node(forward_node) is not None
+            if (
+                agent.get_node() == forward_node
+                or (not is_vault and not world.has_reward(forward_node))
+                or (not is_vault and agent.get_owned_rewards() >= agent.get_maximum_rewards_capacity())
+            ):
+                self.agent_forward_nodes[agent.get_id()] = None
+
+        claimed: Set[Node] = {node for node in self.agent_forward_nodes.values() if node is not None}
+        for agent in agents:
+            if self.agent_forward_nodes.get(agent.get_id()) is not None:
+                continue
+            forward_node = None
+            if agent.get_owned_rewards() < agent.get_maximum_rewards_capacity():
+                # 他のエージェントが向かっていない報酬をまとめて拾う巡回順の、最初のノードに向かう
+                tour = self.tour_optimizer.get_tour(world, agent, claimed)
+                if len(tour) > 0:
+                    forward_node = tour[0]
+            if forward_node is None and agent.get_owned_rewards() > 0:
+                forward_node = self._get_nearest_vault_node(world, agent)
+            if forward_node is None:
+                # することがない場合は、報酬が出現しやすい場所の近くで待機する
+                # (待機するノードは、他のエージェントの目的地にならない限り決め直さない)
+                forward_node = self.agent_parking_nodes.get(agent.get_id())
+                if forward_node is None or forward_node in claimed:
+                    forward_node = self._get_parking_node(world, agent, claimed)
+                if forward_node is None:
+                    self.agent_parking_nodes.pop(agent.get_id(), None)
+                else:
+                    self.agent_parking_nodes[agent.get_id()] = forward_node
+            else:
+                self.agent_parking_nodes.pop(agent.get_id(), None)
+            self.agent_forward_nodes[agent.get_id()] = forward_node
+            if forward_node is not None:
+                claimed.add(forward_node)
+
+        # 使われなくなった目的地の距離場を破棄する
+        goals = set(self.agent_forward_nodes.values())
+        for node in list(self.distance_fields):
+            if node not in goals:
+                del self.distance_fields[node]
+
+    def _get_nearest_vault_node(self, world: World, agent: Agent) -> Union[Node, None]:
+        vault_nodes = [vault.get_node() for vault in world.get_vaults()]
+        if len(vault_nodes) == 0:
+            return None
+        if self.vault_distance_fields is None:
+            self.vault_distance_fields = world.get_distance_fields(vault_nodes)
+        distances = self.vault_distance_fields[:, agent.get_node().x, agent.get_node().y]
+        reachable = np.flatnonzero(distances >= 0)
+        if len(reachable) == 0:
+            return None
+        return vault_nodes[reachable[np.argmin(distances[reachable])]]
+
+    def _get_parking_node(self, world: World, agent: Agent, claimed: Set[Node]) -> Union[Node, None]:
+        """期待報酬を移動にかかる距離で割り引いた値が最大のノードを取得するメソッド (他のエージェントの目的地と保管庫は除く)"""
+        distance = world.get_distance_fields([agent.get_node()])[0]
+        score = np.where(distance >= 0, world.get_expected_yield_array() * EXPECTED_YIELD_DISCOUNT**distance, -1.0)
+        for node in claimed:
+            score[node.x, node.y] = -1.0
+        for vault in world.get_vaults():
+            score[vault.get_node().x, vault.get_node().y] = -1.0
+        x, y = np.unravel_index(int(np.argmax(score)), score.shape)
+        if score[x, y] <= 0:
+            return None
+        return Node(int(x), int(y))
+
+    def _get_cell_id(self, world: World, node: Node) -> int:
+        return node.x * world.get_environment_size()[1] + node.y
+
+    def _get_goal(self, agent: Agent) -> Node:
+        forward_node = self.agent_forward_nodes.get(agent.get_id())
+        return agent.get_node() if forward_node is None else forward_node
+
+    def _get_distance_field(self, world: World, goal: Node) -> np.ndarray:
+        """目的のノードまでの距離場を取得するメソッド (目的地として使われている間はキャッシュする)"""
+        if goal not in self.distance_fields:
+            self.distance_fields[goal] = world.get_distance_fields([goal])[0]
+        return self.distance_fields[goal]
+
+    def __plan(self, world: World, agent: Agent) -> Union[List[Node], None]:
+        goal = self._get_goal(agent)
+        return get_space_time_astar_path(
+            world,
+            agent.get_node(),
+            goal,
+            self.reservation_table,
+            agent.get_id(),
+            self.time,
+            self.window,
+            self._get_distance_field(world, goal),
+        )
+
+    def __find_conflicting_agents(self, world: World, agent: Agent, plan: List[Node]) -> List[Agent]:
+        """経路と予約が競合するエージェントのリストを取得するメソッド"""
+        conflicting_ids: Set[int] = set()
+        for i, node in enumerate(plan):
+            for time in (self.time + i, self.time + i + 1):
+                owner = self.reservation_table.get_vertex_owner(self._get_cell_id(world, node), time)
+                if owner >= 0 and owner != agent.get_id():
+                    conflicting_ids.add(owner)
+        agents = world.get_agents()
+        return [agents[agent_id] for agent_id in sorted(conflicting_ids)]
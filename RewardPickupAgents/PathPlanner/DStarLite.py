@@ -0,0 +1,144 @@
+# Description: 障害物の変化に合わせて経路を差分で修正するD* Liteの実装
+import heapq
+from typing import List, Dict, Set, Union, Tuple, Iterable
+
+from ..World import Node, Environment, World
+
+
+class DStarLite:
+    """目的地を固定して、出発地の移動と通れないセルの変化に合わせて最短経路を差分で修正するクラス
+
+    目的地から出発地に向かって探索し、前回の探索結果(g値)のうち変化の影響を受けた部分のみを更新する
+    静的な障害物に加えて、他のエージェントがいるセルなどを一時的に通れないセルとして指定できる
+
+    Args:
+        world (World): ワールドインスタンス
+        start (Node): 出発するノード
+        goal (Node): 目的のノード
+    """
+
+    def __init__(self, world: World, start: Node, goal: Node):
+        env: Environment = world.environment
+        self.width, self.height = env.get_environment_size()
+        self.indptr, self.indices = env.adjacency_indptr_list, env.adjacency_indices_list
+        self.start = env.get_cell_id(start)
+        self.goal = env.get_cell_id(goal)
+        self.goal_node = goal
+        self.unvisited = self.width * self.height
+        cells_count = self.width * self.height
+        self.g_score: List[int] = [self.unvisited] * cells_count
+        self.rhs: List[int] = [self.unvisited] * cells_count
+        self.rhs[self.goal] = 0
+        # 出発地の移動量の累計 (ヒープ内のキーを更新せずに済ませるため)
+        self.key_modifier = 0
+        # 一時的に通れないセルのID
+        self.blocked_cells: Set[int] = set()
+        # ヒープに入っているセルの現在のキー (古いエントリは取り出したときに読み飛ばす)
+        self.open_keys: Dict[int, Tuple[int, int]] = {}
+        self.open_heap: List[Tuple[Tuple[int, int], int]] = []
+        self.__push(self.goal)
+
+    def set_start(self, node: Node):
+        """出発地を更新するメソッド
+
+        Args:
+            node (Node): 新しい出発地
+        """
+        cell = node.x * self.height + node.y
+        self.key_modifier += self.__heuristic(self.start, cell)
+        self.start = cell
+
+    def set_blocked_nodes(self, nodes: Iterable[Node]):
+        """一時的に通れないノードを差し替えるメソッド (変化したセルの周囲のみ更新する)
+
+        Args:
+            nodes (Iterable[Node]): 通れないノード
+        """
+        blocked_cells = {node.x * self.height + node.y for node in nodes}
+        changed_cells = blocked_cells ^ self.blocked_cells
+        self.blocked_cells = blocked_cells
+        for cell in changed_cells:
+            self.__update_vertex(cell)
+            for neighbor in self.__get_neighbors(cell):
+                self.__update_vertex(neighbor)
+
+    def compute_shortest_path(self):
+        """前回の探索結果から変化した部分のみを探索し直すメソッド"""
+        while self.open_heap:
+            key, cell = self.open_heap[0]
+            if self.open_keys.get(cell) != key:
+                heapq.heappop(self.open_heap)
+                continue
+            if key >= self.__calculate_key(self.start) and self.rhs[self.start] == self.g_score[self.start]:
+                break
+            heapq.heappop(self.open_heap)
+            new_key = self.__calculate_key(cell)
+            if key < new_key:
+                self.__push(cell)
+            elif self.g_score[cell] > self.rhs[cell]:
+                self.g_score[cell] = self.rhs[cell]
+                del self.open_keys[cell]
+                for neighbor in self.__get_neighbors(cell):
+                    self.__update_vertex(neighbor)
+            else:
+                self.g_score[cell] = self.unvisited
+                self.__update_vertex(cell)
+                for neighbor in self.__get_neighbors(cell):
+                    self.__update_vertex(neighbor)
+
+    def get_path(self) -> Union[List[Node], None]:
+        """出発地から目的地までの最短経路を取得するメソッド
+
+        Returns:
+            List[Node]: 出発地から目的地までのノードのリスト、経路が存在しない場合はNone
+        """
+        self.compute_shortest_path()
+        if self.g_score[self.start] >= self.unvisited:
+            return None
+        cells = [self.start]
+        current = self.start
+        while current != self.goal:
+            current = min(self.__get_neighbors(current), key=lambda cell: self.__get_g_through(cell))
+            if self.__get_g_through(current) >= self.unvisited:
+                return None
+            cells.append(current)
+        return [Node(cell // self.height, cell % self.height) for cell in cells]
+
+    def __get_g_through(self, cell: int) -> int:
+        if cell in self.blocked_cells:
+            return self.unvisited
+        return self.g_score[cell]
+
+    def __heuristic(self, cell1: int, cell2: int) -> int:
+        x1, y1 = divmod(cell1, self.height)
+        x2, y2 = divmod(cell2, self.height)
+        return abs(x1 - x2) + abs(y1 - y2)
+
+    def __calculate_key(self, cell: int) -> Tuple[int, int]:
+        g = min(self.g_score[cell], self.rhs[cell])
+        return (g + self.__heuristic(self.start, cell) + self.key_modifier, g)
+
+    def __push(self, cell: int):
+        key = self.__calculate_key(cell)
+        self.open_keys[cell] = key
+        heapq.heappush(self.open_heap, (key, cell))
+
+    def __get_neighbors(self, cell: int) -> List[int]:
+        """通行可能な隣接セルのリストを取得するメソッド"""
+        return self.indices[self.indptr[cell] : self.indptr[cell + 1]]
+
+    def __update_vertex(self, cell: int):
+        """セルのrhs値を隣接セルのg値から計算し直し、g値と異なればヒープに入れるメソッド"""
+        if cell != self.goal:
+            if cell in self.blocked_cells:
+                self.rhs[cell] = self.unvisited
+            else:
+                self.rhs[cell] = min(
+                    [self.__get_g_through(neighbor) + 1 for neighbor in self.__get_neighbors(cell)],
+                    default=self.unvisited,
+                )
+                self.rhs[cell] = min(self.rhs[cell], self.unvisited)
+        if self.g_score[cell] != self.rhs[cell]:
+            self.__push(cell)
+        else:
+            self.open_keys.pop(cell, None)
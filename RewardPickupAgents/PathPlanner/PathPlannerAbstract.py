@@ -4,7 +4,7 @@ from dataclasses import dataclass
 from typing import List, Dict, Union, Tuple
 from abc import ABCMeta, abstractmethod
 
-from ..World import Node, Agent, World
+from ..World import Node, Agent, World, ACTION_INDICES
 
 
 class PathPlannerAbstract(metaclass=ABCMeta):
@@ -32,3 +32,30 @@ class PathPlannerAbstract(metaclass=ABCMeta):
             Dict[int, Node]: エージェントIDをキーとしてエージェントが次に起こす行動(Node)を値とするDict
         """
         raise NotImplementedError("get_next_actions_for_agentsメソッドを実装してください")
+
+    def get_action_array(self, world: World) -> np.ndarray:
+        """エージェントが次に起こす行動のインデックスを配列で返すメソッド
+
+        シミュレータはこのメソッドで行動を受け取る
+        既定ではget_next_actions_for_agentsの結果を変換するため、行動を配列で求められる場合はこのメソッドを
+        オーバーライドする (ActionArrayPlannerAbstractを参照)
+
+        Args:
+            world (World): ワールドクラス
+
+        Returns:
+            np.ndarray: (エージェント数,)の整数配列(既定ではint8), [i]はIDがiのエージェントの行動のACTIONS_LISTでのインデックス
+        """
+        next_actions = self.get_next_actions_for_agents(world)
+        actions = np.empty(world.get_agents_count(), dtype=np.int8)
+        for agent_id in range(world.get_agents_count()):
+            action = next_actions[agent_id]
+            action_index = ACTION_INDICES.get(action) if isinstance(action, Node) else None
+            if action_index is None:
+                raise ValueError(
+                    "エージェントが取れない行動を選択しようとしています。 Agent ID: {}, Node: {}".format(
+                        agent_id, action
+                    )
+                )
+            actions[agent_id] = action_index
+        return actions
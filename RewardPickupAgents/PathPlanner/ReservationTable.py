@@ -0,0 +1,123 @@
+# Description: 複数エージェントの経路計画で使う時空間の予約表
+from typing import List, Dict, Union, Tuple
+
+
+class ReservationTable:
+    """(セルID, 時刻)をキーとして、どのエージェントがそのセルを使うかを記録する予約表
+
+    時刻は絶対時刻で扱い、advanceで現在時刻を進めると過去の予約は破棄される
+    現在時刻からwindowステップ先までの予約のみを保持する(ローリングウィンドウ)
+
+    Args:
+        window (int): 予約を保持する時間幅
+        current_time (int): 現在時刻
+    """
+
+    def __init__(self, window: int, current_time: int = 0):
+        self.window = window
+        self.current_time = current_time
+        # (セルID, 時刻): エージェントID
+        self.vertex_reservations: Dict[Tuple[int, int], int] = {}
+        # (移動元のセルID, 移動先のセルID, 移動を始める時刻): エージェントID
+        self.edge_reservations: Dict[Tuple[int, int, int], int] = {}
+        # 時刻ごとの予約のキー (advanceでまとめて破棄するため)
+        self.time_buckets: Dict[int, List[Tuple]] = {}
+        # エージェントごとの予約のキー (releaseでまとめて解放するため)
+        self.agent_keys: Dict[int, List[Tuple]] = {}
+
+    def advance(self, time: int):
+        """現在時刻を進め、過去の予約を破棄するメソッド
+
+        Args:
+            time (int): 新しい現在時刻
+        """
+        for t in range(self.current_time, time):
+            for key in self.time_buckets.pop(t, []):
+                if len(key) == 2:
+                    self.vertex_reservations.pop(key, None)
+                else:
+                    self.edge_reservations.pop(key, None)
+        self.current_time = max(self.current_time, time)
+
+    def clear(self):
+        """全ての予約を破棄するメソッド"""
+        self.vertex_reservations.clear()
+        self.edge_reservations.clear()
+        self.time_buckets.clear()
+        self.agent_keys.clear()
+
+    def is_in_window(self, time: int) -> bool:
+        return self.current_time <= time < self.current_time + self.window
+
+    def reserve_vertex(self, cell: int, time: int, agent_id: int):
+        """セルを指定した時刻に予約するメソッド (ウィンドウ外の予約は無視する)"""
+        if not self.is_in_window(time):
+            return
+        key = (cell, time)
+        self.vertex_reservations[key] = agent_id
+        self.time_buckets.setdefault(time, []).append(key)
+        self.agent_keys.setdefault(agent_id, []).append(key)
+
+    def reserve_edge(self, from_cell: int, to_cell: int, time: int, agent_id: int):
+        """時刻timeからtime+1にかけてのセル間の移動を予約するメソッド (ウィンドウ外の予約は無視する)"""
+        if not self.is_in_window(time):
+            return
+        key = (from_cell, to_cell, time)
+        self.edge_reservations[key] = agent_id
+        self.time_buckets.setdefault(time, []).append(key)
+        self.agent_keys.setdefault(agent_id, []).append(key)
+
+    def reserve_path(self, agent_id: int, cells: List[int], start_time: int):
+        """経路を予約するメソッド
+
+        Args:
+            agent_id (int): エージェントID
+            cells (List[int]): 時刻start_time + iにいるセルIDをi番目に持つリスト
+            start_time (int): 経路の開始時刻
+        """
+        for i, cell in enumerate(cells):
+            self.reserve_vertex(cell, start_time + i, agent_id)
+            if i + 1 < len(cells) and cells[i + 1] != cell:
+                self.reserve_edge(cell, cells[i + 1], start_time + i, agent_id)
+
+    def release(self, agent_id: int):
+        """エージェントの予約を全て解放するメソッド"""
+        for key in self.agent_keys.pop(agent_id, []):
+            reservations = self.vertex_reservations if len(key) == 2 else self.edge_reservations
+            if reservations.get(key) == agent_id:
+                del reservations[key]
+
+    def get_vertex_owner(self, cell: int, time: int) -> int:
+        """セルを指定した時刻に予約しているエージェントIDを取得するメソッド (予約がない場合は-1)"""
+        return self.vertex_reservations.get((cell, time), -1)
+
+    def is_vertex_free(self, cell: int, time: int, agent_id: int) -> bool:
+        owner = self.vertex_reservations.get((cell, time), agent_id)
+        return owner == agent_id
+
+    def is_move_free(self, from_cell: int, to_cell: int, time: int, agent_id: int) -> bool:
+        """時刻timeにfrom_cellからto_cellへ移動できるかを判定するメソッド
+
+        移動先の頂点の競合、すれ違い(スワップ)の競合に加えて、
+        移動先に時刻timeの時点で他のエージェントがいる場合や、時刻time + 2に他のエージェントが入ってくる場合(追従)も競合とみなす
+        (シミュレータはエージェントを順番に動かすため、空く前のセルに入ると衝突になる)
+
+        Args:
+            from_cell (int): 移動元のセルID
+            to_cell (int): 移動先のセルID
+            time (int): 移動を始める時刻
+            agent_id (int): 移動するエージェントID
+
+        Returns:
+            bool: 移動できる場合はTrue
+        """
+        if not self.is_vertex_free(to_cell, time + 1, agent_id):
+            return False
+        if not self.is_vertex_free(to_cell, time + 2, agent_id):
+            return False
+        if from_cell == to_cell:
+            return True
+        if not self.is_vertex_free(to_cell, time, agent_id):
+            return False
+        swap_owner = self.edge_reservations.get((to_cell, from_cell, time), agent_id)
+        return swap_owner == agent_id
@@ -0,0 +1,145 @@
+# Description: エージェントに向かう報酬と保管庫を割り当てるモジュール
+import numpy as np
+from typing import List, Dict, Set, FrozenSet, Union, Tuple
+
+from ..World import Node, Agent, World
+from .util import *
+
+
+class TaskAllocator:
+    """経路上の距離の合計が最小になるように、エージェントに向かう報酬を割り当てるクラス
+
+    報酬を持ちきれるエージェントと報酬のうち数が少ない側から幅優先探索を行い、近い順にCANDIDATES_PER_AGENT個の
+    相手までの距離を求め、エージェントと報酬の組み合わせをハンガリアン法で求める
+    (数が多い側は密に分布しているため、探索は近くの相手が見つかった時点で打ち切られる)
+    割り当てられなかったエージェントと報酬を持ちきれないエージェントは、報酬を持っていれば最寄りの保管庫に向かう
+    他のエージェントがいる報酬と、経路が見つからずに解除された組(release)は割り当てない
+    報酬の出現・獲得、報酬を持ちきれるエージェントの変化、エージェントの到着、割り当ての解除があったときのみ
+    割り当てを求め直す
+    """
+
+    # 現在の割り当てを続ける場合にコストから差し引く値 (同じコストの割り当ての間で向かう先が入れ替わり続けないため)
+    KEEP_BONUS = 0.5
+    # エージェント(または報酬)ごとに割り当ての候補とする相手の数 (近い順)
+    CANDIDATES_PER_AGENT = 8
+
+    def __init__(self):
+        self.vault_nodes: List[Node] = []
+        self.nearest_vault_indices: Union[np.ndarray, None] = None
+        # 前回割り当てを求めたときの報酬のあるセルのIDと、報酬を持ちきれるエージェントのID
+        self.reward_cells: FrozenSet[int] = frozenset()
+        self.available_agent_ids: Tuple[int, ...] = ()
+        self.assignments: Dict[int, Union[Node, None]] = {}  # get_id(): Node
+        # 経路が見つからずに解除された(エージェントID, 報酬のノード)の組 (その報酬がなくなるまで割り当てない)
+        self.released_pairs: Set[Tuple[int, Node]] = set()
+        self.needs_update = False
+
+    def get_assignments(self, world: World) -> Dict[int, Union[Node, None]]:
+        """エージェントが向かうノードを取得するメソッド
+
+        Args:
+            world (World): ワールドインスタンス
+
+        Returns:
+            Dict[int, Union[Node, None]]: エージェントIDをキーとして向かうノードを値とするDict, 向かう先がない場合はNone
+        """
+        agents = world.get_agents()
+        reward_cells = world.get_reward_cell_ids()
+        available_agents = [
+            agent for agent in agents if agent.get_owned_rewards() < agent.get_maximum_rewards_capacity()
+        ]
+        available_agent_ids = tuple(agent.get_id() for agent in available_agents)
+        if (
+            self.needs_update
+            or reward_cells != self.reward_cells
+            or available_agent_ids != self.available_agent_ids
+            or any(self.assignments.get(agent.get_id()) == agent.get_node() for agent in agents)
+        ):
+            self.reward_cells = reward_cells
+            self.available_agent_ids = available_agent_ids
+            self.needs_update = False
+            self.released_pairs = {(agent_id, node) for agent_id, node in self.released_pairs if world.has_reward(node)}
+            self.__solve(world, agents, available_agents)
+        return self.assignments
+
+    def release(self, world: World, agent: Agent):
+        """経路が見つからなかったエージェントの割り当てを解除するメソッド
+
+        向かっていた報酬は、その報酬がなくなるまでこのエージェントに割り当てず、次のget_assignmentsで割り当てを求め直す
+
+        Args:
+            world (World): ワールドインスタンス
+            agent (Agent): 割り当てを解除するエージェント
+        """
+        node = self.assignments.get(agent.get_id())
+        if node is not None and world.get_vault_with_node(node) is None:
+            self.released_pairs.add((agent.get_id(), node))
+        self.assignments[agent.get_id()] = None
+        self.needs_update = True
+
+    def get_nearest_vault_node(self, world: World, node: Node) -> Union[Node, None]:
+        """指定したノードから経路上で最も近い保管庫のノードを取得するメソッド
+
+        Args:
+            world (World): ワールドインスタンス
+            node (Node): 基準となるノード
+
+        Returns:
+            Union[Node, None]: 最寄りの保管庫のノード, 到達できる保管庫がない場合はNone
+        """
+        if self.nearest_vault_indices is None:
+            self.vault_nodes = [vault.get_node() for vault in world.get_vaults()]
+            self.nearest_vault_indices = world.get_nearest_node_index_field(self.vault_nodes)
+        index = self.nearest_vault_indices[node.x, node.y]
+        if index < 0:
+            return None
+        return self.vault_nodes[index]
+
+    def __solve(self, world: World, agents: List[Agent], available_agents: List[Agent]):
+        """報酬を持ちきれるエージェントに報酬を割り当て、残りのエージェントには保管庫を割り当てるメソッド"""
+        width, height = world.get_environment_size()
+        unreachable_cost = width * height
+        # 他のエージェントがいる報酬は、そのエージェントが報酬を持ちきれずに留まっているため割り当てない
+        occupied_cells = {world.get_cell_id(agent.get_node()) for agent in agents}
+        free_reward_cells = self.reward_cells - occupied_cells
+        reward_columns: Dict[Node, int] = {}
+        entries: List[Tuple[int, int, int]] = []  # (行, 列, 距離)
+        if len(free_reward_cells) < len(available_agents):
+            # 報酬の方が少ない場合は、報酬ごとに近いエージェントを探す
+            agent_rows = {agent.get_node(): row for row, agent in enumerate(available_agents)}
+            candidates_count = self.CANDIDATES_PER_AGENT + len(self.released_pairs)
+            for cell in sorted(free_reward_cells):
+                node = world.get_node_from_cell_id(cell)
+                for agent_node, distance in world.get_k_nearest_nodes(node, agent_rows, candidates_count):
+                    row = agent_rows[agent_node]
+                    if (available_agents[row].get_id(), node) in self.released_pairs:
+                        continue
+                    column = reward_columns.setdefault(node, len(reward_columns))
+                    entries.append((row, column, distance))
+        else:
+            # 他のエージェントがいる報酬を除いてもCANDIDATES_PER_AGENT個の候補が残るように、その数だけ多く探す
+            candidates_count = self.CANDIDATES_PER_AGENT + len(self.reward_cells & occupied_cells)
+            for row, agent in enumerate(available_agents):
+                for node, distance in world.get_k_nearest_nodes_have_reward(agent.get_node(), candidates_count):
+                    if world.get_cell_id(node) in occupied_cells or (agent.get_id(), node) in self.released_pairs:
+                        continue
+                    column = reward_columns.setdefault(node, len(reward_columns))
+                    entries.append((row, column, distance))
+        reward_nodes = list(reward_columns)
+        cost_matrix = np.full((len(available_agents), len(reward_nodes)), float(unreachable_cost))
+        if len(entries) > 0:
+            rows, columns, distances = np.array(entries, dtype=np.int64).T
+            cost_matrix[rows, columns] = distances
+        for row, agent in enumerate(available_agents):
+            column = reward_columns.get(self.assignments.get(agent.get_id()))
+            if column is not None and cost_matrix[row, column] < unreachable_cost:
+                cost_matrix[row, column] -= self.KEEP_BONUS
+
+        assignments: Dict[int, Union[Node, None]] = {agent.get_id(): None for agent in agents}
+        for row, column in solve_assignment(cost_matrix):
+            if cost_matrix[row, column] < unreachable_cost - self.KEEP_BONUS:
+                assignments[available_agents[row].get_id()] = reward_nodes[column]
+        for agent in agents:
+            if assignments[agent.get_id()] is None and agent.get_owned_rewards() > 0:
+                assignments[agent.get_id()] = self.get_nearest_vault_node(world, agent.get_node())
+        self.assignments = assignments
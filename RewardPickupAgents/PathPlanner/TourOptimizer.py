@@ -0,0 +1,131 @@
+# Description: 持ちきれる数まで報酬をまとめて拾ってから保管庫に向かう巡回順を求めるモジュール
+import numpy as np
+from typing import List, Dict, Set, Union, Tuple, FrozenSet, Iterable
+
+from ..World import Node, Agent, World
+
+
+class TourOptimizer:
+    """エージェントごとに、拾う報酬の組とその順番、最後に向かう保管庫を求めるクラス
+
+    エージェントの近くにある報酬を候補とし、持ちきれる数(候補が少ない場合は候補の数)の報酬を拾って
+    保管庫に届けるまでの時間が最小になる巡回順を、部分集合上の動的計画法(Held-Karp)で求める
+    距離は候補の報酬とエージェントの位置からの距離場(World.get_distance_fields)から求める
+    (全点対間の距離表を作らないため、大きなマップでもメモリ使用量は候補の数 × セル数で済む)
+    候補の報酬の組とエージェントが持っている報酬の数が変わらない限り、前回の結果を使い回す
+
+    どのPathPlannerAbstractのサブクラスからも、get_tourで次に向かうノードを決めるために使える
+
+    Args:
+        max_candidates (int): 巡回順の候補とする報酬の数の上限 (計算量は2 ** max_candidatesに比例する)
+    """
+
+    def __init__(self, max_candidates: int = 8):
+        self.max_candidates = max_candidates
+        # エージェントごとの(候補の報酬の組, 持っている報酬の数)と、そのときの巡回順
+        self.cache_keys: Dict[int, Tuple[FrozenSet[Node], int]] = {}  # get_id(): Tuple
+        self.tours: Dict[int, List[Node]] = {}  # get_id(): List[Node]
+
+    def get_tour(self, world: World, agent: Agent, excluded_nodes: Iterable[Node] = ()) -> List[Node]:
+        """エージェントが拾う報酬を順に並べ、最後に向かう保管庫を加えたリストを取得するメソッド
+
+        Args:
+            world (World): ワールドインスタンス
+            agent (Agent): 対象のエージェント
+            excluded_nodes (Iterable[Node]): 候補から除く報酬のノード (他のエージェントが向かっている報酬など)
+
+        Returns:
+            List[Node]: 向かうノードのリスト, 報酬を持っておらず拾える報酬もない場合と、
+                到達できる保管庫がない場合は空のリスト
+        """
+        excluded_nodes = set(excluded_nodes)
+        capacity = agent.get_maximum_rewards_capacity() - agent.get_owned_rewards()
+        candidates: List[Node] = []
+        if capacity > 0:
+            nearest = world.get_k_nearest_nodes_have_reward(agent.get_node(), self.max_candidates + len(excluded_nodes))
+            candidates = [node for node, _ in nearest if node not in excluded_nodes][: self.max_candidates]
+        key = (frozenset(candidates), int(agent.get_owned_rewards()))
+        if self.cache_keys.get(agent.get_id()) != key:
+            self.cache_keys[agent.get_id()] = key
+            self.tours[agent.get_id()] = self.__optimize(world, agent, candidates, int(capacity))
+        return self.tours[agent.get_id()]
+
+    def __optimize(self, world: World, agent: Agent, candidates: List[Node], capacity: int) -> List[Node]:
+        """報酬を拾い終えて保管庫に着くまでの時間が最小になる巡回順を求めるメソッド"""
+        owned_rewards = int(agent.get_owned_rewards())
+        vault_nodes = [vault.get_node() for vault in world.get_vaults()]
+        if len(vault_nodes) == 0:
+            return candidates[:1]
+
+        candidates_count = len(candidates)
+        if (capacity <= 0 or candidates_count == 0) and owned_rewards == 0:
+            return []
+        # 候補の報酬とエージェントの位置それぞれからの距離場 (最後の行がエージェントの位置から)
+        sources = candidates + [agent.get_node()]
+        fields = world.get_distance_fields(sources).astype(float)
+        fields[fields < 0] = np.inf
+        candidate_xs = np.array([node.x for node in candidates], dtype=np.int64)
+        candidate_ys = np.array([node.y for node in candidates], dtype=np.int64)
+        vault_xs = np.array([node.x for node in vault_nodes], dtype=np.int64)
+        vault_ys = np.array([node.y for node in vault_nodes], dtype=np.int64)
+        # 拾える報酬がない場合は、報酬を持っていれば最寄りの保管庫に向かう
+        if capacity <= 0 or candidates_count == 0:
+            direct_distances = fields[-1][vault_xs, vault_ys]
+            # 到達できる保管庫がない場合は、届かない保管庫に向かわせずその場に留まらせる
+            if np.isinf(direct_distances).all():
+                return []
+            return [vault_nodes[int(np.argmin(direct_distances))]]
+
+        # 候補間の距離、エージェントから候補までの距離、候補から最寄りの保管庫までの距離とその保管庫
+        pair_distances = fields[:candidates_count][:, candidate_xs, candidate_ys]
+        start_distances = fields[-1][candidate_xs, candidate_ys]
+        vault_distances = fields[:candidates_count][:, vault_xs, vault_ys]
+        nearest_vaults = np.argmin(vault_distances, axis=1)
+        return_distances = vault_distances[np.arange(candidates_count), nearest_vaults]
+        # どの候補からも保管庫に到達できない場合は、届けられない報酬を拾いに行かない
+        if np.isinf(return_distances).all():
+            return []
+
+        # cost[mask, last]: 部分集合maskの報酬を拾い、最後にlastの報酬を拾うまでの最短時間
+        batch_size = min(capacity, candidates_count)
+        masks_count = 1 << candidates_count
+        cost = np.full((masks_count, candidates_count), np.inf)
+        parent = np.full((masks_count, candidates_count), -1, dtype=np.int64)
+        bits = 1 << np.arange(candidates_count)
+        cost[bits, np.arange(candidates_count)] = start_distances
+        popcounts = [bin(mask).count("1") for mask in range(masks_count)]
+        best_tour: List[Node] = []
+        best_time = np.inf
+        for mask in range(1, masks_count):
+            if popcounts[mask] == batch_size:
+                # 拾い終えてから保管庫に着くまでの時間を評価する
+                total_times = cost[mask] + return_distances
+                last = int(np.argmin(total_times))
+                if total_times[last] < best_time:
+                    best_time = total_times[last]
+                    best_tour = self.__restore_tour(parent, mask, last, candidates)
+                    best_tour.append(vault_nodes[nearest_vaults[last]])
+                continue
+            if popcounts[mask] > batch_size:
+                continue
+            # maskに含まれない報酬を次に拾う場合の時間を、直前に拾う報酬についてまとめて計算する
+            next_costs = cost[mask][:, None] + pair_distances
+            previous = np.argmin(next_costs, axis=0)
+            next_costs = next_costs[previous, np.arange(candidates_count)]
+            for next_index in np.flatnonzero((mask & bits) == 0):
+                next_mask = mask | (1 << next_index)
+                if next_costs[next_index] < cost[next_mask, next_index]:
+                    cost[next_mask, next_index] = next_costs[next_index]
+                    parent[next_mask, next_index] = previous[next_index]
+        return best_tour
+
+    def __restore_tour(self, parent: np.ndarray, mask: int, last: int, candidates: List[Node]) -> List[Node]:
+        """動的計画法の親をたどって、拾う報酬の順番を復元するメソッド"""
+        tour: List[Node] = []
+        while last >= 0:
+            tour.append(candidates[last])
+            previous = int(parent[mask, last])
+            mask ^= 1 << last
+            last = previous
+        tour.reverse()
+        return tour
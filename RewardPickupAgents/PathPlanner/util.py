@@ -1,10 +1,12 @@
 # Description: 経路計画プログラムに役立つ関数をまとめたモジュール
+import heapq
 import numpy as np
 import random
 from dataclasses import dataclass
 from typing import List, Dict, Union, Tuple
 
 from ..World import Node, Environment, World
+from .ReservationTable import ReservationTable
 
 
 def get_adjacent_nodes(node: Node) -> List[Node]:
@@ -56,60 +58,48 @@ def get_astar_path(world: World, node1: Node, node2: Node) -> Union[List[Node],
     Returns:
         List[Node]: 経路、経路が存在しない場合はNone
     """
-
-    class AStarNode:
-        def __init__(self, node: Node, g: int, h: float, trajectory: List[Node] = []):
-            self.node = node
-            self.g = g
-            self.h = h
-            self.trajectory: List[Node] = trajectory
-
-        def get_f(self):
-            return self.g + self.h
-
-        def __eq__(self, other):
-            return self.node == other.node
-
-        def __lt__(self, other):
-            return self.get_f() < other.get_f()
-
     env: Environment = world.environment
 
     if env.is_obstacle(node1) or env.is_obstacle(node2):
         return None
 
-    new_node1 = AStarNode(node1, 0, get_manhattan_distance(node1, node2))
-
-    open_list: List[AStarNode] = [new_node1]
-    close_list: List[AStarNode] = []
-    while len(open_list) > 0:
-        current_node = open_list.pop(0)
-        close_list.append(current_node)
-        if current_node.node == node2:
-            return [*current_node.trajectory, node2]
-        for new_node in get_adjacent_nodes(current_node.node):
-            next_node = AStarNode(
-                new_node,
-                current_node.g + 1,
-                get_manhattan_distance(new_node, node2),
-                [*current_node.trajectory, current_node.node],
-            )
-            if not env.is_valid_node(next_node.node):
+    width, height = env.get_environment_size()
+    indptr, indices = env.adjacency_indptr_list, env.adjacency_indices_list
+    start = env.get_cell_id(node1)
+    goal = env.get_cell_id(node2)
+    goal_x, goal_y = node2.x, node2.y
+
+    # セルIDで引けるg値と親セルの配列 (経路は親をたどって復元する)
+    unvisited = width * height
+    g_score: List[int] = [unvisited] * (width * height)
+    parent: List[int] = [-1] * (width * height)
+    g_score[start] = 0
+
+    # (f値, h値, セルID) のヒープ、f値が同じ場合はゴールに近い方を優先する
+    h = abs(node1.x - goal_x) + abs(node1.y - goal_y)
+    open_heap: List[Tuple[int, int, int]] = [(h, h, start)]
+    while open_heap:
+        f, h, current = heapq.heappop(open_heap)
+        g = f - h
+        if g > g_score[current]:
+            # より良い経路で既に展開済み
+            continue
+        if current == goal:
+            path: List[Node] = []
+            while current != -1:
+                path.append(env.nodes[current])
+                current = parent[current]
+            path.reverse()
+            return path
+        next_g = g + 1
+        for neighbor in indices[indptr[current] : indptr[current + 1]]:
+            if next_g >= g_score[neighbor]:
                 continue
-            if next_node in close_list:
-                index = close_list.index(next_node)
-                if close_list[index] > next_node:
-                    close_list.pop(index)
-                    open_list.append(next_node)
-                else:
-                    continue
-            if next_node in open_list:
-                index = open_list.index(next_node)
-                if open_list[index] > next_node:
-                    open_list[index] = next_node
-            else:
-                open_list.append(next_node)
-        open_list.sort()
+            g_score[neighbor] = next_g
+            parent[neighbor] = current
+            nx, ny = divmod(neighbor, height)
+            nh = abs(nx - goal_x) + abs(ny - goal_y)
+            heapq.heappush(open_heap, (next_g + nh, nh, neighbor))
     return None
 
 
@@ -128,3 +118,150 @@ def get_astar_distance(world: World, node1: Node, node2: Node) -> int:
     if path is None:
         return -1
     return len(path) - 1
+
+
+def get_space_time_astar_path(
+    world: World,
+    node1: Node,
+    node2: Node,
+    reservation_table: ReservationTable,
+    agent_id: int,
+    start_time: int,
+    horizon: int,
+    heuristic_field: Union[np.ndarray, None] = None,
+) -> Union[List[Node], None]:
+    """予約表の予約を避けながら、時刻を考慮した最短経路を返す関数
+
+    その場に留まる行動も含めて探索し、horizonステップ先までの経路を返す
+    horizon以内に目的地に着いた場合は、残りの時刻は目的地に留まる経路になる
+    horizon以内に着けない場合は、horizonステップ後に目的地に最も近づける経路を返す
+
+    Args:
+        world (World): ワールドインスタンス
+        node1 (Node): 出発するノード
+        node2 (Node): 目的のノード
+        reservation_table (ReservationTable): 予約表
+        agent_id (int): 経路を探索するエージェントのID (自分の予約は避けない)
+        start_time (int): 出発する時刻
+        horizon (int): 探索する時間幅
+        heuristic_field (Union[np.ndarray, None]): 目的のノードまでの最短距離の配列, Noneの場合はマンハッタン距離を使う
+
+    Returns:
+        List[Node]: 時刻start_time + iにいるノードをi番目に持つ長さhorizon + 1の経路、経路が存在しない場合はNone
+    """
+    env: Environment = world.environment
+    width, height = env.get_environment_size()
+    passable = env.passable_cells
+    indptr, indices = env.adjacency_indptr_list, env.adjacency_indices_list
+    start = env.get_cell_id(node1)
+    goal = env.get_cell_id(node2)
+
+    def heuristic(cell: int) -> int:
+        x, y = divmod(cell, height)
+        if heuristic_field is not None:
+            distance = int(heuristic_field[x, y])
+            # 到達できないセルは探索しない
+            return distance if distance >= 0 else -1
+        return abs(x - node2.x) + abs(y - node2.y)
+
+    h = heuristic(start)
+    if h < 0:
+        h = width * height
+    # (f値, h値, 経過時間, セルID)
+    open_heap: List[Tuple[int, int, int, int]] = [(h, h, 0, start)]
+    parent: Dict[Tuple[int, int], Union[Tuple[int, int], None]] = {(start, 0): None}
+    closed = set()
+    while open_heap:
+        f, h, elapsed, current = heapq.heappop(open_heap)
+        if (current, elapsed) in closed:
+            continue
+        closed.add((current, elapsed))
+        # 目的地に着いても、その後に留まり続けられない場合は探索を続ける
+        is_goal = current == goal and all(
+            reservation_table.is_move_free(goal, goal, start_time + t, agent_id) for t in range(elapsed, horizon)
+        )
+        if is_goal or elapsed == horizon:
+            cells: List[int] = []
+            state: Union[Tuple[int, int], None] = (current, elapsed)
+            while state is not None:
+                cells.append(state[0])
+                state = parent[state]
+            cells.reverse()
+            cells.extend([current] * (horizon + 1 - len(cells)))
+            return [env.get_node_from_cell_id(cell) for cell in cells]
+        time = start_time + elapsed
+        # その場に留まる行動を先に調べる
+        neighbors = indices[indptr[current] : indptr[current + 1]]
+        if passable[current]:
+            neighbors.insert(0, current)
+        for neighbor in neighbors:
+            state = (neighbor, elapsed + 1)
+            if state in closed or state in parent:
+                continue
+            if not reservation_table.is_move_free(current, neighbor, time, agent_id):
+                continue
+            nh = heuristic(neighbor)
+            if nh < 0:
+                continue
+            parent[state] = (current, elapsed)
+            heapq.heappush(open_heap, (elapsed + 1 + nh, nh, elapsed + 1, neighbor))
+    return None
+
+
+def solve_assignment(cost_matrix: np.ndarray) -> List[Tuple[int, int]]:
+    """コストの合計が最小になる行と列の組み合わせを求める関数 (ハンガリアン法)
+
+    行と列の数が異なる場合は、少ない方の全てが割り当てられる
+    最短増加路を1行ずつ求める実装で、列方向の更新をNumPyでまとめて行う
+
+    Args:
+        cost_matrix (np.ndarray): (行数, 列数)のコスト行列
+
+    Returns:
+        List[Tuple[int, int]]: 割り当てた(行, 列)のリスト (行の昇順)
+    """
+    cost_matrix = np.asarray(cost_matrix, dtype=float)
+    if cost_matrix.size == 0:
+        return []
+    transposed = cost_matrix.shape[0] > cost_matrix.shape[1]
+    if transposed:
+        cost_matrix = cost_matrix.T
+    rows_count, columns_count = cost_matrix.shape
+
+    # 行と列のポテンシャル、列に割り当てた行(0は未割り当て)、増加路での直前の列 (いずれも先頭は番兵)
+    row_potential = np.zeros(rows_count + 1)
+    column_potential = np.zeros(columns_count + 1)
+    column_owner = np.zeros(columns_count + 1, dtype=np.int64)
+    previous_column = np.zeros(columns_count + 1, dtype=np.int64)
+    for row in range(1, rows_count + 1):
+        column_owner[0] = row
+        current_column = 0
+        min_slack = np.full(columns_count + 1, np.inf)
+        used = np.zeros(columns_count + 1, dtype=bool)
+        while True:
+            used[current_column] = True
+            current_row = column_owner[current_column]
+            slack = cost_matrix[current_row - 1] - row_potential[current_row] - column_potential[1:]
+            improved = ~used[1:] & (slack < min_slack[1:])
+            min_slack[1:][improved] = slack[improved]
+            previous_column[1:][improved] = current_column
+            next_column = int(np.argmin(np.where(used[1:], np.inf, min_slack[1:]))) + 1
+            delta = min_slack[next_column]
+            row_potential[column_owner[used]] += delta
+            column_potential[used] -= delta
+            min_slack[1:][~used[1:]] -= delta
+            current_column = next_column
+            if column_owner[current_column] == 0:
+                break
+        # 増加路に沿って割り当てを入れ替える
+        while current_column != 0:
+            column = previous_column[current_column]
+            column_owner[current_column] = column_owner[column]
+            current_column = column
+
+    pairs = [
+        (int(column_owner[column]) - 1, column - 1) for column in range(1, columns_count + 1) if column_owner[column]
+    ]
+    if transposed:
+        pairs = [(column, row) for row, column in pairs]
+    return sorted(pairs)
@@ -0,0 +1,140 @@
+# Description: シミュレーションの各フェーズの計算時間を計測し、集計結果をJSONで出力するモジュール
+import cProfile
+import json
+import os
+import pstats
+import time
+import numpy as np
+from contextlib import contextmanager
+from typing import List, Dict, Union, Iterator
+
+PROFILE_REPORT_VERSION = 1
+# 集計するパーセンタイル
+PROFILE_PERCENTILES = (50, 95, 99)
+
+
+def summarize_durations(durations: List[float]) -> Dict[str, float]:
+    """計測した時間の列を集計する関数
+
+    Args:
+        durations (List[float]): 計測した時間(秒)のリスト
+
+    Returns:
+        Dict[str, float]: 回数, 合計, 平均, パーセンタイル(p50, p95, p99), 最大値
+    """
+    if len(durations) == 0:
+        return {"count": 0}
+    values = np.asarray(durations)
+    summary = {"count": len(values), "total": float(values.sum()), "mean": float(values.mean())}
+    for percentile, value in zip(PROFILE_PERCENTILES, np.percentile(values, PROFILE_PERCENTILES)):
+        summary["p{}".format(percentile)] = float(value)
+    summary["max"] = float(values.max())
+    return summary
+
+
+class PhaseProfiler:
+    """フェーズごとに1回の呼び出しにかかった実時間とCPU時間を記録するクラス
+
+    Args:
+        profile_planner (bool): 経路計画プログラムのフェーズ("planner")をcProfileで計測するかどうか
+    """
+
+    # 経路計画プログラムのフェーズ名
+    PLANNER_PHASE = "planner"
+
+    def __init__(self, profile_planner: bool = False):
+        self.wall_times: Dict[str, List[float]] = {}
+        self.cpu_times: Dict[str, List[float]] = {}
+        self.planner_profile: Union[cProfile.Profile, None] = cProfile.Profile() if profile_planner else None
+
+    @contextmanager
+    def measure(self, phase: str) -> Iterator[None]:
+        """withブロック内の処理にかかった時間をフェーズの1回分として記録するメソッド
+
+        Args:
+            phase (str): フェーズ名
+        """
+        profile = self.planner_profile if phase == self.PLANNER_PHASE else None
+        if profile is not None:
+            profile.enable()
+        wall_start = time.perf_counter()
+        cpu_start = time.process_time()
+        try:
+            yield
+        finally:
+            cpu_time = time.process_time() - cpu_start
+            wall_time = time.perf_counter() - wall_start
+            if profile is not None:
+                profile.disable()
+            self.wall_times.setdefault(phase, []).append(wall_time)
+            self.cpu_times.setdefault(phase, []).append(cpu_time)
+
+    def get_summary(self) -> Dict[str, Dict[str, Dict[str, float]]]:
+        """フェーズごとの実時間とCPU時間の集計結果を取得するメソッド
+
+        Returns:
+            Dict[str, Dict[str, Dict[str, float]]]: フェーズ名 -> "wall"/"cpu" -> 集計結果(秒)
+        """
+        return {
+            phase: {
+                "wall": summarize_durations(self.wall_times[phase]),
+                "cpu": summarize_durations(self.cpu_times[phase]),
+            }
+            for phase in self.wall_times
+        }
+
+    def get_planner_hotspots(self, limit: int = 30) -> List[Dict[str, Union[str, int, float]]]:
+        """cProfileで計測した経路計画プログラムの関数を、累積時間の長い順に取得するメソッド
+
+        Args:
+            limit (int): 取得する関数の数
+
+        Returns:
+            List[Dict[str, Union[str, int, float]]]: 関数ごとの呼び出し回数, 関数自体の時間, 累積時間(秒)
+        """
+        if self.planner_profile is None:
+            return []
+        stats = pstats.Stats(self.planner_profile).stats
+        hotspots = []
+        for (file_name, line, function_name), (_, calls, total_time, cumulative_time, _) in stats.items():
+            hotspots.append(
+                {
+                    "function": "{}:{}({})".format(file_name, line, function_name),
+                    "calls": calls,
+                    "total_time": total_time,
+                    "cumulative_time": cumulative_time,
+                }
+            )
+        hotspots.sort(key=lambda hotspot: hotspot["cumulative_time"], reverse=True)
+        return hotspots[:limit]
+
+    def get_report(self, metadata: Union[Dict, None] = None) -> Dict:
+        """集計結果をまとめたレポートを取得するメソッド
+
+        Args:
+            metadata (Union[Dict, None]): レポートに含める付加情報 (経路計画プログラム名や結果など)
+
+        Returns:
+            Dict: JSONに変換できるレポート
+        """
+        report = {"version": PROFILE_REPORT_VERSION, "phases": self.get_summary()}
+        if metadata is not None:
+            report["metadata"] = metadata
+        if self.planner_profile is not None:
+            report["planner_hotspots"] = self.get_planner_hotspots()
+        return report
+
+    def save_report(self, report_path: str, metadata: Union[Dict, None] = None):
+        """レポートをJSONで保存するメソッド
+
+        cProfileで計測している場合は、pstatsやsnakevizで読み込めるファイルを拡張子.profで並べて保存する
+
+        Args:
+            report_path (str): 保存先のパス
+            metadata (Union[Dict, None]): レポートに含める付加情報
+        """
+        os.makedirs(os.path.dirname(report_path) or ".", exist_ok=True)
+        with open(report_path, "w") as f:
+            json.dump(self.get_report(metadata), f, indent=2)
+        if self.planner_profile is not None:
+            self.planner_profile.dump_stats(os.path.splitext(report_path)[0] + ".prof")
@@ -0,0 +1,312 @@
+# Description: 設定を明示的に受け取ってシミュレーションを進めるクラスをまとめたモジュール
+import numpy as np
+from dataclasses import dataclass, asdict
+from time import sleep
+from typing import List, Dict, Union, Type
+
+from .World import World, Node
+from .DistanceTable import ACTION_DELTAS
+from .MoveResolver import COLLISION_RESOLUTIONS, resolve_simultaneous_moves
+from .parameter import *
+from .PathPlanner.PathPlannerAbstract import PathPlannerAbstract
+from .TraceLog import TraceWriter
+from .Profiler import PhaseProfiler
+
+
+@dataclass
+class SimulationConfig:
+    """シミュレーションの設定 (既定値はparameter.pyの値)"""
+
+    map_width: Union[int, None] = MAP_WIDTH
+    map_height: Union[int, None] = MAP_HEIGHT
+    obstacle_file: str = OBSTACLE_CSV_FILE_PATH
+    reward_probability_file: str = REWARD_CSV_FILE_PATH
+    maximum_rewards_capacity: int = MAXIMUM_REWARDS_CAPACITY
+    simulation_timestep: int = SIMULATION_TIMESTEP
+    seed: Union[int, None] = RANDOM_SEED
+    print_map_in_terminal: bool = PRINT_MAP_IN_TEMINAL
+    create_gif: bool = CREATE_GIF
+    gif_writer: str = GIF_WRITER
+    gif_save_path: str = GIF_SAVE_PATH
+    trace_path: Union[str, None] = TRACE_SAVE_PATH
+    profile_report_path: Union[str, None] = PROFILE_REPORT_PATH
+    profile_planner: bool = PROFILE_PLANNER
+    collision_resolution: str = COLLISION_RESOLUTION
+
+
+@dataclass
+class StepResult:
+    """1ステップ分のシミュレーション結果"""
+
+    step: int
+    collisions: int
+    agents_owned_rewards: float
+    stored_rewards: float
+
+
+@dataclass
+class SimulationResult:
+    """シミュレーション全体の結果"""
+
+    step: int
+    agents_owned_rewards: float
+    stored_rewards: float
+    collision_count: int
+
+    def to_dict(self) -> Dict[str, float]:
+        return asdict(self)
+
+
+class Simulator:
+    """ワールドと経路計画プログラムを保持し、シミュレーションを1ステップずつ進めるクラス
+
+    同じSimulatorをreset()して使い回すことで、マップを読み直さずに何度でもシミュレーションを実行できる
+    各フェーズの計算時間はprofilerに記録される
+
+    Args:
+        config (SimulationConfig): シミュレーションの設定
+        planner_class (Type[PathPlannerAbstract]): 経路計画プログラムのクラス
+        world (Union[World, None]): 読み込み済みのワールド, Noneの場合はconfigに従って読み込む
+    """
+
+    def __init__(
+        self,
+        config: SimulationConfig,
+        planner_class: Type[PathPlannerAbstract],
+        world: Union[World, None] = None,
+    ):
+        if config.collision_resolution not in COLLISION_RESOLUTIONS:
+            raise ValueError(
+                "collision_resolution must be one of {}: {}".format(COLLISION_RESOLUTIONS, config.collision_resolution)
+            )
+        self.config = config
+        self.planner_class = planner_class
+        if world is None:
+            world = World(
+                config.map_width,
+                config.map_height,
+                config.obstacle_file,
+                config.reward_probability_file,
+                config.seed,
+                config.maximum_rewards_capacity,
+            )
+        self.world = world
+        self.next_nodes_selector: PathPlannerAbstract = planner_class()
+        self.step_count: int = 0
+        self.collision_count: int = 0
+        self.profiler = PhaseProfiler(config.profile_planner)
+
+    def reset(self, seed: Union[int, None] = None):
+        """ワールドと経路計画プログラムを初期状態に戻すメソッド
+
+        Args:
+            seed (Union[int, None]): 報酬の出現に使う乱数のシード
+        """
+        self.world.reset(seed)
+        self.next_nodes_selector = self.planner_class()
+        self.step_count = 0
+        self.collision_count = 0
+        self.profiler = PhaseProfiler(self.config.profile_planner)
+
+    def get_agents_owned_rewards(self) -> float:
+        return float(self.world.agent_owned_rewards.sum())
+
+    def get_stored_rewards(self) -> float:
+        return float(self.world.vault_stored_rewards.sum())
+
+    def step(self) -> StepResult:
+        """シミュレーションを1ステップ進めるメソッド
+
+        Returns:
+            StepResult: このステップの結果
+        """
+        world = self.world
+        profiler = self.profiler
+        # 報酬を出現させる
+        with profiler.measure("update_reward"):
+            world.update_reward()
+        # エージェントの行動を決める
+        with profiler.measure(PhaseProfiler.PLANNER_PHASE):
+            actions = self.next_nodes_selector.get_action_array(world)
+        # エージェントの移動
+        with profiler.measure("move"):
+            collisions = self.__move_agents(actions)
+
+        with profiler.measure("collect_and_store"):
+            # 報酬の取得
+            for agent in world.agents:
+                world.earn_reward(agent)
+
+            # 報酬の保管
+            for agent in world.agents:
+                vault = world.get_vault_with_node(agent.get_node())
+                if vault:
+                    vault.store_rewards(agent.get_owned_rewards())
+                    agent.owned_reward = 0
+
+        self.step_count += 1
+        self.collision_count += collisions
+        return StepResult(self.step_count, collisions, self.get_agents_owned_rewards(), self.get_stored_rewards())
+
+    def __move_agents(self, actions: np.ndarray) -> int:
+        """行動の配列を検証してエージェントを移動させ、衝突回数を返すメソッド
+
+        行動の配列は整数型であれば幅は問わない(int8に限らない)
+        行動の検証はセルごとに取れる行動の表(Environment.valid_action_mask)でまとめて行い、
+        衝突は設定のcollision_resolutionに従って解決する (MoveResolver.COLLISION_RESOLUTIONSを参照)
+        移動先のNodeは新しく作らず、環境が持つセルごとのNodeを使う
+        """
+        world = self.world
+        env = world.environment
+        actions = np.asarray(actions)
+        agents_count = world.get_agents_count()
+        if actions.shape != (agents_count,) or actions.dtype.kind not in "iu":
+            raise ValueError(
+                "行動の配列が(エージェント数,) = ({},)の整数配列ではありません: {} {}".format(
+                    agents_count, actions.shape, actions.dtype
+                )
+            )
+        invalid = (actions < 0) | (actions >= len(ACTION_DELTAS))
+        if invalid.any():
+            agent_id = int(np.flatnonzero(invalid)[0])
+            raise ValueError(
+                "エージェントが取れない行動を選択しようとしています。 Agent ID: {}, Action: {}".format(
+                    agent_id, actions[agent_id]
+                )
+            )
+        positions = world.agent_positions
+        current_cells = positions[:, 0] * env.height + positions[:, 1]
+        invalid = ~env.valid_action_mask[current_cells, actions]
+        if invalid.any():
+            agent_id = int(np.flatnonzero(invalid)[0])
+            x, y = (positions[agent_id] + ACTION_DELTAS[actions[agent_id]]).tolist()
+            raise ValueError(
+                "エージェントが範囲外もしくは障害物に移動しようとしています。 Agent ID: {}, Node: {}".format(
+                    agent_id, Node(x, y)
+                )
+            )
+        targets = positions + ACTION_DELTAS[actions]
+        target_cells = targets[:, 0] * env.height + targets[:, 1]
+        occupancy = world.agent_occupancy_grid.ravel()
+
+        if self.config.collision_resolution == "simultaneous":
+            resolved_cells, blocked = resolve_simultaneous_moves(current_cells, target_cells, occupancy)
+            for agent_id in np.flatnonzero(resolved_cells != current_cells).tolist():
+                world.agents[agent_id].set_node(env.nodes[resolved_cells[agent_id]])
+            return int(blocked.sum())
+
+        # エージェントIDの順に移動し、移動先にエージェントがいれば衝突とする
+        # (その場に留まる場合も移動先に自分がいるため衝突として数える)
+        collisions = 0
+        for agent, target_cell in zip(world.agents, target_cells.tolist()):
+            if occupancy[target_cell] >= 0:
+                collisions += 1
+                continue
+            agent.set_node(env.nodes[target_cell])
+        return collisions
+
+    def get_result(self) -> SimulationResult:
+        """現在までのシミュレーション結果を取得するメソッド
+
+        Returns:
+            SimulationResult: シミュレーション結果
+        """
+        return SimulationResult(
+            self.step_count, self.get_agents_owned_rewards(), self.get_stored_rewards(), self.collision_count
+        )
+
+    def __write_trace(self, trace_writer: TraceWriter):
+        world = self.world
+        trace_writer.write(
+            self.step_count,
+            world.get_reward_array(),
+            world.get_agents_pos_dict(),
+            world.agent_owned_rewards.tolist(),
+            world.vault_stored_rewards.tolist(),
+        )
+
+    def run(self, n_steps: Union[int, None] = None) -> SimulationResult:
+        """シミュレーションをn_stepsステップ進めるメソッド
+
+        設定に応じてターミナルへのマップの表示、GIFアニメーションの作成、状態の記録を行う
+
+        Args:
+            n_steps (Union[int, None]): 進めるステップ数, Noneの場合は設定のsimulation_timestep
+
+        Returns:
+            SimulationResult: シミュレーション結果
+        """
+        if n_steps is None:
+            n_steps = self.config.simulation_timestep
+        world = self.world
+        trace_writer = None
+        gif_maker = None
+        try:
+            if self.config.trace_path is not None:
+                trace_writer = TraceWriter(
+                    self.config.trace_path,
+                    world.get_obstacle_data(),
+                    world.get_vaults_pos_dict(),
+                    world.get_agents_count(),
+                )
+                self.__write_trace(trace_writer)
+            if self.config.create_gif:
+                # matplotlibなどの読み込みはGIFを作成する場合のみ行う
+                from .GIFMaker import GIFMaker, StreamingGIFMaker
+
+                if self.config.gif_writer == "streaming":
+                    gif_maker = StreamingGIFMaker(
+                        world.get_obstacle_data(),
+                        world.get_agents_count(),
+                        world.get_vaults_count(),
+                        self.config.gif_save_path,
+                    )
+                elif self.config.gif_writer == "matplotlib":
+                    gif_maker = GIFMaker(world.get_obstacle_data(), world.get_agents_count(), world.get_vaults_count())
+                else:
+                    raise ValueError("Invalid gif_writer: {}".format(self.config.gif_writer))
+                gif_maker.update(
+                    self.step_count,
+                    self.get_stored_rewards(),
+                    world.get_reward_array(),
+                    world.get_agents_pos_dict(),
+                    world.get_vaults_pos_dict(),
+                )
+
+            for _ in range(n_steps):
+                step_result = self.step()
+                if trace_writer is not None:
+                    with self.profiler.measure("trace"):
+                        self.__write_trace(trace_writer)
+                if gif_maker is not None:
+                    with self.profiler.measure("render"):
+                        gif_maker.update(
+                            step_result.step,
+                            step_result.stored_rewards,
+                            world.get_reward_array(),
+                            world.get_agents_pos_dict(),
+                            world.get_vaults_pos_dict(),
+                        )
+                if self.config.print_map_in_terminal:
+                    with self.profiler.measure("print_map"):
+                        print("Step", step_result.step)
+                        print("Agents Owned Reward", step_result.agents_owned_rewards)
+                        print("Stored Reward", step_result.stored_rewards)
+                        print("Collision Count", self.collision_count)
+                        world.print_map_state()
+                    sleep(1)
+
+            if gif_maker is not None:
+                with self.profiler.measure("save_gif"):
+                    gif_maker.save_gif(self.config.gif_save_path)
+        finally:
+            # 経路計画プログラムや行動の検証で例外が送出された場合も、それまでに書き出した内容でファイルを閉じる
+            if trace_writer is not None:
+                trace_writer.close()
+            if gif_maker is not None:
+                gif_maker.close()
+        result = self.get_result()
+        if self.config.profile_report_path is not None:
+            metadata = {"planner": self.planner_class.__name__, "result": result.to_dict()}
+            self.profiler.save_report(self.config.profile_report_path, metadata)
+        return result
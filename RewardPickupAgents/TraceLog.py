@@ -0,0 +1,243 @@
+# Description: エピソードの状態をステップごとにバイナリで記録し、後から再生するためのモジュール
+import base64
+import json
+import os
+import struct
+import numpy as np
+from typing import List, Dict, Union, Tuple, Iterator
+
+from .parameter import *
+
+TRACE_MAGIC = b"RPATRACE"
+TRACE_VERSION = 1
+# レコードの開始位置の境界 (byte)
+TRACE_ALIGNMENT = 64
+
+
+def get_record_dtype(width: int, height: int, agents_count: int, vaults_count: int) -> np.dtype:
+    """1ステップ分のレコードの型を取得する関数
+
+    報酬の配列は前のステップとの差分(報酬の有無のXOR)をビット単位で詰めて保持する
+
+    Args:
+        width (int): マップの横幅
+        height (int): マップの縦幅
+        agents_count (int): エージェントの数
+        vaults_count (int): 保管庫の数
+
+    Returns:
+        np.dtype: レコードの型
+    """
+    return np.dtype(
+        [
+            ("step", "<i4"),
+            ("positions", "<i2", (agents_count, 2)),
+            ("owned_rewards", "<i2", (agents_count,)),
+            ("stored_rewards", "<i4", (vaults_count,)),
+            ("reward_diff", "u1", ((width * height + 7) // 8,)),
+        ]
+    )
+
+
+class TraceWriter:
+    """エピソードの状態をステップごとにファイルに追記するクラス
+
+    ファイルはヘッダ(JSON)と固定長のレコードの列からなり、TraceReaderでメモリマップとして読み込める
+
+    Args:
+        trace_path (str): 保存先のパス
+        obstacle_data (np.ndarray): 障害物のデータ
+        vaults_pos_dict (Dict[int, List[int]]): 保管庫の位置情報
+        agents_count (int): エージェントの数
+    """
+
+    def __init__(
+        self, trace_path: str, obstacle_data: np.ndarray, vaults_pos_dict: Dict[int, List[int]], agents_count: int
+    ):
+        width, height = obstacle_data.shape
+        vaults_count = len(vaults_pos_dict)
+        header = {
+            "version": TRACE_VERSION,
+            "width": width,
+            "height": height,
+            "agents_count": agents_count,
+            "vaults_count": vaults_count,
+            "vaults": [vaults_pos_dict[i] for i in range(vaults_count)],
+            "obstacle": base64.b64encode(np.packbits(obstacle_data.ravel() == 1).tobytes()).decode("ascii"),
+        }
+        header_bytes = json.dumps(header).encode("utf-8")
+        header_size = len(TRACE_MAGIC) + 4 + len(header_bytes)
+        padding = -header_size % TRACE_ALIGNMENT
+
+        os.makedirs(os.path.dirname(trace_path) or ".", exist_ok=True)
+        self.file = open(trace_path, "wb")
+        self.file.write(TRACE_MAGIC + struct.pack("<I", len(header_bytes) + padding))
+        self.file.write(header_bytes + b" " * padding)
+        self.record = np.zeros(1, dtype=get_record_dtype(width, height, agents_count, vaults_count))
+        self.previous_reward_mask = np.zeros(width * height, dtype=bool)
+
+    def write(
+        self,
+        step: int,
+        reward_data: np.ndarray,
+        agents_pos_dict: Dict[int, List[int]],
+        agents_owned_rewards: List[float],
+        vaults_stored_rewards: List[float],
+    ):
+        """1ステップ分の状態を追記するメソッド
+
+        Args:
+            step (int): ステップ数
+            reward_data (np.ndarray): 報酬の配列
+            agents_pos_dict (Dict[int, List[int]]): エージェントの位置情報
+            agents_owned_rewards (List[float]): エージェントごとの保有している報酬
+            vaults_stored_rewards (List[float]): 保管庫ごとの保管されている報酬
+        """
+        record = self.record[0]
+        record["step"] = step
+        record["positions"] = [agents_pos_dict[i] for i in range(len(agents_pos_dict))]
+        record["owned_rewards"] = agents_owned_rewards
+        record["stored_rewards"] = vaults_stored_rewards
+        reward_mask = reward_data.ravel() > 0
+        record["reward_diff"] = np.packbits(reward_mask ^ self.previous_reward_mask)
+        self.previous_reward_mask = reward_mask
+        self.file.write(self.record.tobytes())
+
+    def close(self):
+        """ファイルを閉じるメソッド (閉じた後に呼び出しても何もしない)"""
+        self.file.close()
+
+
+class TraceReader:
+    """TraceWriterで記録したファイルをメモリマップとして読み込むクラス
+
+    Args:
+        trace_path (str): 記録したファイルのパス
+    """
+
+    def __init__(self, trace_path: str):
+        with open(trace_path, "rb") as f:
+            if f.read(len(TRACE_MAGIC)) != TRACE_MAGIC:
+                raise ValueError("Not a trace file: {}".format(trace_path))
+            (header_length,) = struct.unpack("<I", f.read(4))
+            header = json.loads(f.read(header_length).decode("utf-8"))
+        if header["version"] != TRACE_VERSION:
+            raise ValueError("Unsupported trace version: {}".format(header["version"]))
+        self.width: int = header["width"]
+        self.height: int = header["height"]
+        self.agents_count: int = header["agents_count"]
+        self.vaults_count: int = header["vaults_count"]
+        self.vaults_pos_dict: Dict[int, List[int]] = {i: pos for i, pos in enumerate(header["vaults"])}
+        obstacle_bits = np.frombuffer(base64.b64decode(header["obstacle"]), dtype=np.uint8)
+        self.obstacle_data = (
+            np.unpackbits(obstacle_bits, count=self.width * self.height).reshape(self.width, self.height).astype(float)
+        )
+        self.records = np.memmap(
+            trace_path,
+            dtype=get_record_dtype(self.width, self.height, self.agents_count, self.vaults_count),
+            mode="r",
+            offset=len(TRACE_MAGIC) + 4 + header_length,
+        )
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def get_reward_array(self, index: int) -> np.ndarray:
+        """index番目のレコード時点の報酬の配列を復元するメソッド
+
+        Args:
+            index (int): レコードのインデックス
+
+        Returns:
+            np.ndarray: 報酬の配列
+        """
+        reward_bits = np.bitwise_xor.reduce(self.records["reward_diff"][: index + 1], axis=0)
+        return self.__unpack_reward_bits(reward_bits)
+
+    def __unpack_reward_bits(self, reward_bits: np.ndarray) -> np.ndarray:
+        return np.unpackbits(reward_bits, count=self.width * self.height).reshape(self.width, self.height).astype(float)
+
+    def iter_states(
+        self, start: int = 0, stop: Union[int, None] = None
+    ) -> Iterator[Tuple[int, np.ndarray, Dict[int, List[int]], np.ndarray, np.ndarray]]:
+        """start番目からstop番目の手前までのレコードの状態を順に返すメソッド
+
+        Args:
+            start (int): 最初のレコードのインデックス
+            stop (Union[int, None]): 最後のレコードの次のインデックス, Noneの場合は最後まで
+
+        Yields:
+            Tuple[int, np.ndarray, Dict[int, List[int]], np.ndarray, np.ndarray]:
+                ステップ数, 報酬の配列, エージェントの位置情報, エージェントの保有する報酬, 保管庫の保管している報酬
+        """
+        if stop is None or stop > len(self.records):
+            stop = len(self.records)
+        if start >= stop:
+            return
+        reward_bits = np.bitwise_xor.reduce(self.records["reward_diff"][:start], axis=0)
+        for index in range(start, stop):
+            record = self.records[index]
+            reward_bits = reward_bits ^ record["reward_diff"]
+            agents_pos_dict = {i: [int(x), int(y)] for i, (x, y) in enumerate(record["positions"])}
+            yield (
+                int(record["step"]),
+                self.__unpack_reward_bits(reward_bits),
+                agents_pos_dict,
+                np.array(record["owned_rewards"]),
+                np.array(record["stored_rewards"]),
+            )
+
+
+def replay_to_gif(reader: TraceReader, gif_path: str, start: int = 0, stop: Union[int, None] = None):
+    """記録したエピソードの一部をGIFアニメーションとして書き出す関数
+
+    Args:
+        reader (TraceReader): 記録したエピソード
+        gif_path (str): GIFファイルの保存先
+        start (int): 最初のレコードのインデックス
+        stop (Union[int, None]): 最後のレコードの次のインデックス, Noneの場合は最後まで
+    """
+    from .GIFMaker import StreamingGIFMaker
+
+    gif_maker = StreamingGIFMaker(reader.obstacle_data, reader.agents_count, reader.vaults_count, gif_path)
+    for step, reward_array, agents_pos_dict, _, stored_rewards in reader.iter_states(start, stop):
+        gif_maker.update(step, int(stored_rewards.sum()), reward_array, agents_pos_dict, reader.vaults_pos_dict)
+    gif_maker.save_gif()
+
+
+def replay_to_terminal(reader: TraceReader, start: int = 0, stop: Union[int, None] = None):
+    """記録したエピソードの一部をターミナルに表示する関数
+
+    Args:
+        reader (TraceReader): 記録したエピソード
+        start (int): 最初のレコードのインデックス
+        stop (Union[int, None]): 最後のレコードの次のインデックス, Noneの場合は最後まで
+    """
+    for step, reward_array, agents_pos_dict, owned_rewards, stored_rewards in reader.iter_states(start, stop):
+        agent_cells = {tuple(pos) for pos in agents_pos_dict.values()}
+        vault_cells = {tuple(pos) for pos in reader.vaults_pos_dict.values()}
+        print("Step", step)
+        print("Agents Owned Reward", int(owned_rewards.sum()))
+        print("Stored Reward", int(stored_rewards.sum()))
+        for r in range(reader.width):
+            for c in range(reader.height):
+                color_start_str = ""
+                color_end_str = ""
+                if (r, c) in agent_cells:
+                    print_str = MAP_STATE.AGENT
+                    color_start_str = "\033[32m"
+                    color_end_str = "\033[0m"
+                elif (r, c) in vault_cells:
+                    print_str = MAP_STATE.VAULT
+                    color_start_str = "\033[34m"
+                    color_end_str = "\033[0m"
+                elif reader.obstacle_data[r, c] == 1:
+                    print_str = MAP_STATE.OBSTACLE
+                elif reward_array[r, c] > 0:
+                    print_str = MAP_STATE.REWARD
+                    color_start_str = "\033[33m"
+                    color_end_str = "\033[0m"
+                else:
+                    print_str = MAP_STATE.PASS_POINT
+                print(color_start_str + print_str.rjust(2) + color_end_str, end=" ")
+            print()
@@ -1,20 +1,51 @@
+import os
 import numpy as np
 import random
-from dataclasses import dataclass
-from typing import List, Dict, Union, Tuple
+from collections import deque
+from typing import List, Dict, Set, FrozenSet, Iterable, Union, Tuple
 
 from .parameter import *
+from .DistanceTable import (
+    DistanceTable,
+    compute_distance_fields,
+    compute_nearest_distance_field,
+    compute_valid_action_mask,
+    compute_adjacency,
+    compute_valid_action_bits,
+    STAY_ACTION_INDEX,
+)
+from .MapLoader import load_map_data
+from .Observation import Observation, read_only_view
 
 
-@dataclass
 class Node:
     """マップのノード(セル)を表す構造体
 
     等価比較(==)と加算(+)、減算(-)をサポートしている
+    イミュータブルであり、setやdictのキーとして利用できる
+    インスタンス辞書を持たない(__slots__)ため、生成と属性の参照が軽い
     """
 
-    x: int
-    y: int
+    __slots__ = ("x", "y")
+
+    def __init__(self, x: int, y: int):
+        object.__setattr__(self, "x", x)
+        object.__setattr__(self, "y", y)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("Node is immutable")
+
+    def __delattr__(self, name):
+        raise AttributeError("Node is immutable")
+
+    def __repr__(self) -> str:
+        return "Node(x={}, y={})".format(self.x, self.y)
+
+    def __hash__(self) -> int:
+        return hash((self.x, self.y))
+
+    def __reduce__(self):
+        return (Node, (self.x, self.y))
 
     def __eq__(self, other) -> bool:
         if not isinstance(other, Node):
@@ -32,20 +63,64 @@ class Node:
         return Node(self.x - other.x, self.y - other.y)
 
 
+# エージェントが取れる行動 (DistanceTable.ACTION_DELTASと同じ順番)
+ACTIONS_LIST: List[Node] = [Node(0, 1), Node(0, -1), Node(1, 0), Node(-1, 0), Node(0, 0)]
+# 行動からACTIONS_LISTのインデックスを引くdict
+ACTION_INDICES: Dict[Node, int] = {action: index for index, action in enumerate(ACTIONS_LIST)}
+# 取れる行動のビットマスクから取れる行動(ACTIONS_LISTの順)を引くtuple
+VALID_ACTIONS_BY_BITS: Tuple[Tuple[Node, ...], ...] = tuple(
+    tuple(action for index, action in enumerate(ACTIONS_LIST) if bits >> index & 1)
+    for bits in range(1 << len(ACTIONS_LIST))
+)
+
+
 class Agent:
     """マップ上で移動するエージェントを表すクラス
 
+    位置と保有している報酬はWorldが全エージェント分まとめて持つ配列(positions, owned_rewards)のindex行にあり、
+    このクラスはその行を読み書きするビューである (配列を渡さない場合は1行分の配列を自分で持つ)
+
     Args:
         agent_id (int): エージェントのID (0...n-1)
         maximum_reward (int): エージェントが運搬できる最大の報酬
         node (Node): エージェントの現在位置
+        occupancy_grid (Union[np.ndarray, None]): セルにいるエージェントのIDを記録する配列
+        positions (Union[np.ndarray, None]): (エージェント数, 2)のエージェントの位置の配列
+        owned_rewards (Union[np.ndarray, None]): (エージェント数,)のエージェントが保有している報酬の配列
     """
 
-    def __init__(self, agent_id: int, maximum_reward: int, node: Node):
+    __slots__ = ("agent_id", "maximum_reward", "index", "node", "positions", "owned_rewards", "occupancy_grid")
+
+    def __init__(
+        self,
+        agent_id: int,
+        maximum_reward: int,
+        node: Node,
+        occupancy_grid: Union[np.ndarray, None] = None,
+        positions: Union[np.ndarray, None] = None,
+        owned_rewards: Union[np.ndarray, None] = None,
+    ):
         self.agent_id = agent_id
         self.maximum_reward = maximum_reward
+        self.index = agent_id if positions is not None else 0
+        self.positions = positions if positions is not None else np.zeros((1, 2), dtype=np.int64)
+        self.owned_rewards = owned_rewards if owned_rewards is not None else np.zeros(1)
+        # 現在位置のNode (get_nodeで新しいNodeを作らずに返すため、positionsと一緒に更新する)
         self.node = node
-        self.owned_reward = 0
+        self.positions[self.index, 0] = node.x
+        self.positions[self.index, 1] = node.y
+        # セルにいるエージェントのIDを記録する配列 (Worldと共有し、移動のたびに更新する)
+        self.occupancy_grid = occupancy_grid
+        if self.occupancy_grid is not None:
+            self.occupancy_grid[node.x, node.y] = agent_id
+
+    @property
+    def owned_reward(self):
+        return self.owned_rewards[self.index]
+
+    @owned_reward.setter
+    def owned_reward(self, owned_reward):
+        self.owned_rewards[self.index] = owned_reward
 
     def set_node(self, node: Node):
         """エージェントの位置を更新するメソッド
@@ -53,6 +128,12 @@ class Agent:
         Args:
             node (Node): 新しいエージェントの位置
         """
+        if self.occupancy_grid is not None:
+            if self.occupancy_grid[self.node.x, self.node.y] == self.agent_id:
+                self.occupancy_grid[self.node.x, self.node.y] = -1
+            self.occupancy_grid[node.x, node.y] = self.agent_id
+        self.positions[self.index, 0] = node.x
+        self.positions[self.index, 1] = node.y
         self.node = node
 
     def get_id(self) -> int:
@@ -85,19 +166,34 @@ class Agent:
         Returns:
             int: エージェントが保有している報酬
         """
-        return self.owned_reward
+        return self.owned_rewards[self.index]
 
 
 class Vault:
     """報酬の保管庫を表すクラス
 
+    保管されている報酬はWorldが全保管庫分まとめて持つ配列(stored_rewards_array)のindex番目にある
+
     Args:
         node (Node): 報酬の保管庫の位置
+        stored_rewards_array (Union[np.ndarray, None]): (保管庫の数,)の保管されている報酬の配列
+        index (int): stored_rewards_arrayでのこの保管庫のインデックス
     """
 
-    def __init__(self, node: Node):
+    __slots__ = ("node", "stored_rewards_array", "index")
+
+    def __init__(self, node: Node, stored_rewards_array: Union[np.ndarray, None] = None, index: int = 0):
         self.node = node
-        self.stored_rewards = 0
+        self.stored_rewards_array = stored_rewards_array if stored_rewards_array is not None else np.zeros(1)
+        self.index = index if stored_rewards_array is not None else 0
+
+    @property
+    def stored_rewards(self):
+        return self.stored_rewards_array[self.index]
+
+    @stored_rewards.setter
+    def stored_rewards(self, stored_rewards):
+        self.stored_rewards_array[self.index] = stored_rewards
 
     def store_rewards(self, rewards: int):
         """報酬を保管庫に格納するメソッド
@@ -105,7 +201,7 @@ class Vault:
         Args:
             rewards (int): 保管する報酬
         """
-        self.stored_rewards += rewards
+        self.stored_rewards_array[self.index] += rewards
 
     def get_node(self) -> Node:
         """保管庫のノードを取得するメソッド
@@ -121,20 +217,58 @@ class Vault:
         Returns:
             int: 保管されている報酬
         """
-        return self.stored_rewards
+        return self.stored_rewards_array[self.index]
 
 
 class Environment:
-    """事前に決められた環境を表す静的なクラス"""
+    """事前に決められた環境を表す静的なクラス
+
+    Args:
+        width (int): 環境の横幅
+        height (int): 環境の縦幅
+        obstacle_array (Union[np.ndarray, None]): 障害物のデータ, Noneの場合は障害物のない環境
+    """
 
-    def __init__(self, width: int, height: int):
+    def __init__(self, width: int, height: int, obstacle_array: Union[np.ndarray, None] = None):
         self.width = width
         self.height = height
-        self.obstacle_array: np.ndarray = np.zeros((width, height))
+        self.obstacle_array: np.ndarray
         self.reward_probability_array: np.ndarray = np.zeros((width, height))
+        # 通行可能なセルをTrueとする配列と、それをセルID(x * height + y)で引けるようにしたリスト
+        self.passable_array: np.ndarray
+        self.passable_cells: List[bool]
+        # セルIDごとに取れる行動をTrueとする(セル数, 5)の配列 (列はACTIONS_LISTの順)
+        self.valid_action_mask: np.ndarray
+        # セルIDごとに取れる行動のビットマスク (ビットiはACTIONS_LIST[i]の行動を取れる場合に1)
+        self.valid_action_bits: np.ndarray
+        # 通行可能な隣接セルをACTIONS_LISTの順に並べたCSR形式の隣接リスト
+        # (セルcellの隣接セルはadjacency_indices[adjacency_indptr[cell] : adjacency_indptr[cell + 1]])
+        # 探索のループで使うため、Pythonのリストに変換したものも持つ
+        self.adjacency_indptr: np.ndarray
+        self.adjacency_indices: np.ndarray
+        self.adjacency_indptr_list: List[int]
+        self.adjacency_indices_list: List[int]
+        # 障害物データのハッシュ値 (距離表のキャッシュのキーに使う)
+        self.obstacle_hash: Union[str, None] = None
+        self.distance_table: Union[DistanceTable, None] = None
+        # セルIDで引ける全セルのNode (同じセルのNodeを作り直さずに使い回す)
+        self.nodes: List[Node] = [Node(x, y) for x in range(width) for y in range(height)]
+        # 障害物に依存する配列はここで一度だけ計算する
+        self.set_obstacle_array(obstacle_array if obstacle_array is not None else np.zeros((width, height)))
 
     def set_obstacle_array(self, obstacle_array: np.ndarray):
         self.obstacle_array = obstacle_array
+        self.passable_array = obstacle_array != 1
+        self.passable_cells = self.passable_array.ravel().tolist()
+        self.valid_action_mask = compute_valid_action_mask(self.passable_array).reshape(self.width * self.height, -1)
+        self.valid_action_bits = compute_valid_action_bits(self.passable_array)
+        self.adjacency_indptr, self.adjacency_indices = compute_adjacency(self.passable_array)
+        self.adjacency_indptr_list = self.adjacency_indptr.tolist()
+        self.adjacency_indices_list = self.adjacency_indices.tolist()
+        self.distance_table = None
+
+    def set_obstacle_hash(self, obstacle_hash: str):
+        self.obstacle_hash = obstacle_hash
 
     def set_reward_probability_array(self, reward_probability_array: np.ndarray):
         self.reward_probability_array = reward_probability_array
@@ -155,6 +289,159 @@ class Environment:
         """
         return self.obstacle_array
 
+    def get_distance_table(self) -> Union[DistanceTable, None]:
+        """全点対間の最短距離表を取得するメソッド
+
+        初回の呼び出し時に構築し、障害物データのハッシュ値をキーとしてディスクにキャッシュする
+
+        Returns:
+            Union[DistanceTable, None]: 最短距離表, セル数がDISTANCE_TABLE_MAX_CELLSを超える場合はNone
+        """
+        if self.width * self.height > DISTANCE_TABLE_MAX_CELLS:
+            return None
+        if self.distance_table is None:
+            cache_path = None
+            if self.obstacle_hash is not None and CACHE_DIR:
+                cache_path = os.path.join(CACHE_DIR, "distance_{}.npz".format(self.obstacle_hash))
+            self.distance_table = DistanceTable.load_or_build(self.obstacle_array, cache_path, DISTANCE_TABLE_MAX_CELLS)
+        return self.distance_table
+
+    def get_k_nearest_cells(self, source_cell: int, target_cells: Set[int], k: int) -> List[Tuple[int, int]]:
+        """source_cellからの幅優先探索で、target_cellsのうち近い順にk個のセルを求めるメソッド
+
+        k個のセルが見つかった時点(到達できるセルがk個未満の場合は全てのセルが見つかった時点)で探索を打ち切るため、
+        計算量はマップ全体ではなく見つかったセルまでの範囲の広さに比例する
+
+        Args:
+            source_cell (int): 始点のセルID
+            target_cells (Set[int]): 探すセルIDの集合
+            k (int): 求めるセルの最大数
+
+        Returns:
+            List[Tuple[int, int]]: セルIDとsource_cellからの最短距離の組のリスト (距離が近い順)
+        """
+        targets_count = min(k, len(target_cells))
+        if targets_count <= 0:
+            return []
+        indptr, indices = self.adjacency_indptr_list, self.adjacency_indices_list
+        found: List[Tuple[int, int]] = []
+        distances: Dict[int, int] = {source_cell: 0}
+        queue = deque([source_cell])
+        while queue:
+            current = queue.popleft()
+            distance = distances[current]
+            if current in target_cells:
+                found.append((current, distance))
+                if len(found) >= targets_count:
+                    break
+            for neighbor in indices[indptr[current] : indptr[current + 1]]:
+                if neighbor not in distances:
+                    distances[neighbor] = distance + 1
+                    queue.append(neighbor)
+        return found
+
+    def get_nearest_source_indices(self, source_cells: List[int]) -> np.ndarray:
+        """全てのセルについて、source_cellsのうち最も近いセルのインデックスを求めるメソッド
+
+        全ての始点から同時に1回だけ幅優先探索を行うため、計算量は始点の数によらずセル数に比例する
+
+        Args:
+            source_cells (List[int]): 始点のセルIDのリスト
+
+        Returns:
+            np.ndarray: (セル数,)の配列, [i]はセルIDがiのセルから最も近い始点のインデックス
+                (同じ距離の始点が複数ある場合は最小のインデックス, 到達できない場合は-1)
+        """
+        indptr, indices = self.adjacency_indptr_list, self.adjacency_indices_list
+        cells_count = self.width * self.height
+        distances = [-1] * cells_count
+        labels = [-1] * cells_count
+        queue = deque()
+        for index, cell in enumerate(source_cells):
+            if distances[cell] < 0:
+                distances[cell] = 0
+                labels[cell] = index
+                queue.append(cell)
+        while queue:
+            current = queue.popleft()
+            distance, label = distances[current] + 1, labels[current]
+            for neighbor in indices[indptr[current] : indptr[current + 1]]:
+                if distances[neighbor] < 0:
+                    distances[neighbor] = distance
+                    labels[neighbor] = label
+                    queue.append(neighbor)
+                elif distances[neighbor] == distance and label < labels[neighbor]:
+                    # 同じ距離の始点が複数ある場合は、インデックスが最小の始点を選ぶ
+                    labels[neighbor] = label
+        return np.array(labels, dtype=np.int64)
+
+    def get_distances_from_cell(self, source_cell: int, target_cell: int) -> Dict[int, int]:
+        """source_cellからの幅優先探索を、target_cellまでの距離が決まった時点で打ち切るメソッド
+
+        Args:
+            source_cell (int): 始点のセルID
+            target_cell (int): 目的のセルID
+
+        Returns:
+            Dict[int, int]: 距離が決まったセルIDとsource_cellからの最短距離 (target_cellに到達できない場合は含まない)
+        """
+        indptr, indices = self.adjacency_indptr_list, self.adjacency_indices_list
+        distances: Dict[int, int] = {source_cell: 0}
+        queue = deque([source_cell])
+        while queue and target_cell not in distances:
+            current = queue.popleft()
+            next_distance = distances[current] + 1
+            for neighbor in indices[indptr[current] : indptr[current + 1]]:
+                if neighbor not in distances:
+                    distances[neighbor] = next_distance
+                    queue.append(neighbor)
+        return distances
+
+    def get_cell_id(self, node: Node) -> int:
+        """ノードを整数のセルID(x * height + y)に変換するメソッド
+
+        Args:
+            node (Node): 変換するノード
+
+        Returns:
+            int: セルID
+        """
+        return node.x * self.height + node.y
+
+    def get_node_from_cell_id(self, cell_id: int) -> Node:
+        """セルIDをノードに変換するメソッド
+
+        Args:
+            cell_id (int): 変換するセルID
+
+        Returns:
+            Node: セルIDに対応するノード
+        """
+        return self.nodes[cell_id]
+
+    def get_valid_actions(self, node: Node) -> Tuple[Node, ...]:
+        """指定したノードで取れる行動(移動先が環境内にあり障害物でない行動)を取得するメソッド
+
+        Args:
+            node (Node): 対象となるノード (環境内であること)
+
+        Returns:
+            Tuple[Node, ...]: 取れる行動(ACTIONS_LISTの順), 障害物のノードの場合は空
+        """
+        return VALID_ACTIONS_BY_BITS[self.valid_action_bits[node.x * self.height + node.y]]
+
+    def get_adjacent_cell_ids(self, cell_id: int) -> List[int]:
+        """指定したセルの通行可能な隣接セルのIDを取得するメソッド
+
+        Args:
+            cell_id (int): 対象となるセルID
+
+        Returns:
+            List[int]: 通行可能な隣接セルのID (ACTIONS_LISTの順)
+        """
+        indptr = self.adjacency_indptr_list
+        return self.adjacency_indices_list[indptr[cell_id] : indptr[cell_id + 1]]
+
     def is_obstacle(self, node: Node) -> bool:
         """指定したノードが障害物かどうかを判定するメソッド
 
@@ -205,63 +492,134 @@ class Environment:
 
 
 class World:
-    """エージェントと報酬の保管庫の情報、および環境の状況を保持するクラス"""
+    """エージェントと報酬の保管庫の情報、および環境の状況を保持するクラス
+
+    Args:
+        width (Union[int, None]): マップの横幅, Noneの場合はcsvファイルから決める
+        height (Union[int, None]): マップの縦幅, Noneの場合はcsvファイルから決める
+        obstacle_file (str): 障害物の情報を持つcsvファイルのパス
+        reward_probability_file (str): 報酬が出現する確率を持つcsvファイルのパス
+        seed (Union[int, None]): 報酬の出現に使う乱数のシード, Noneの場合はランダム
+        maximum_rewards_capacity (int): エージェントが一度に保持できる報酬の最大値
+    """
 
-    def __init__(self, width: int, height: int, obstacle_file: str, reward_probability_file: str):
+    def __init__(
+        self,
+        width: Union[int, None],
+        height: Union[int, None],
+        obstacle_file: str,
+        reward_probability_file: str,
+        seed: Union[int, None] = None,
+        maximum_rewards_capacity: int = MAXIMUM_REWARDS_CAPACITY,
+    ):
         self.environment: Environment
+        self.maximum_rewards_capacity = maximum_rewards_capacity
+        # 報酬の出現に使う乱数生成器
+        self.rng: np.random.Generator = np.random.default_rng(seed)
+        # セルにいるエージェントのID, 保管庫のIDを記録する配列 (いない場合は-1)
+        self.agent_occupancy_grid: np.ndarray
+        self.vault_occupancy_grid: np.ndarray
         self.agents: List[Agent] = []
         self.agents_count = 0
         self.vaults: List[Vault] = []
         self.vaults_count = 0
+        # エージェントの位置(エージェント数, 2)と保有している報酬(エージェント数,)、保管庫ごとの保管された報酬
+        # (Agent, Vaultはこれらの配列の1行を読み書きするビュー)
+        self.agent_positions: np.ndarray
+        self.agent_owned_rewards: np.ndarray
+        self.vault_stored_rewards: np.ndarray
+        # 保管庫の位置(保管庫数, 2)
+        self.vault_positions: np.ndarray
         self.reward_array: np.ndarray
+        # 上の配列の書き込みできないビューをまとめた観測 (配列はその場で更新されるため、読み込み時に一度だけ作る)
+        self.observation: Observation
+        # 報酬があるセルのID (update_rewardとearn_rewardで逐次更新する)
+        self.reward_cells: Set[int] = set()
         self.__load_maps(width, height, obstacle_file, reward_probability_file)
+        # reset時に戻すエージェントの初期位置
+        self.initial_agent_nodes: List[Node] = [agent.get_node() for agent in self.agents]
+
+    def reset(self, seed: Union[int, None] = None):
+        """読み込んだマップを再利用して、ワールドを初期状態に戻すメソッド
+
+        !!経路計画プログラムでの利用はしてはいけない
 
-    def __load_maps(self, width: int, height: int, obstacle_file: str, reward_probability_file: str):
-        with open(obstacle_file, "r") as f:
-            self.environment = Environment(width, height)
-            obstacle_array = np.zeros((width, height))
-            for i in range(width):
-                line = f.readline()
-                row_list = line.strip().split(",")
-                for j, value in enumerate(row_list):
-                    if value == MAP_STATE.OBSTACLE:
-                        obstacle_array[i, j] = 1
-                    elif value == MAP_STATE.PASS_POINT:
-                        obstacle_array[i, j] = 0
-                    elif value == MAP_STATE.AGENT:
-                        self.agents.append(Agent(self.agents_count, MAXIMUM_REWARDS_CAPACITY, Node(i, j)))
-                        self.agents_count += 1
-                    elif value == MAP_STATE.VAULT:
-                        self.vaults.append(Vault(Node(i, j)))
-                        self.vaults_count += 1
-                    else:
-                        raise ValueError("Invalid value in the map. ", value)
-            self.environment.set_obstacle_array(obstacle_array)
-
-        with open(reward_probability_file, "r") as f:
-            reward_probability_array = np.zeros((width, height))
-            for i in range(width):
-                line = f.readline()
-                row_list = line.strip().split(",")
-                for j, value in enumerate(row_list):
-                    reward_probability_array[i, j] = float(value)
-            self.environment.set_reward_probability_array(reward_probability_array)
-        self.reward_array = np.zeros((width, height))
+        Args:
+            seed (Union[int, None]): 報酬の出現に使う乱数のシード, Noneの場合はランダム
+        """
+        self.rng = np.random.default_rng(seed)
+        self.agent_occupancy_grid[:] = -1
+        for agent, node in zip(self.agents, self.initial_agent_nodes):
+            agent.set_node(node)
+        self.agent_owned_rewards[:] = 0
+        self.vault_stored_rewards[:] = 0
+        self.reward_array[:] = 0
+        self.reward_cells.clear()
+
+    def __load_maps(
+        self, width: Union[int, None], height: Union[int, None], obstacle_file: str, reward_probability_file: str
+    ):
+        map_data = load_map_data(obstacle_file, reward_probability_file)
+        map_width, map_height = map_data.get_size()
+        if (width is not None and width != map_width) or (height is not None and height != map_height):
+            raise ValueError(
+                "The map size ({}, {}) does not match the size of {} ({}, {})".format(
+                    width, height, obstacle_file, map_width, map_height
+                )
+            )
+        self.environment = Environment(map_width, map_height, map_data.obstacle_array)
+        self.environment.set_obstacle_hash(map_data.obstacle_hash)
+        self.environment.set_reward_probability_array(map_data.reward_probability_array)
+
+        self.agent_occupancy_grid = np.full((map_width, map_height), -1, dtype=np.int32)
+        self.vault_occupancy_grid = np.full((map_width, map_height), -1, dtype=np.int32)
+        nodes = self.environment.nodes
+        self.agent_positions = np.zeros((len(map_data.agent_nodes), 2), dtype=np.int64)
+        self.agent_owned_rewards = np.zeros(len(map_data.agent_nodes))
+        self.vault_stored_rewards = np.zeros(len(map_data.vault_nodes))
+        for x, y in map_data.agent_nodes.tolist():
+            self.agents.append(
+                Agent(
+                    self.agents_count,
+                    self.maximum_rewards_capacity,
+                    nodes[x * map_height + y],
+                    self.agent_occupancy_grid,
+                    self.agent_positions,
+                    self.agent_owned_rewards,
+                )
+            )
+            self.agents_count += 1
+        for x, y in map_data.vault_nodes.tolist():
+            self.vaults.append(Vault(nodes[x * map_height + y], self.vault_stored_rewards, self.vaults_count))
+            self.vault_occupancy_grid[x, y] = self.vaults_count
+            self.vaults_count += 1
+        self.vault_positions = np.asarray(map_data.vault_nodes, dtype=np.int64).reshape(-1, 2)
+        self.reward_array = np.zeros((map_width, map_height))
+        # 保管庫は動かないため、保管庫までの距離場は読み込み時に一度だけ計算する
+        self.vault_distance_field = compute_nearest_distance_field(
+            self.environment.passable_array, map_data.vault_nodes
+        )
+        # 報酬の出現確率から求めた期待報酬 (マップと一緒にキャッシュされる)
+        self.expected_yield_array = map_data.expected_yield_array
+        self.observation = Observation(
+            self.reward_array,
+            self.environment.obstacle_array,
+            self.agent_positions,
+            self.agent_owned_rewards,
+            self.vault_positions,
+            self.maximum_rewards_capacity,
+        )
 
     def update_reward(self):
         """確率に応じてノードに報酬を生成するメソッド
 
         !!経路計画プログラムでの利用はしてはいけない
         """
-        for r in range(self.environment.width):
-            for c in range(self.environment.height):
-                node = Node(r, c)
-                # エージェントがいる場所には報酬を生成しない
-                if self.get_agent_with_node(node):
-                    continue
-                prob = self.environment.reward_probability_array[r, c]
-                if random.random() < prob:
-                    self.reward_array[r, c] = 1
+        spawn_mask = self.rng.random(self.reward_array.shape) < self.environment.reward_probability_array
+        # エージェントがいる場所には報酬を生成しない
+        spawn_mask &= self.agent_occupancy_grid < 0
+        self.reward_array[spawn_mask] = 1
+        self.reward_cells.update(np.flatnonzero(spawn_mask).tolist())
 
     def earn_reward(self, agent: Agent) -> int:
         """エージェントが報酬を獲得するメソッド
@@ -269,11 +627,17 @@ class World:
         !!経路計画プログラムでの利用はしてはいけない
         """
 
-        reward = self.reward_array[agent.get_node().x, agent.get_node().y]
-        if agent.get_maximum_rewards_capacity() - agent.owned_reward < reward:
-            reward = agent.get_maximum_rewards_capacity() - agent.owned_reward
-        agent.owned_reward += reward
-        self.reward_array[agent.get_node().x, agent.get_node().y] -= reward
+        node = agent.get_node()
+        reward = self.reward_array[node.x, node.y]
+        if reward <= 0:
+            return reward
+        owned_reward = self.agent_owned_rewards[agent.get_id()]
+        if agent.get_maximum_rewards_capacity() - owned_reward < reward:
+            reward = agent.get_maximum_rewards_capacity() - owned_reward
+        self.agent_owned_rewards[agent.get_id()] = owned_reward + reward
+        self.reward_array[node.x, node.y] -= reward
+        if reward > 0 and self.reward_array[node.x, node.y] <= 0:
+            self.reward_cells.discard(self.environment.get_cell_id(node))
         return reward
 
     def get_environment_size(self) -> Tuple[int, int]:
@@ -288,9 +652,9 @@ class World:
         """障害物のデータを取得するメソッド
 
         Returns:
-            np.ndarray: 障害物のデータ
+            np.ndarray: 障害物のデータ (書き込みできないビュー)
         """
-        return self.environment.get_obstacle_data()
+        return self.observation.obstacle_array
 
     def is_obstacle(self, node: Node) -> bool:
         """指定したノードが障害物かどうかを判定するメソッド
@@ -325,6 +689,126 @@ class World:
         """
         return self.environment.is_valid_node(node)
 
+    def get_shortest_distance(self, node1: Node, node2: Node) -> int:
+        """事前計算した距離表から2ノード間の最短距離を取得するメソッド
+
+        初回の呼び出し時に距離表を構築する(以降はO(1)で取得できる)
+        セル数がDISTANCE_TABLE_MAX_CELLSを超える場合は距離表を作らず、幅優先探索で求める
+
+        Args:
+            node1 (Node): ノード1
+            node2 (Node): ノード2
+
+        Returns:
+            int: 最短距離、経路が存在しない場合は-1
+        """
+        if not self.is_in_environment(node1) or not self.is_in_environment(node2):
+            return -1
+        env = self.environment
+        cell1, cell2 = env.get_cell_id(node1), env.get_cell_id(node2)
+        distance_table = env.get_distance_table()
+        if distance_table is not None:
+            return distance_table.get_distance(cell1, cell2)
+        if not env.passable_cells[cell1] or not env.passable_cells[cell2]:
+            return -1
+        return env.get_distances_from_cell(cell1, cell2).get(cell2, -1)
+
+    def get_next_action_toward_node(self, node: Node, goal: Node) -> Union[Node, None]:
+        """事前計算した距離表から目的のノードに最短で向かうための次の行動(Node)を取得するメソッド
+
+        初回の呼び出し時に距離表を構築する(以降はO(1)で取得できる)
+        セル数がDISTANCE_TABLE_MAX_CELLSを超える場合は距離表を作らず、目的のノードからの幅優先探索で求める
+
+        Args:
+            node (Node): 現在のノード
+            goal (Node): 目的のノード
+
+        Returns:
+            Union[Node, None]: 次の行動(Node)、目的のノードに到達できない場合はNone
+        """
+        if not self.is_in_environment(node) or not self.is_in_environment(goal):
+            return None
+        env = self.environment
+        cell, goal_cell = env.get_cell_id(node), env.get_cell_id(goal)
+        distance_table = env.get_distance_table()
+        if distance_table is not None:
+            action_index = distance_table.get_next_action_index(cell, goal_cell)
+            if action_index < 0:
+                return None
+            return ACTIONS_LIST[action_index]
+        if not env.passable_cells[cell] or not env.passable_cells[goal_cell]:
+            return None
+        if cell == goal_cell:
+            return ACTIONS_LIST[STAY_ACTION_INDEX]
+        # 目的のノードからの距離が1だけ小さい隣接セルのうち、ACTIONS_LISTで先の行動を選ぶ (距離表と同じ規則)
+        distances = env.get_distances_from_cell(goal_cell, cell)
+        if cell not in distances:
+            return None
+        for action in env.get_valid_actions(node):
+            neighbor = (node.x + action.x) * env.height + node.y + action.y
+            if distances.get(neighbor, -1) == distances[cell] - 1:
+                return action
+        return None
+
+    def get_distance_fields(self, nodes: List[Node]) -> np.ndarray:
+        """複数のノードそれぞれからの最短距離をまとめて計算するメソッド
+
+        Args:
+            nodes (List[Node]): 始点となるノードのリスト
+
+        Returns:
+            np.ndarray: (len(nodes), 横幅, 縦幅)の配列, [i, x, y]はnodes[i]からNode(x, y)までの最短距離(到達できない場合は-1)
+        """
+        sources = np.array([[node.x, node.y] for node in nodes], dtype=np.int64).reshape(-1, 2)
+        return compute_distance_fields(self.environment.passable_array, sources)
+
+    def get_nearest_distance_field(self, nodes: List[Node]) -> np.ndarray:
+        """複数のノードのうち最も近いものまでの最短距離を全てのノードについて計算するメソッド
+
+        Args:
+            nodes (List[Node]): 始点となるノードのリスト
+
+        Returns:
+            np.ndarray: (横幅, 縦幅)の配列, [x, y]はNode(x, y)から最も近いノードまでの最短距離(到達できない場合は-1)
+        """
+        sources = np.array([[node.x, node.y] for node in nodes], dtype=np.int64).reshape(-1, 2)
+        return compute_nearest_distance_field(self.environment.passable_array, sources)
+
+    def get_nearest_node_index_field(self, nodes: List[Node]) -> np.ndarray:
+        """全てのノードについて、複数のノードのうち最も近いもののインデックスを計算するメソッド
+
+        ノードごとの距離場(get_distance_fields)を持たずに、全てのノードから同時に1回だけ幅優先探索を行う
+
+        Args:
+            nodes (List[Node]): 始点となるノードのリスト
+
+        Returns:
+            np.ndarray: (横幅, 縦幅)の配列, [x, y]はNode(x, y)から最も近いノードのnodesでのインデックス
+                (同じ距離のノードが複数ある場合は最小のインデックス, 到達できない場合は-1)
+        """
+        env = self.environment
+        indices = env.get_nearest_source_indices([env.get_cell_id(node) for node in nodes])
+        return indices.reshape(env.width, env.height)
+
+    def get_vault_distance_field(self) -> np.ndarray:
+        """最も近い保管庫までの最短距離を全てのノードについて取得するメソッド (読み込み時に計算済み)
+
+        Returns:
+            np.ndarray: (横幅, 縦幅)の配列, [x, y]はNode(x, y)から最も近い保管庫までの最短距離(到達できない場合は-1)
+        """
+        return self.vault_distance_field
+
+    def get_expected_yield_array(self) -> np.ndarray:
+        """各ノードの期待報酬を取得するメソッド (読み込み時に計算済み)
+
+        期待報酬は、EXPECTED_YIELD_HORIZONステップ以内に到達できるノードの報酬の出現確率を、
+        距離dに応じてEXPECTED_YIELD_DISCOUNT ** d倍して足し合わせたもの
+
+        Returns:
+            np.ndarray: (横幅, 縦幅)の配列, [x, y]はNode(x, y)の期待報酬(障害物は0)
+        """
+        return self.expected_yield_array
+
     def get_agents(self) -> List[Agent]:
         """エージェントのリストを取得するメソッド
 
@@ -366,10 +850,12 @@ class World:
         Returns:
             Union[Agent, None]: 指定したノードにいるエージェントが存在する場合はそのエージェント, それ以外はNone
         """
-        for agent in self.agents:
-            if agent.get_node() == node:
-                return agent
-        return None
+        if not self.is_in_environment(node):
+            return None
+        agent_id = self.agent_occupancy_grid[node.x, node.y]
+        if agent_id < 0:
+            return None
+        return self.agents[agent_id]
 
     def get_vault_with_node(self, node: Node) -> Union[Vault, None]:
         """指定したノード上の保管庫を取得するメソッド
@@ -380,18 +866,20 @@ class World:
         Returns:
             Union[Vault, None]: 指定したノードに保管庫が存在する場合はその保管庫, それ以外はNone
         """
-        for vault in self.vaults:
-            if vault.get_node() == node:
-                return vault
-        return None
+        if not self.is_in_environment(node):
+            return None
+        vault_id = self.vault_occupancy_grid[node.x, node.y]
+        if vault_id < 0:
+            return None
+        return self.vaults[vault_id]
 
     def get_reward_array(self) -> np.ndarray:
         """現在の報酬が配置されているノードを記録した配列を取得するメソッド
 
         Returns:
-            np.ndarray: 報酬の配列
+            np.ndarray: 報酬の配列 (書き込みできないビュー)
         """
-        return self.reward_array
+        return self.observation.reward_array
 
     def has_reward(self, node: Node) -> bool:
         """指定したノードに報酬があるかどうかを判定するメソッド
@@ -404,16 +892,113 @@ class World:
         """
         return self.reward_array[node.x, node.y] > 0
 
+    def get_reward_cell_ids(self) -> FrozenSet[int]:
+        """報酬があるセルのIDの集合を取得するメソッド
+
+        報酬の出現と獲得のたびに更新している集合を使うため、報酬の配列全体を調べる必要がない
+
+        Returns:
+            FrozenSet[int]: 報酬があるセルのID(x * 縦幅 + y)の集合
+        """
+        return frozenset(self.reward_cells)
+
     def get_agents_pos_dict(self) -> Dict[int, List[int]]:
         """エージェントの位置情報を辞書形式で取得するメソッド
 
         Returns:
             Dict[int, List[int]]: エージェントの位置情報
         """
-        agent_pos_dict: Dict[int, List[int]] = {}
-        for agent in self.agents:
-            agent_pos_dict[agent.get_id()] = [agent.get_node().x, agent.get_node().y]
-        return agent_pos_dict
+        return dict(enumerate(self.agent_positions.tolist()))
+
+    def get_valid_action_mask(self) -> np.ndarray:
+        """セルごとに取れる行動(移動先が環境内にあり障害物でない行動)の表を取得するメソッド (読み込み時に計算済み)
+
+        Returns:
+            np.ndarray: (セル数, 5)のbool配列, [セルID, i]はそのセルでACTIONS_LIST[i]の行動を取れる場合にTrue
+                (セルIDはx * 縦幅 + y, 書き込みできないビュー)
+        """
+        return read_only_view(self.environment.valid_action_mask)
+
+    def get_valid_action_bits(self) -> np.ndarray:
+        """セルごとに取れる行動をビットマスクにまとめた配列を取得するメソッド (読み込み時に計算済み)
+
+        Returns:
+            np.ndarray: (セル数,)のuint8配列, ビットiはそのセルでACTIONS_LIST[i]の行動を取れる場合に1
+                (セルIDはx * 縦幅 + y, 書き込みできないビュー)
+        """
+        return read_only_view(self.environment.valid_action_bits)
+
+    def get_adjacency(self) -> Tuple[np.ndarray, np.ndarray]:
+        """通行可能な隣接セルをCSR形式でまとめた隣接リストを取得するメソッド (読み込み時に計算済み)
+
+        セルIDがcellのセルの隣接セルのIDは、indices[indptr[cell] : indptr[cell + 1]]にACTIONS_LISTの順で並ぶ
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: (セル数 + 1,)のindptrと隣接セルのIDを並べたindices
+                (セルIDはx * 縦幅 + y, 書き込みできないビュー)
+        """
+        return read_only_view(self.environment.adjacency_indptr), read_only_view(self.environment.adjacency_indices)
+
+    def get_adjacent_cell_ids(self, cell_id: int) -> List[int]:
+        """指定したセルの通行可能な隣接セルのIDのリストを取得するメソッド
+
+        Args:
+            cell_id (int): 対象となるセルID (x * 縦幅 + y)
+
+        Returns:
+            List[int]: 通行可能な隣接セルのIDのリスト (ACTIONS_LISTの順)
+        """
+        return self.environment.get_adjacent_cell_ids(cell_id)
+
+    def get_cell_id(self, node: Node) -> int:
+        """ノードを整数のセルID(x * 縦幅 + y)に変換するメソッド
+
+        Args:
+            node (Node): 変換するノード
+
+        Returns:
+            int: セルID
+        """
+        return self.environment.get_cell_id(node)
+
+    def get_node_from_cell_id(self, cell_id: int) -> Node:
+        """セルIDをノードに変換するメソッド
+
+        Args:
+            cell_id (int): 変換するセルID
+
+        Returns:
+            Node: セルIDに対応するノード
+        """
+        return self.environment.get_node_from_cell_id(cell_id)
+
+    def get_agent_positions(self) -> np.ndarray:
+        """全エージェントの位置を配列で取得するメソッド
+
+        Returns:
+            np.ndarray: (エージェント数, 2)の配列, [i]はIDがiのエージェントの位置(x, y) (書き込みできないビュー)
+        """
+        return self.observation.agent_positions
+
+    def get_agent_owned_rewards(self) -> np.ndarray:
+        """全エージェントが保有している報酬を配列で取得するメソッド
+
+        Returns:
+            np.ndarray: (エージェント数,)の配列, [i]はIDがiのエージェントが保有している報酬 (書き込みできないビュー)
+        """
+        return self.observation.agent_owned_rewards
+
+    def get_observation(self) -> Observation:
+        """報酬・障害物・エージェントの位置と保有している報酬・保管庫の位置を、コピーせずに読み取り専用のビューで取得するメソッド
+
+        ビューはワールドの配列と同じ値を指すため、同じ観測を毎ステップ使い回せる
+        値はシミュレータが次のステップに進むまで変わらないため、次のステップ以降も同じ状態を参照したい場合は
+        Observation.copy()で複製する
+
+        Returns:
+            Observation: 現在のワールドの状態の観測
+        """
+        return self.observation
 
     def get_vaults_pos_dict(self) -> Dict[int, List[int]]:
         """保管庫の位置情報を辞書形式で取得するメソッド
@@ -437,17 +1022,53 @@ class World:
         Returns:
             Union[Node, None]: 指定したノードに最も近い報酬があるノードが存在する場合はそのノード, それ以外はNone
         """
-        min_distance = 10000
-        nearest_node = None
-        for r in range(self.environment.width):
-            for c in range(self.environment.height):
-                if self.reward_array[r, c] > 0:
-                    reward_node = Node(r, c)
-                    distance = abs(node.x - reward_node.x) + abs(node.y - reward_node.y)
-                    if distance < min_distance:
-                        min_distance = distance
-                        nearest_node = reward_node
-        return nearest_node
+        nearest_nodes = self.get_k_nearest_nodes_have_reward(node, 1)
+        if len(nearest_nodes) == 0:
+            return None
+        return nearest_nodes[0][0]
+
+    def get_k_nearest_nodes_have_reward(self, node: Node, k: int) -> List[Tuple[Node, int]]:
+        """指定したノードから経路上の距離が近い順にk個の報酬があるノードを取得するメソッド
+
+        指定したノードからの幅優先探索をk個の報酬が見つかった時点で打ち切るため、
+        計算量はマップ全体ではなく近くの報酬までの範囲の広さに比例する
+
+        Args:
+            node (Node): 対象となるノード
+            k (int): 取得する報酬があるノードの最大数
+
+        Returns:
+            List[Tuple[Node, int]]: 報酬があるノードとそこまでの最短距離の組のリスト (距離が近い順)
+        """
+        if not self.is_valid_node(node):
+            return []
+        env = self.environment
+        return [
+            (env.get_node_from_cell_id(cell), distance)
+            for cell, distance in env.get_k_nearest_cells(env.get_cell_id(node), self.reward_cells, k)
+        ]
+
+    def get_k_nearest_nodes(self, node: Node, target_nodes: Iterable[Node], k: int) -> List[Tuple[Node, int]]:
+        """指定したノードから経路上の距離が近い順に、target_nodesのうちk個のノードを取得するメソッド
+
+        get_k_nearest_nodes_have_rewardと同様に、k個のノードが見つかった時点で幅優先探索を打ち切る
+
+        Args:
+            node (Node): 対象となるノード
+            target_nodes (Iterable[Node]): 探すノード
+            k (int): 取得するノードの最大数
+
+        Returns:
+            List[Tuple[Node, int]]: target_nodesのノードとそこまでの最短距離の組のリスト (距離が近い順)
+        """
+        if not self.is_valid_node(node):
+            return []
+        env = self.environment
+        target_cells = {env.get_cell_id(target) for target in target_nodes if self.is_in_environment(target)}
+        return [
+            (env.get_node_from_cell_id(cell), distance)
+            for cell, distance in env.get_k_nearest_cells(env.get_cell_id(node), target_cells, k)
+        ]
 
     def get_adjacent_nodes(self, node: Node) -> List[Node]:
         """指定したノードの隣接するノードのリストを取得するメソッド
@@ -458,13 +1079,15 @@ class World:
         Returns:
             List[Node]: 指定したノードの隣接するノードのリスト
         """
-        action_list: List[Node] = [
-            Node(0, 1),
-            Node(0, -1),
-            Node(1, 0),
-            Node(-1, 0),
-        ]
-        return [node + action for action in action_list]
+        env = self.environment
+        adjacent_nodes: List[Node] = []
+        for action in ACTIONS_LIST[:4]:
+            x, y = node.x + action.x, node.y + action.y
+            if 0 <= x < env.width and 0 <= y < env.height:
+                adjacent_nodes.append(env.nodes[x * env.height + y])
+            else:
+                adjacent_nodes.append(Node(x, y))
+        return adjacent_nodes
 
     def get_valid_next_actions_for_agents(self, agent: Agent) -> List[Node]:
         """エージェントが次に選択できる有効な行動(Node)のリストを取得するメソッド
@@ -476,38 +1099,26 @@ class World:
             List[Node]: エージェントが次に選択できる有効な行動(Node)のリスト
         """
         current_node = agent.get_node()
-        actions_list = [
-            Node(0, 1),
-            Node(0, -1),
-            Node(1, 0),
-            Node(-1, 0),
-            Node(0, 0),
-        ]
-        valid_next_actions: List[Node] = []
-        for action in actions_list:
-            next_node = current_node + action
-            if self.is_valid_node(next_node):
-                valid_next_actions.append(action)
-        return valid_next_actions
+        if not self.is_valid_node(current_node):
+            return []
+        return list(self.environment.get_valid_actions(current_node))
 
     def print_map_state(self):
         width, height = self.environment.get_environment_size()
         for r in range(width):
             for c in range(height):
                 print_str = ""
-                agent = self.get_agent_with_node(Node(r, c))
-                vault = self.get_vault_with_node(Node(r, c))
                 color_start_str = ""
                 color_end_str = ""
-                if agent:
+                if self.agent_occupancy_grid[r, c] >= 0:
                     print_str = MAP_STATE.AGENT
                     color_start_str = "\033[32m"
                     color_end_str = "\033[0m"
-                elif vault:
+                elif self.vault_occupancy_grid[r, c] >= 0:
                     print_str = MAP_STATE.VAULT
                     color_start_str = "\033[34m"
                     color_end_str = "\033[0m"
-                elif self.environment.is_obstacle(Node(r, c)):
+                elif self.environment.obstacle_array[r, c] == 1:
                     print_str = MAP_STATE.OBSTACLE
                 elif self.reward_array[r, c] > 0:
                     print_str = "★"
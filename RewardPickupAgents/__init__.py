@@ -7,7 +7,7 @@ from time import sleep
 
 from .World import World, Node
 from .parameter import *
-from .GIFMaker import GIFMaker
+from .Simulator import SimulationConfig, Simulator
 
 """ 以下を変更してください """
 from .PathPlanner.RandomWalk import RandomWalk as PathPlanner
@@ -16,83 +16,44 @@ from .PathPlanner.RandomWalk import RandomWalk as PathPlanner
 
 
 def main():
-    world = World(MAP_WIDTH, MAP_HEIGHT, OBSTACLE_CSV_FILE_PATH, REWARD_CSV_FILE_PATH)
-    print("(width, height) = ", world.get_environment_size())
+    config = SimulationConfig(
+        map_width=MAP_WIDTH,
+        map_height=MAP_HEIGHT,
+        obstacle_file=OBSTACLE_CSV_FILE_PATH,
+        reward_probability_file=REWARD_CSV_FILE_PATH,
+        maximum_rewards_capacity=MAXIMUM_REWARDS_CAPACITY,
+        simulation_timestep=SIMULATION_TIMESTEP,
+        seed=RANDOM_SEED,
+        print_map_in_terminal=PRINT_MAP_IN_TEMINAL,
+        create_gif=CREATE_GIF,
+        gif_writer=GIF_WRITER,
+        gif_save_path=GIF_SAVE_PATH,
+        trace_path=TRACE_SAVE_PATH,
+        profile_report_path=PROFILE_REPORT_PATH,
+        profile_planner=PROFILE_PLANNER,
+    )
+    simulator = Simulator(config, PathPlanner)
+    print("(width, height) = ", simulator.world.get_environment_size())
     if PRINT_MAP_IN_TEMINAL:
-        world.print_map_state()
-    next_nodes_selector = PathPlanner()
-
-    step: int = 0
-    agents_owned_rewards: int = 0
-    stored_rewards: int = 0
-    collision_count: int = 0
-    if CREATE_GIF:
-        gif_maker = GIFMaker(world.get_obstacle_data(), world.get_agents_count(), world.get_vaults_count())
-        gif_maker.update(
-            step, stored_rewards, world.get_reward_array(), world.get_agents_pos_dict(), world.get_vaults_pos_dict()
-        )
-
-    AGENTS_COUNT = world.get_agents_count()
-    ACTIONS_LIST = [Node(0, 1), Node(0, -1), Node(1, 0), Node(-1, 0), Node(0, 0)]
-
-    while step < SIMULATION_TIMESTEP:
-        # 報酬を出現させる
-        world.update_reward()
-        # エージェントの移動
-        new_acitons = next_nodes_selector.get_next_actions_for_agents(world)
-        for i in range(AGENTS_COUNT):
-            if not new_acitons[i] in ACTIONS_LIST:
-                raise ValueError(
-                    "エージェントが取れない行動を選択しようとしています。 Agent ID: {}, Node: {}".format(
-                        i, new_acitons[i]
-                    )
-                )
-            new_node = world.agents[i].get_node() + new_acitons[i]
-            if not world.is_valid_node(new_node):
-                raise ValueError(
-                    "エージェントが範囲外もしくは障害物に移動しようとしています。 Agent ID: {}, Node: {}".format(
-                        i, new_node
-                    )
-                )
-            if world.get_agent_with_node(new_node):
-                collision_count += 1
-                continue
-            world.agents[i].set_node(new_node)
-
-        # 報酬の取得
-        for agent in world.agents:
-            world.earn_reward(agent)
-
-        # 報酬の保管
-        for agent in world.agents:
-            vault = world.get_vault_with_node(agent.get_node())
-            if vault:
-                vault.store_rewards(agent.owned_reward)
-                agent.owned_reward = 0
-
-        # 後処理
-        step += 1
-        agents_owned_rewards = sum([agent.owned_reward for agent in world.agents])
-        stored_rewards = sum([vault.stored_rewards for vault in world.vaults])
-        if CREATE_GIF:
-            gif_maker.update(
-                step, stored_rewards, world.get_reward_array(), world.get_agents_pos_dict(), world.get_vaults_pos_dict()
+        simulator.world.print_map_state()
+
+    result = simulator.run(SIMULATION_TIMESTEP)
+
+    print("Final Step", result.step)
+    print("Final Agents Owned Reward", result.agents_owned_rewards)
+    print("Final Stored Reward", result.stored_rewards)
+    print("Final Collision Count", result.collision_count)
+    # 1ステップも進めていない場合は経路計画の時間が記録されない
+    planner_summary = simulator.profiler.get_summary().get("planner")
+    if planner_summary is not None:
+        planner_time = planner_summary["wall"]
+        print(
+            "Planner Time [ms] p50: {:.3f}, p95: {:.3f}, p99: {:.3f}, max: {:.3f}".format(
+                *(planner_time[key] * 1000 for key in ("p50", "p95", "p99", "max"))
             )
-
-        if PRINT_MAP_IN_TEMINAL:
-            print("Step", step)
-            print("Agents Owned Reward", agents_owned_rewards)
-            print("Stored Reward", stored_rewards)
-            print("Collision Count", collision_count)
-            world.print_map_state()
-            sleep(1)
-
-    print("Final Step", step)
-    print("Final Agents Owned Reward", agents_owned_rewards)
-    print("Final Stored Reward", stored_rewards)
-    print("Final Collision Count", collision_count)
-    if CREATE_GIF:
-        gif_maker.save_gif(GIF_SAVE_PATH)
+        )
+    if PROFILE_REPORT_PATH is not None:
+        print("Profile report saved to", PROFILE_REPORT_PATH)
 
 
 if __name__ == "__main__":
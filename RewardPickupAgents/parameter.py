@@ -13,18 +13,43 @@ class MAP_STATE:
 # エージェントが一度に保持できる報酬の最大値
 MAXIMUM_REWARDS_CAPACITY = 3
 
-# マップの縦横の長さ
+# マップの縦横の長さ (Noneの場合はcsvファイルから決める)
 MAP_WIDTH = 9
 MAP_HEIGHT = 9
 # 障害物の情報を持つcsvファイルのパス
 OBSTACLE_CSV_FILE_PATH = "obstacle_data/obstacle1.csv"
 # 報酬が出現する確率を持つcsvファイルのパス
 REWARD_CSV_FILE_PATH = "reward_probability_data/randomized.csv"
+# 読み込んだマップや全点対間の最短距離表のキャッシュを保存するディレクトリ (空文字の場合はキャッシュしない)
+CACHE_DIR = ".cache"
+# 全点対間の最短距離表を構築するセル数の上限 (メモリ使用量はセル数の2乗に比例するため、超える場合は幅優先探索で求める)
+DISTANCE_TABLE_MAX_CELLS = 4096
+# 各セルの期待報酬(近くのセルの報酬の出現確率を距離で割り引いた和)を計算するときに考慮する最大の距離と割引率
+EXPECTED_YIELD_HORIZON = 8
+EXPECTED_YIELD_DISCOUNT = 0.9
+# 報酬の出現に使う乱数のシード (Noneの場合は実行ごとにランダム)
+RANDOM_SEED = None
 # シミュレーションを行うステップ数
 SIMULATION_TIMESTEP = 100
+# 衝突の解決方法
+# "sequential": エージェントIDの順に1体ずつ移動し、移動先にエージェントがいれば衝突とする (その場に留まる場合を含む, 評価時の設定)
+# "simultaneous": 全エージェントが同時に移動するとみなし、同じセルに入ろうとする移動と入れ替わろうとする移動を衝突とする
+#     (エージェントの順番によらず、同じステップに空くセルに続けて入ることができる)
+COLLISION_RESOLUTION = "sequential"
 # ターミナルにマップを表示するかどうか
 PRINT_MAP_IN_TEMINAL = False
 # GIFアニメーションを作成するかどうか
 CREATE_GIF = True
+# エピソードの状態を記録するファイルの保存先 (Noneの場合は記録しない)
+# 記録したファイルは`python3 replay.py`で後からGIFやターミナルに再生できる
+TRACE_SAVE_PATH = None
+# 各フェーズ(報酬の生成, 経路計画, 移動, 描画など)の計算時間の集計を保存するJSONファイルのパス (Noneの場合は保存しない)
+PROFILE_REPORT_PATH = None
+# 経路計画プログラムをcProfileで計測するかどうか (結果はPROFILE_REPORT_PATHのJSONと、拡張子を.profにしたファイルに保存される)
+PROFILE_PLANNER = False
+# GIFアニメーションの作成方法
+# "streaming": フレームを逐次ファイルに書き出す (メモリ使用量がステップ数によらず一定)
+# "matplotlib": matplotlibで全フレームを保持してから書き出す
+GIF_WRITER = "streaming"
 # GIFアニメーションの保存先, 現在時刻
 GIF_SAVE_PATH = os.path.join("GIFs", datetime.datetime.now().strftime("%Y%m%d%H%M%S") + ".gif")
@@ -0,0 +1,32 @@
+# シード付きの複数エピソードを並列に実行し、経路計画プログラムの成績を集計するスクリプト
+import argparse
+import json
+
+from RewardPickupAgents.BatchRunner import run_batch
+from RewardPickupAgents.parameter import *
+
+
+def main():
+    parser = argparse.ArgumentParser(description="複数エピソードを並列に実行して経路計画プログラムを評価する")
+    parser.add_argument("--planner", default="RandomWalk", help='経路計画プログラム ("RandomWalk"や"module:Class")')
+    parser.add_argument("--episodes", type=int, default=100, help="実行するエピソード数")
+    parser.add_argument("--seed", type=int, default=0, help="最初のエピソードのシード")
+    parser.add_argument("--steps", type=int, default=SIMULATION_TIMESTEP, help="1エピソードのステップ数")
+    parser.add_argument("--workers", type=int, default=None, help="ワーカープロセス数 (省略時はCPU数)")
+    parser.add_argument("--json", default=None, help="結果をJSONで保存するパス")
+    args = parser.parse_args()
+    if args.episodes < 1:
+        parser.error("--episodesは1以上を指定してください: {}".format(args.episodes))
+
+    result = run_batch(args.planner, args.episodes, args.seed, args.steps, args.workers)
+
+    for key, summary in result["summary"].items():
+        print(key, ", ".join("{}={:.4g}".format(name, value) for name, value in summary.items()))
+    if args.json is not None:
+        with open(args.json, "w") as f:
+            json.dump(result, f, indent=2)
+        print("JSON file is saved at: ", args.json)
+
+
+if __name__ == "__main__":
+    main()
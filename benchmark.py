@@ -0,0 +1,55 @@
+# 大きさの異なる人工マップでユーティリティ関数や1ステップの計算時間を計測し、結果をJSONで保存するスクリプト
+import argparse
+import json
+import os
+
+from RewardPickupAgents.Benchmark import BENCHMARK_SCALES, BENCHMARK_NAMES, run_benchmarks, compare_reports
+
+
+def parse_scales(text: str):
+    """「9x4,64x40」のような文字列を(マップの一辺のセル数, エージェント数)のリストに変換する"""
+    return [tuple(int(value) for value in scale.split("x")) for scale in text.split(",")]
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="人工マップで経路計画プログラムやユーティリティ関数の計算時間を計測する"
+    )
+    parser.add_argument(
+        "--scales",
+        type=parse_scales,
+        default=BENCHMARK_SCALES,
+        help='"一辺のセル数xエージェント数"のカンマ区切り (既定値: {})'.format(
+            ",".join("{}x{}".format(size, agents) for size, agents in BENCHMARK_SCALES)
+        ),
+    )
+    parser.add_argument(
+        "--benchmarks",
+        type=lambda text: text.split(","),
+        default=BENCHMARK_NAMES,
+        help="計測する項目のカンマ区切り (既定値: {})".format(",".join(BENCHMARK_NAMES)),
+    )
+    parser.add_argument("--repeats", type=int, default=100, help="関数単位の項目を計測する回数")
+    parser.add_argument("--steps", type=int, default=10, help="1ステップとGIFの描画を計測する回数")
+    parser.add_argument("--seed", type=int, default=0, help="マップの生成と報酬の出現に使う乱数のシード")
+    parser.add_argument("--map-dir", default=None, help="人工マップのcsvファイルを保存するディレクトリ")
+    parser.add_argument("--json", default="benchmark_results/latest.json", help="結果をJSONで保存するパス")
+    parser.add_argument("--compare", default=None, help="比較する過去の結果のJSONファイル")
+    args = parser.parse_args()
+
+    report = run_benchmarks(
+        args.scales, args.benchmarks, args.repeats, args.steps, args.map_dir, args.seed, verbose=args.compare is None
+    )
+    if args.compare is not None:
+        with open(args.compare) as f:
+            baseline_report = json.load(f)
+        for line in compare_reports(report, baseline_report):
+            print(line)
+    os.makedirs(os.path.dirname(args.json) or ".", exist_ok=True)
+    with open(args.json, "w") as f:
+        json.dump(report, f, indent=2)
+    print("JSON file is saved at: ", args.json)
+
+
+if __name__ == "__main__":
+    main()
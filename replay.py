@@ -0,0 +1,24 @@
+# 記録したエピソードの状態を、指定したステップの範囲だけGIFアニメーションやターミナルに再生するスクリプト
+import argparse
+
+from RewardPickupAgents.TraceLog import TraceReader, replay_to_gif, replay_to_terminal
+
+
+def main():
+    parser = argparse.ArgumentParser(description="記録したエピソードを再生する")
+    parser.add_argument("trace", help="記録したファイルのパス (parameter.pyのTRACE_SAVE_PATH)")
+    parser.add_argument("--start", type=int, default=0, help="最初のレコードのインデックス (0は初期状態)")
+    parser.add_argument("--stop", type=int, default=None, help="最後のレコードの次のインデックス")
+    parser.add_argument("--gif", default=None, help="GIFアニメーションの保存先 (省略時はターミナルに表示)")
+    args = parser.parse_args()
+
+    reader = TraceReader(args.trace)
+    print("Records", len(reader))
+    if args.gif is not None:
+        replay_to_gif(reader, args.gif, args.start, args.stop)
+    else:
+        replay_to_terminal(reader, args.start, args.stop)
+
+
+if __name__ == "__main__":
+    main()